@@ -1,7 +1,9 @@
+import argparse
+import os
 import tkinter as tk
 from tkinter import messagebox
-from datetime import datetime, date, time
 import database  
+import services
 import frontend  
 
 #CONSTANTS (Colors/Fonts)
@@ -16,7 +18,7 @@ FONT_TITLE = ("Helvetica", 24, "bold")
 FONT_HEADING = ("Helvetica", 14, "bold")
 FONT_BODY = ("Helvetica", 10)
 #1class 
-#20 methods
+#Thin Tk adapter over services.py: it turns results and errors into message boxes and reloads the screens
 # SESSION CONTROLLER METHODS
 class MMAutoRepairShop(tk.Tk): #parent class
     def __init__(self):
@@ -59,34 +61,45 @@ class MMAutoRepairShop(tk.Tk): #parent class
         frame = self.frames[name]
         frame.tkraise()
 
+    def _run(self, action, *args, success_title="Success", failure_title=None, quiet=False): #Calls a services function and reports it in a message box. Returns the Outcome (None on failure).
+        try:
+            outcome = action(*args)
+        except services.ServiceError as e:
+            # Input and permission problems keep their own heading; other failures use the screen's
+            show_as = e.title if failure_title is None or isinstance(e, (services.ValidationError, services.PermissionDenied)) else failure_title
+            messagebox.showerror(show_as, str(e))
+            return None
+        if not quiet:
+            messagebox.showinfo(success_title, outcome.message)
+        return outcome
+
+    def _reload(self, dashboard, *frame_names):
+        for name in frame_names:
+            self.frames[dashboard].content_frames[name].load_data()
+
     def process_login(self, username, password):
-        user = database.get_user_by_username(username)
-        if user and user['password'] == password:
-            self.current_user = user
-            database.update_last_login(user['user_id'])
-            messagebox.showinfo("Login Success", f"Welcome, {user['full_name']}!")
-            if user['user_type'] == 1:
-                self.frames["AdminDashboard"].set_admin_data(user)
-                self.show_frame("AdminDashboard")
-            else:
-                self.frames["UserDashboard"].set_user_data(user)
-                self.show_frame("UserDashboard")
+        try:
+            user = services.login(username, password)
+        except services.ServiceError as e:
+            messagebox.showerror(e.title, str(e))
+            return
+        self.current_user = user
+        messagebox.showinfo("Login Success", f"Welcome, {user['full_name']}!")
+        if services.is_admin(user):
+            self.frames["AdminDashboard"].set_admin_data(user)
+            self.show_frame("AdminDashboard")
         else:
-            messagebox.showerror("Login Failed", "Invalid username or password.")
+            self.frames["UserDashboard"].set_user_data(user)
+            self.show_frame("UserDashboard")
 
     def process_signup(self, username, full_name, phone_no, password):
-        if not (username and full_name and phone_no and password):
-            messagebox.showerror("Input Error", "All fields are required.")
-            return
-
-        success, message = database.register_new_user(username, full_name, phone_no, password)
-        if success:
-            messagebox.showinfo("Sign-up Success", message)
+        if self._run(services.register, username, full_name, phone_no, password,
+                     success_title="Sign-up Success", failure_title="Sign-up Failed"):
             self.frames["LoginSignup"].show_inner_frame("Login")
-        else:
-            messagebox.showerror("Sign-up Failed", message)
 
     def logout(self):
+        frontend.loader.cancel_all() # Screens still loading belong to the old session
+        services.logout(self.current_user)
         self.current_user = None
         messagebox.showinfo("Logged Out", "You have been successfully logged out.")
         self.show_frame("LoginSignup")
@@ -97,195 +110,98 @@ class MMAutoRepairShop(tk.Tk): #parent class
     def get_current_user_id(self):
         return self.current_user['user_id'] if self.current_user else None
 
-    def save_user_profile(self, user_id, full_name, phone_no, new_password):
-        database.update_user_profile(user_id, full_name, phone_no, new_password)
-        # Re-fetch user data to update the session info
-        self.current_user = database.get_user_by_username(self.current_user['username']) 
-        messagebox.showinfo("Success", "Profile updated successfully.")
+    def save_user_profile(self, username, full_name, phone_no, new_password): #Returns True if saved; the session then holds the updated user.
+        outcome = self._run(services.update_profile, self.current_user, username, full_name, phone_no, new_password,
+                            failure_title="Update Failed")
+        if not outcome:
+            return False
+        if outcome.data:
+            self.current_user = outcome.data
+        return True
         
     # VEHICLE METHODS
     def process_add_vehicle(self, brand, model, plate_no):
-        user_id = self.get_current_user_id()
-        if not user_id:
-            messagebox.showerror("Error", "User not logged in.")
-            return
-
-        success, message = database.add_vehicle(user_id, brand, model, plate_no)
-        if success:
-            messagebox.showinfo("Success", message)
-            # Reload vehicles list
-            self.frames["UserDashboard"].content_frames["Vehicles"].load_data() 
-        else:
-            messagebox.showerror("Failed", message)
+        if self._run(services.add_vehicle, self.current_user, brand, model, plate_no, failure_title="Failed"):
+            self._reload("UserDashboard", "Vehicles")
 
-    def delete_vehicle_by_admin(self, vehicle_id, plate_no):
+    def delete_vehicle_by_admin(self, vehicle_id, plate_no): #Also used by customers for their own vehicles.
         if not messagebox.askyesno("Confirm Deletion", f"Are you sure you want to permanently delete vehicle {plate_no} and all its associated appointments?"):
             return
-            
-        deleter_id = self.get_current_user_id()
-        success, message = database.delete_vehicle(deleter_id, vehicle_id)
-        if success:
-            messagebox.showinfo("Success", message)
-            # Reload Admin vehicle list
-            self.frames["AdminDashboard"].content_frames["ManageVehicles"].load_data()
-        else:
-            messagebox.showerror("Failed", message)
+        if self._run(services.delete_vehicle, self.current_user, vehicle_id, failure_title="Failed"):
+            if services.is_admin(self.current_user):
+                self._reload("AdminDashboard", "ManageVehicles")
+            else:
+                self._reload("UserDashboard", "Vehicles")
 
     # APPOINTMENT METHODS
     def book_appointment(self, vehicle_text, service_ids, date_str, time_str):
-        # 1. Parse vehicle info
+        # The form shows "PLATE / Model"; services work with the vehicle ID
         vehicle_map = {f"{v['plate_no']} / {v['model']}": v['vehicle_id'] for v in database.get_user_vehicles(self.get_current_user_id())}
-        vehicle_id = vehicle_map.get(vehicle_text)
-        user_id = self.get_current_user_id()
-
-        if not vehicle_id:
-            raise ValueError("Selected vehicle is not valid.")
-        
-        # 2. Basic date/time validation
-        try:
-            appt_date = datetime.strptime(date_str, "%Y-%m-%d").date()
-            appt_time = datetime.strptime(time_str, "%H:%M").time()
-            now = datetime.now()
-            
-            if appt_date < now.date():
-                 raise ValueError("Cannot book an appointment for a past date.")
-
-            # Check for same day and past time
-            if appt_date == now.date() and appt_time < now.time():
-                 raise ValueError("Cannot book an appointment for a time that has already passed today.")
-
-            # Check shop hours (6:00 AM to 5:00 PM)
-            min_time = time(6, 0)
-            max_time = time(17, 0) # 5:00 PM
-            if not (min_time <= appt_time <= max_time):
-                 raise ValueError("The shop is only open from 6:00 AM to 5:00 PM.")
-
-        except ValueError as e:
-            messagebox.showerror("Input Error", f"Invalid input: {e}")
-            return 
-
-        # 3. Process booking
-        if not service_ids:
-            messagebox.showerror("Input Error", "Please select at least one service.")
-            return
-
-        success, message = database.add_appointment(user_id, vehicle_id, service_ids, date_str, time_str)
-        
-        if success:
-            messagebox.showinfo("Booking Success", message)
-            # Reload appointments list in the UI
-            self.frames["UserDashboard"].content_frames["Appointments"].load_data() 
-            self.frames["UserDashboard"].content_frames["Home"].load_data() # Reload for new status tile
-        else:
-            messagebox.showerror("Booking Failed", message)
+        if self._run(services.book_appointment, self.current_user, vehicle_map.get(vehicle_text), service_ids, date_str, time_str,
+                     success_title="Booking Success", failure_title="Booking Failed"):
+            self._reload("UserDashboard", "Appointments", "Home") # Home for the new status tile
 
     def update_appt_status(self, appointment_id, new_status, full_name): #Updates the appointment status from Admin Panel.
-        database.update_appointment_status(appointment_id, new_status, full_name)
-        messagebox.showinfo("Success", f"Appointment status updated to {new_status}.")
+        if not self._run(services.update_appointment_status, self.current_user, appointment_id, new_status, full_name):
+            return
         # Reload both admin and user panels that show status/messages
-        self.frames["AdminDashboard"].content_frames["ManageAppointments"].load_data()
+        self._reload("AdminDashboard", "ManageAppointments")
         if "UserDashboard" in self.frames and self.frames["UserDashboard"].winfo_exists():
             self.frames["UserDashboard"].content_frames["Home"].load_data()
 
     def delete_appointment_by_admin(self, appointment_id, status): #Deletes an appointment if status is Rejected or Completed.
-        if status not in ('Rejected', 'Completed'): 
-             messagebox.showerror("Error", f"Only appointments with status 'Rejected' or 'Completed' can be permanently deleted by Admin. Current status: {status}")
-             return
-
         if not messagebox.askyesno("Confirm Permanent Deletion", f"Are you sure you want to permanently delete appointment ID {appointment_id}? This action cannot be undone."):
             return
+        if self._run(services.delete_appointment, self.current_user, appointment_id, failure_title="Failed"):
+            self._reload("AdminDashboard", "ManageAppointments")
 
-        deleter_id = self.get_current_user_id()
-        success, message = database.delete_appointment(deleter_id, appointment_id, status)
-        
-        if success:
-            messagebox.showinfo("Success", message)
-            self.frames["AdminDashboard"].content_frames["ManageAppointments"].load_data()
-        else:
-            messagebox.showerror("Failed", message)
+    def delete_appointments_by_admin(self, appointments): #Deletes several Rejected/Completed appointments at once; appointments is [(id, status), ...].
+        if not messagebox.askyesno("Confirm Permanent Deletion", f"Are you sure you want to permanently delete {len(appointments)} appointments? This action cannot be undone."):
+            return
+        if self._run(services.delete_appointments, self.current_user, [appt_id for appt_id, status in appointments], failure_title="Failed"):
+            self._reload("AdminDashboard", "ManageAppointments")
 
     def cancel_appointment_by_user(self, appointment_id): #User cancels an appointment.
         if not messagebox.askyesno("Confirm Cancellation", f"Are you sure you want to cancel appointment ID {appointment_id}?"):
             return
-            
-        user_id = self.get_current_user_id()
-        success, message = database.cancel_appointment(user_id, appointment_id)
-        
-        if success:
-            messagebox.showinfo("Success", message)
-            self.frames["UserDashboard"].content_frames["Appointments"].load_data()
-            self.frames["UserDashboard"].content_frames["Home"].load_data()
-        else:
-            messagebox.showerror("Failed", message)
+        if self._run(services.cancel_appointment, self.current_user, appointment_id, failure_title="Failed"):
+            self._reload("UserDashboard", "Appointments", "Home")
             
     def delete_appointment_by_user(self, appointment_id, status): #User permanently deletes a Canceled/Rejected appointment.
-        if status not in ('Canceled', 'Rejected'):
-             messagebox.showerror("Error", f"Only appointments with status 'Canceled' or 'Rejected' can be permanently deleted by User. Current status: {status}")
-             return
-
         if not messagebox.askyesno("Confirm Permanent Deletion", f"Are you sure you want to permanently delete appointment ID {appointment_id}? This removes it from your history."):
             return
-
-        user_id = self.get_current_user_id()
-        success, message = database.delete_appointment(user_id, appointment_id, status)
-        
-        if success:
-            messagebox.showinfo("Success", message)
-            self.frames["UserDashboard"].content_frames["Appointments"].load_data()
-        else:
-            messagebox.showerror("Failed", message)
+        if self._run(services.delete_appointment, self.current_user, appointment_id, failure_title="Failed"):
+            self._reload("UserDashboard", "Appointments")
 
     def reschedule_appointment(self, appointment_id, date_str, time_str): #Handles the user's request to reschedule.
-        try:
-            appt_date = datetime.strptime(date_str, "%Y-%m-%d").date()
-            appt_time = datetime.strptime(time_str, "%H:%M").time()
-            now = datetime.now()
-            
-            if appt_date < now.date():
-                 raise ValueError("Cannot reschedule to a past date.")
+        if self._run(services.reschedule_appointment, self.current_user, appointment_id, date_str, time_str, failure_title="Failed"):
+            self._reload("UserDashboard", "Appointments", "Home")
+            self._reload("AdminDashboard", "ManageAppointments")
 
-            if appt_date == now.date() and appt_time < now.time():
-                 raise ValueError("Cannot reschedule to a time that has already passed today.")
+    # SERVICE OFFER METHODS
+    def save_service_offer(self, service_id, service_name, labor_rate): #Adds (service_id None) or updates an offer. Returns True if saved.
+        return bool(self._run(services.save_service_offer, self.current_user, service_id, service_name, labor_rate))
 
-            min_time = time(6, 0)
-            max_time = time(17, 0) 
-            if not (min_time <= appt_time <= max_time):
-                 raise ValueError("The shop is only open from 6:00 AM to 5:00 PM.")
-
-        except ValueError as e:
-            messagebox.showerror("Input Error", f"Invalid input for rescheduling: {e}")
-            return
-            
-        success, message = database.reschedule_appointment(appointment_id, date_str, time_str)
-        
-        if success:
-            messagebox.showinfo("Success", message)
-            self.frames["UserDashboard"].content_frames["Appointments"].load_data()
-            self.frames["UserDashboard"].content_frames["Home"].load_data()
-            self.frames["AdminDashboard"].content_frames["ManageAppointments"].load_data()
-        else:
-            messagebox.showerror("Failed", message)
+    def delete_service_offer(self, service_id): #Returns True if deleted.
+        return bool(self._run(services.delete_service_offer, self.current_user, service_id, failure_title="Failed"))
 
     #CHAT/MESSAGE METHODS
-    def send_chat_message(self, content): #Admin or User sends a message to the Admin/User.
-        sender_id = self.get_current_user_id()
-        
-        # Admin ID is always 1 (from setup_initial_data)
-        admin_id = 1
-        
-        if self.current_user['user_type'] == 1:          
-            pass
+    def send_chat_message(self, content, receiver_id=None): #Customers always write to the admin; the admin to receiver_id. Returns True if sent.
+        return bool(self._run(services.send_message, self.current_user, content, receiver_id, failure_title="Send Failed", quiet=True))
+
     #HISTORY METHODS 
     def show_deleted_items_history(self):
-        user_id = self.get_current_user_id()
-        user_type = self.current_user.get('user_type', 0)
-        history = database.get_deleted_items_history(user_id, user_type)
+        try:
+            history = services.deleted_items_history(self.current_user)
+        except services.ServiceError as e:
+            messagebox.showerror(e.title, str(e))
+            return
         
         details = "--- DELETED/CANCELED ITEMS HISTORY ---\n\n"
         if history:
             for item in history:
                 details += f"ID: {item['history_id']} | Type: {item['item_type']} | Deleted By: {item['deleter_username']}\n"
-                details += f"Date: {item['deleted_at']}\n"
+                details += f"Date: {frontend.format_timestamp(item['deleted_at_ms'])}\n"
                 details += f"Details: {item['details']}\n"
                 details += "-" * 50 + "\n"
         else:
@@ -294,6 +210,19 @@ class MMAutoRepairShop(tk.Tk): #parent class
         messagebox.showinfo("Deletion History", details)
         
 
+def use_server(url): #Client mode: the app and its screens call server.py at url instead of opening the database file
+    global database, services
+    import client
+    database, services = client.connect(url)
+    frontend.database = database
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MM Auto Repair Shop")
+    parser.add_argument("--server", default=os.environ.get("MM_SERVER_URL"),
+                        help="URL of a shared API server (python server.py), e.g. http://192.168.1.10:8765")
+    args = parser.parse_args()
+    if args.server:
+        use_server(args.server)
     app = MMAutoRepairShop()
     app.mainloop()
\ No newline at end of file
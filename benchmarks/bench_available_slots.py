@@ -0,0 +1,83 @@
+#Availability search benchmark
+#Fills a month of future days with bookings and compares database.get_available_slots (one range
+#query + per-day bitmaps) with asking the database about every slot separately.
+#Usage: python benchmarks/bench_available_slots.py [--days 31] [--slot-minutes 30] [--bookings-per-day 8]
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database  # noqa: E402
+
+
+def _seed(first_day, days, bookings_per_day):
+    database.create_tables()
+    database.setup_initial_data()
+    with database.db_connection() as conn:
+        conn.execute("INSERT INTO users (username, password, full_name, phone_no) VALUES ('slots', 'pw', 'Slot Tester', '0917')")
+        conn.execute("INSERT INTO vehicles (user_id, brand, model, plate_no) VALUES (2, 'Toyota', 'Vios', 'SLOT 1')")
+        conn.executemany("INSERT INTO appointments (user_id, vehicle_id, date, time, status) VALUES (2, 1, ?, ?, ?)",
+                         [((first_day + timedelta(days=d)).isoformat(), f"{6 + (d + n * 3) % 11:02d}:{(n * 10) % 60:02d}",
+                           ('Pending', 'Approved', 'Completed', 'Rejected')[n % 4])
+                          for d in range(days) for n in range(bookings_per_day)])
+        conn.commit()
+
+
+def per_slot_queries(first_day, days, slot_minutes): #The naive approach: one query per candidate slot
+    slots = {}
+    with database.db_connection() as conn:
+        for d in range(days):
+            day_str = (first_day + timedelta(days=d)).isoformat()
+            free = []
+            for start in range(database.SHOP_OPEN_MINUTE, database.SHOP_CLOSE_MINUTE + 1, slot_minutes):
+                end = start + slot_minutes
+                taken = conn.execute("""
+                    SELECT 1 FROM appointments
+                    WHERE date = ? AND time >= ? AND time < ? AND status IN ('Pending', 'Approved', 'Completed') AND is_deleted = 0
+                    LIMIT 1
+                """, (day_str, "%02d:%02d" % divmod(start, 60), "%02d:%02d" % divmod(end, 60))).fetchone()
+                if not taken:
+                    free.append("%02d:%02d" % divmod(start, 60))
+            slots[day_str] = free
+    return slots
+
+
+def _best_of(runs, func, *args):
+    best, result = None, None
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="get_available_slots vs one query per slot")
+    parser.add_argument("--days", type=int, default=31)
+    parser.add_argument("--slot-minutes", type=int, default=30)
+    parser.add_argument("--bookings-per-day", type=int, default=8)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    database.DATABASE_NAME = os.path.join(tempfile.mkdtemp(prefix="mm_slots_"), "slots.db")
+    first_day = date.today() + timedelta(days=1)
+    _seed(first_day, args.days, args.bookings_per_day)
+    last_day = first_day + timedelta(days=args.days - 1)
+
+    t_bitmap, bitmap = _best_of(args.runs, database.get_available_slots, first_day.isoformat(), last_day.isoformat(), args.slot_minutes)
+    t_naive, naive = _best_of(args.runs, per_slot_queries, first_day, args.days, args.slot_minutes)
+    database.close_connections()
+
+    free = sum(len(v) for v in bitmap.values())
+    print(f"{args.days} days, {args.slot_minutes}-minute slots, {free} free slots found")
+    print(f"get_available_slots (range query + bitmap): {t_bitmap * 1000:8.2f} ms")
+    print(f"one query per slot:                         {t_naive * 1000:8.2f} ms")
+    print("results match" if bitmap == naive else "RESULTS DIFFER")
+
+
+if __name__ == "__main__":
+    main()
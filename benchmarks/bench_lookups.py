@@ -0,0 +1,75 @@
+#Front-desk lookup benchmark
+#Seeds customers with phones written in mixed formats and one vehicle each, then times the
+#normalized-column lookups (find_user_by_phone, find_vehicle_by_plate_prefix/suffix) against
+#LIKE '%...%' scans over the raw phone_no/plate_no columns.
+#Usage: python benchmarks/bench_lookups.py [--customers 100000]
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database  # noqa: E402
+
+PHONE_FORMATS = ["0917{0:07d}", "+63 917 {0:07d}", "0917-{0:07d}", "(0917) {0:07d}"]
+
+
+def _seed(customers):
+    database.create_tables()
+    database.setup_initial_data()
+    with database.db_connection() as conn:
+        conn.executemany("INSERT INTO users (username, password, full_name, phone_no) VALUES (?, ?, ?, ?)",
+                         [(f"walkin{i}", "pw", f"Walk-in {i}", PHONE_FORMATS[i % 4].format(i)) for i in range(customers)])
+        conn.executemany("INSERT INTO vehicles (user_id, brand, model, plate_no) VALUES (?, 'Toyota', 'Vios', ?)",
+                         [(2 + i, f"{chr(65 + i % 26)}{chr(65 + i // 26 % 26)}{chr(65 + i // 676 % 26)} {i % 10000:04d}") for i in range(customers)])
+        conn.commit()
+
+
+def like_phone(text):
+    with database.db_connection() as conn:
+        return conn.execute("SELECT user_id FROM users WHERE phone_no LIKE ? LIMIT 25", (f"%{text}%",)).fetchall()
+
+
+def like_plate(text):
+    with database.db_connection() as conn:
+        return conn.execute("SELECT vehicle_id FROM vehicles WHERE plate_no LIKE ? LIMIT 25", (f"%{text}%",)).fetchall()
+
+
+def _best_of(runs, func, *args):
+    best = None
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Normalized phone/plate lookups vs LIKE scans")
+    parser.add_argument("--customers", type=int, default=100000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    database.DATABASE_NAME = os.path.join(tempfile.mkdtemp(prefix="mm_lookup_"), "lookup.db")
+    _seed(args.customers)
+    last = args.customers - 1
+    cases = [
+        ("phone, full number", database.find_user_by_phone, f"+63 917 {last:07d}", like_phone, f"{last:07d}"),
+        ("phone, last 4 digits", database.find_user_by_phone, f"{last % 10000:04d}", like_phone, f"{last % 10000:04d}"),
+        ("plate prefix", database.find_vehicle_by_plate_prefix, "ZZ", like_plate, "ZZ"),
+        ("plate suffix", database.find_vehicle_by_plate_suffix, "9999", like_plate, "9999"),
+        ("phone, start or end", database.find_user_by_phone, "0999", like_phone, "0999"),
+    ]
+    print(f"{args.customers:,} customers")
+    print(f"{'lookup':<22} {'hits':>5} {'indexed ms':>11} {'LIKE scan ms':>13}")
+    for label, lookup, typed, scan, pattern in cases:
+        hits = len(lookup(typed, 25))
+        print(f"{label:<22} {hits:>5} {_best_of(args.runs, lookup, typed, 25) * 1000:>11.3f} "
+              f"{_best_of(args.runs, scan, pattern) * 1000:>13.3f}")
+    database.close_connections()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#Reference data cache benchmark
+#Replays screen navigation (every visit reads the service offers, admin visits also read the user
+#list) with the reference cache and with a direct query per visit. Every --write-every visits
+#another connection edits a service offer, so the cache has to notice it through PRAGMA data_version.
+#Usage: python benchmarks/bench_reference_cache.py [--users 5000] [--visits 2000] [--write-every 100]
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database  # noqa: E402
+
+
+def _seed(users):
+    database.create_tables()
+    database.setup_initial_data()
+    with database.db_connection() as conn:
+        conn.executemany("INSERT INTO users (username, password, full_name, phone_no) VALUES (?, ?, ?, ?)",
+                         [(f"cust{i}", "pw", f"Customer {i}", f"0917{i:07d}") for i in range(users)])
+        conn.commit()
+
+
+def direct(sql, record_type):
+    with database.db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(sql)
+        rows = cursor.fetchall()
+    return database._records(record_type, cursor.description, rows)
+
+
+def replay(visits, write_every, cached, other):
+    t0 = time.perf_counter()
+    for n in range(visits):
+        if write_every and n % write_every == 0:
+            other.execute("UPDATE service_offers SET labor_rate = labor_rate + 1 WHERE service_id = 1")
+            other.commit()
+        if cached:
+            offers = database.get_all_service_offers()
+            users = database.get_all_users() if n % 2 else None
+        else:
+            offers = direct(database._ALL_SERVICE_OFFERS_SQL, database.ServiceRecord)
+            users = direct(database._ALL_USERS_SQL, database.UserRecord) if n % 2 else None
+        if offers[0]['labor_rate'] is None or (users is not None and not users):
+            raise AssertionError("empty reference data")
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reference cache vs a query per screen visit")
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--visits", type=int, default=2000)
+    parser.add_argument("--write-every", type=int, default=100, help="visits between external edits (0 = never)")
+    args = parser.parse_args()
+
+    database.DATABASE_NAME = os.path.join(tempfile.mkdtemp(prefix="mm_cache_"), "cache.db")
+    _seed(args.users)
+    other = sqlite3.connect(database.DATABASE_NAME)
+
+    t_direct = replay(args.visits, args.write_every, False, other)
+    t_cached = replay(args.visits, args.write_every, True, other)
+    stats = database.get_cache_stats()
+    database.close_connections()
+    other.close()
+
+    print(f"{args.visits} visits, {args.users:,} users, external edit every {args.write_every} visits")
+    print(f"query per visit: {t_direct * 1000:9.1f} ms ({t_direct / args.visits * 1000:.3f} ms/visit)")
+    print(f"reference cache: {t_cached * 1000:9.1f} ms ({t_cached / args.visits * 1000:.3f} ms/visit)")
+    print(f"hits: {stats['hits']}  misses: {stats['misses']}  invalidations: {stats['invalidations']}  "
+          f"hit ratio: {stats['hit_ratio']:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#Row object benchmark
+#Compares the old per-row dicts (dict(zip(cols, row))) with database Records and sqlite3.Row
+#on a generated appointments table. Reports build time, retained memory and key-access speed.
+#Usage: python benchmarks/bench_row_objects.py [--rows 1000000]
+import argparse
+import gc
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database  # noqa: E402
+
+QUERY = "SELECT appointment_id, user_id, vehicle_id, date, time, status, status_message, is_deleted FROM appointments"
+STATUSES = ('Pending', 'Approved', 'Rejected', 'Canceled', 'Completed')
+
+
+def build_database(path, rows):
+    database.DATABASE_NAME = path
+    database.set_storage_profile("bulk_import")
+    database.create_tables()
+    start = date(2015, 1, 1)
+    with database.db_connection() as conn:
+        conn.execute("INSERT INTO users (user_id, username, password, full_name, phone_no) VALUES (2, 'bench', 'pw', 'Bench User', '0917')")
+        conn.execute("INSERT INTO vehicles (vehicle_id, user_id, brand, model, plate_no) VALUES (1, 2, 'Toyota', 'Vios', 'BENCH 1')")
+        conn.executemany(
+            "INSERT INTO appointments (user_id, vehicle_id, date, time, status, status_message) VALUES (2, 1, ?, ?, ?, ?)",
+            (((start + timedelta(days=i // 12)).isoformat(), f"{6 + i % 12:02d}:00", STATUSES[i % 5],
+              None if i % 3 else "Appointment Approved please bring your vehicle at our shop") for i in range(rows)))
+        conn.commit()
+
+
+def as_dicts(cursor, rows):
+    cols = [col[0] for col in cursor.description]
+    return [dict(zip(cols, row)) for row in rows]
+
+
+def as_records(cursor, rows):
+    return database._records(database.AppointmentRecord, cursor.description, rows)
+
+
+def measure(label, conn, convert, row_factory=None):
+    gc.collect()
+    cursor = conn.cursor()
+    if row_factory:
+        cursor.row_factory = row_factory
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    cursor.execute(QUERY)
+    raw = cursor.fetchall()
+    t_fetch = time.perf_counter() - t0
+    result = convert(cursor, raw) if convert else raw
+    t_total = time.perf_counter() - t0
+    del raw
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    t0 = time.perf_counter()
+    total = 0
+    for row in result:
+        if row['status'] == 'Completed':
+            total += row['appointment_id']
+    t_access = time.perf_counter() - t0
+
+    n = len(result)
+    print(f"{label:<14} {t_total:>8.2f}s ({t_total - t_fetch:>5.2f}s mapping) {retained / 1e6:>9.1f} MB "
+          f"{retained / n:>8.0f} B/row {n / t_access / 1e6:>8.2f} M lookups/s")
+    del result
+    gc.collect()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-row dicts vs Records vs sqlite3.Row")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="mm_rows_"), "rows.db")
+    print(f"Generating {args.rows:,} appointments...")
+    build_database(path, args.rows)
+    database.close_connections()
+
+    conn = sqlite3.connect(path)
+    print(f"{'row type':<14} {'load time':>26} {'retained':>12} {'per row':>10} {'key access':>17}")
+    measure("dict (old)", conn, as_dicts)
+    measure("Record", conn, as_records)
+    measure("sqlite3.Row", conn, None, row_factory=sqlite3.Row)
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
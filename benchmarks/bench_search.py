@@ -0,0 +1,86 @@
+#Full-text search benchmark
+#Seeds users, vehicles, messages and deletion history (100k+ indexed rows by default), then times
+#database.search against the LIKE '%...%' scans the screens used before the search index existed.
+#Usage: python benchmarks/bench_search.py [--customers 20000] [--messages 100000] [--history 5000]
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database  # noqa: E402
+
+FIRST = ["Mark", "Anthony", "Mariel", "Jose", "Ana", "Carlo", "Liza", "Ramon", "Grace", "Paolo"]
+LAST = ["Cabogsan", "Lascano", "Santos", "Reyes", "Cruz", "Bautista", "Garcia", "Mendoza", "Torres", "Flores"]
+BRANDS = [("Toyota", "Vios"), ("Honda", "Civic"), ("Mitsubishi", "Mirage"), ("Nissan", "Almera"), ("Ford", "Ranger")]
+PHRASES = ["Is my car ready for pickup?", "The brakes are squeaking again", "Can I move my appointment to Friday?",
+           "Thank you, see you tomorrow", "How much is an oil change?", "Please check the aircon too"]
+QUERIES = ["mark", "santos", "toyota vios", "brake", "aircon", "BAC 00", "0917001", "friday appointment"]
+
+
+def _seed(customers, messages, history):
+    database.create_tables()
+    database.setup_initial_data()
+    with database.db_connection() as conn:
+        conn.executemany("INSERT INTO users (username, password, full_name, phone_no) VALUES (?, ?, ?, ?)",
+                         [(f"user{i}", "pw", f"{FIRST[i % 10]} {LAST[i // 10 % 10]} {i}", f"0917{i:07d}") for i in range(customers)])
+        conn.executemany("INSERT INTO vehicles (user_id, brand, model, plate_no) VALUES (?, ?, ?, ?)",
+                         [(2 + i, *BRANDS[i % 5], f"{chr(65 + i % 26)}{chr(65 + i // 26 % 26)}C {i % 10000:04d}") for i in range(customers)])
+        conn.executemany("INSERT INTO messages (sender_id, receiver_id, content, timestamp, sent_at_ms) VALUES (?, ?, ?, '2025-01-01 08:00:00', ?)",
+                         [((2 + i % customers, 1) if i % 2 else (1, 2 + i % customers)) + (f"{PHRASES[i % 6]} #{i}", 1735689600000 + i)
+                          for i in range(messages)])
+        conn.executemany("INSERT INTO deleted_items_history (item_type, item_id, deleter_id, details, deleted_at, deleted_at_ms) VALUES (?, ?, ?, ?, '2025-01-01 08:00:00', ?)",
+                         [("Vehicle", i, 1, f"vehicle_id: {i} | brand: {BRANDS[i % 5][0]} | plate_no: OLD {i:04d}", 1735689600000 + i)
+                          for i in range(history)])
+        conn.commit()
+
+
+def like_scan(text): #What a search box costs without the index: LIKE scans over every searchable table
+    pattern = f"%{text}%"
+    with database.db_connection() as conn:
+        rows = conn.execute("SELECT user_id FROM users WHERE full_name LIKE ? OR username LIKE ? OR phone_no LIKE ? LIMIT 20",
+                            (pattern, pattern, pattern)).fetchall()
+        rows += conn.execute("SELECT vehicle_id FROM vehicles WHERE plate_no LIKE ? OR brand || ' ' || model LIKE ? LIMIT 20",
+                             (pattern, pattern)).fetchall()
+        rows += conn.execute("SELECT message_id FROM messages WHERE content LIKE ? LIMIT 20", (pattern,)).fetchall()
+        rows += conn.execute("SELECT history_id FROM deleted_items_history WHERE details LIKE ? LIMIT 20", (pattern,)).fetchall()
+    return rows
+
+
+def _best_of(runs, func, *args):
+    best = None
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="database.search vs LIKE scans")
+    parser.add_argument("--customers", type=int, default=20000)
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument("--history", type=int, default=5000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    database.DATABASE_NAME = os.path.join(tempfile.mkdtemp(prefix="mm_search_"), "search.db")
+    t0 = time.perf_counter()
+    _seed(args.customers, args.messages, args.history)
+    with database.db_connection() as conn:
+        indexed = conn.execute("SELECT COUNT(*) FROM search_index").fetchone()[0]
+    print(f"Seeded and indexed {indexed:,} rows in {time.perf_counter() - t0:.1f}s")
+
+    print(f"{'query':<22} {'hits':>5} {'search() ms':>12} {'LIKE scan ms':>13}")
+    for text in QUERIES:
+        hits = len(database.search(text))
+        t_fts = _best_of(args.runs, database.search, text)
+        t_like = _best_of(args.runs, like_scan, text)
+        print(f"{text:<22} {hits:>5} {t_fts * 1000:>12.2f} {t_like * 1000:>13.2f}")
+    database.close_connections()
+
+
+if __name__ == "__main__":
+    main()
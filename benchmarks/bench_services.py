@@ -0,0 +1,82 @@
+#Headless booking flow benchmark
+#Runs the desktop app's whole booking life cycle through services.py, with no window: customers book,
+#the admin approves and completes each job, and customers clean up rejected bookings. Reports flows per
+#second and the time spent in each step, so changes to the shop rules can be measured without Tk.
+#Usage: python benchmarks/bench_services.py [--customers 50] [--bookings 20]
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database  # noqa: E402
+import services  # noqa: E402
+
+
+def _seed(customers):
+    database.create_tables()
+    database.setup_initial_data()
+    users = []
+    for i in range(customers):
+        services.register(f"flow{i}", f"Flow Customer {i}", f"0917{i:07d}", "pw")
+        user = services.login(f"flow{i}", "pw")
+        services.add_vehicle(user, "Toyota", "Vios", f"FLW {i:04d}")
+        users.append((user, database.get_user_vehicles(user['user_id'])[0]['vehicle_id']))
+    return users
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Booking -> approve -> complete through services.py, no UI")
+    parser.add_argument("--customers", type=int, default=50)
+    parser.add_argument("--bookings", type=int, default=20, help="bookings per customer")
+    args = parser.parse_args()
+
+    database.DATABASE_NAME = os.path.join(tempfile.mkdtemp(prefix="mm_services_"), "services.db")
+    users = _seed(args.customers)
+    admin = services.login("Admin", "admin123")
+    now = datetime.now()
+    first_day = date.today() + timedelta(days=1)
+
+    steps = {'book': 0.0, 'approve': 0.0, 'complete': 0.0, 'reject+delete': 0.0}
+    flows = errors = 0
+    t_total = time.perf_counter()
+    for n in range(args.bookings):
+        for i, (user, vehicle_id) in enumerate(users):
+            slot = n * len(users) + i
+            day = (first_day + timedelta(days=slot // 12)).isoformat()
+            hour = f"{6 + slot % 12:02d}:00"
+            try:
+                t0 = time.perf_counter()
+                services.book_appointment(user, vehicle_id, [1, 2], day, hour, now=now)
+                t1 = time.perf_counter()
+                with database.db_connection() as conn:
+                    appt_id = conn.execute("SELECT MAX(appointment_id) FROM appointments").fetchone()[0]
+                if slot % 5 == 4: # every fifth booking is turned down and removed by the customer
+                    t2 = time.perf_counter()
+                    services.update_appointment_status(admin, appt_id, 'Rejected')
+                    services.delete_appointment(user, appt_id)
+                    steps['reject+delete'] += time.perf_counter() - t2
+                else:
+                    t2 = time.perf_counter()
+                    services.update_appointment_status(admin, appt_id, 'Approved')
+                    t3 = time.perf_counter()
+                    services.update_appointment_status(admin, appt_id, 'Completed', user['full_name'])
+                    steps['approve'] += t3 - t2
+                    steps['complete'] += time.perf_counter() - t3
+                steps['book'] += t1 - t0
+                flows += 1
+            except services.ServiceError as e:
+                errors += 1
+                print("  error:", type(e).__name__, e)
+    elapsed = time.perf_counter() - t_total
+    database.close_connections()
+
+    print(f"{flows} booking flows ({args.customers} customers x {args.bookings}) in {elapsed:.2f}s: {flows / elapsed:,.0f} flows/s, {errors} errors")
+    for step, spent in steps.items():
+        print(f"  {step:<14} {spent * 1000:9.1f} ms total")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#Storage profile benchmark
+#Runs the same mixed front-desk workload (customers booking while the admin lists every appointment)
+#against a fresh database for each entry in database.STORAGE_PROFILES and prints throughput/latency.
+#Usage: python benchmarks/bench_storage_profiles.py [--seconds 5] [--writers 4] [--readers 2] [--seed-rows 1000] [--think-ms 5]
+#--think-ms is the pause between bookings per writer (0 = book as fast as possible).
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database  # noqa: E402
+
+
+def _percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _seed(seed_rows): # Creates customers/vehicles and some history so reads have real work to do
+    database.create_tables()
+    database.setup_initial_data()
+    with database.db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany("INSERT INTO users (username, password, full_name, phone_no) VALUES (?, ?, ?, ?)",
+                           [(f"cust{i}", "pw", f"Customer {i}", f"0917{i:07d}") for i in range(200)])
+        cursor.executemany("INSERT INTO vehicles (user_id, brand, model, plate_no) VALUES (?, ?, ?, ?)",
+                           [(2 + i, "Toyota", "Vios", f"SEED {i:04d}") for i in range(200)])
+        start = date(2020, 1, 1)
+        for i in range(seed_rows):
+            day = (start + timedelta(days=i // 12)).isoformat()
+            slot = f"{6 + i % 12:02d}:00"
+            cursor.execute("INSERT INTO appointments (user_id, vehicle_id, date, time, status) VALUES (?, ?, ?, ?, 'Completed')",
+                           (2 + i % 200, 1 + i % 200, day, slot))
+            cursor.execute("INSERT INTO appointment_services (appointment_id, service_id, service_name, labor_rate) VALUES (?, 1, 'Oil Change', 145.0)",
+                           (cursor.lastrowid,))
+        conn.commit()
+
+
+def run_profile(profile_name, seconds, writers, readers, seed_rows, think_ms=0):
+    tmp_dir = tempfile.mkdtemp(prefix="mm_bench_")
+    database.DATABASE_NAME = os.path.join(tmp_dir, "bench.db")
+    database.set_storage_profile(profile_name)
+    _seed(seed_rows)
+
+    write_lat, read_lat, errors = [], [], []
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + seconds
+
+    def writer(worker_id):
+        n = 0
+        local = []
+        while time.perf_counter() < stop_at:
+            # Every booking gets its own future slot so failures are contention, not conflicts
+            day = (date(2040, 1, 1) + timedelta(days=(worker_id * 100000 + n) // 12)).isoformat()
+            slot = f"{6 + n % 12:02d}:{worker_id:02d}"
+            t0 = time.perf_counter()
+            try:
+                ok, _ = database.add_appointment(2 + worker_id, 1 + worker_id, [1, 2], day, slot)
+                if not ok:
+                    with lock:
+                        errors.append("rejected")
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+            local.append(time.perf_counter() - t0)
+            n += 1
+            if think_ms:
+                time.sleep(think_ms / 1000.0)
+        with lock:
+            write_lat.extend(local)
+
+    def reader():
+        local = []
+        while time.perf_counter() < stop_at:
+            t0 = time.perf_counter()
+            try:
+                database.get_all_appointments()
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+            local.append(time.perf_counter() - t0)
+        with lock:
+            read_lat.extend(local)
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    database.close_connections()
+
+    return {
+        "profile": profile_name,
+        "writes_per_s": len(write_lat) / seconds,
+        "write_p50_ms": _percentile(write_lat, 50) * 1000,
+        "write_p95_ms": _percentile(write_lat, 95) * 1000,
+        "reads_per_s": len(read_lat) / seconds,
+        "read_p50_ms": _percentile(read_lat, 50) * 1000,
+        "read_p95_ms": _percentile(read_lat, 95) * 1000,
+        "errors": len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare database.STORAGE_PROFILES under a mixed read/write load.")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=2)
+    parser.add_argument("--seed-rows", type=int, default=1000)
+    parser.add_argument("--think-ms", type=float, default=5.0)
+    parser.add_argument("--profiles", nargs="*", default=list(database.STORAGE_PROFILES))
+    args = parser.parse_args()
+
+    header = "{:<12} {:>9} {:>10} {:>10} {:>9} {:>10} {:>10} {:>7}".format(
+        "profile", "writes/s", "w p50 ms", "w p95 ms", "reads/s", "r p50 ms", "r p95 ms", "errors")
+    print(header)
+    print("-" * len(header))
+    for profile_name in args.profiles:
+        r = run_profile(profile_name, args.seconds, args.writers, args.readers, args.seed_rows, args.think_ms)
+        print("{profile:<12} {writes_per_s:>9.1f} {write_p50_ms:>10.2f} {write_p95_ms:>10.2f} "
+              "{reads_per_s:>9.1f} {read_p50_ms:>10.2f} {read_p95_ms:>10.2f} {errors:>7}".format(**r))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#Customer Home panel benchmark
+#Times what HomePanel.load_data used to run (six database calls, one of them loading every
+#appointment of the customer to count the Completed ones) against database.get_user_dashboard.
+#Usage: python benchmarks/bench_user_dashboard.py [--appointments 2000] [--runs 50]
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database  # noqa: E402
+
+STATUSES = ('Completed', 'Completed', 'Canceled', 'Rejected', 'Completed')
+
+
+def _seed(appointments):
+    database.create_tables()
+    database.setup_initial_data()
+    with database.db_connection() as conn:
+        conn.execute("INSERT INTO users (username, password, full_name, phone_no) VALUES ('regular', 'pw', 'Regular Customer', '0917')")
+        conn.executemany("INSERT INTO vehicles (user_id, brand, model, plate_no) VALUES (2, 'Toyota', 'Vios', ?)",
+                         [(f"HOME {i}",) for i in range(3)])
+        start = date.today() - timedelta(days=appointments // 4 + 30)
+        rows = [((start + timedelta(days=i // 4)).isoformat(), f"{6 + i % 4 * 2:02d}:00", STATUSES[i % 5]) for i in range(appointments)]
+        rows.append(((date.today() + timedelta(days=7)).isoformat(), "09:00", "Pending"))
+        conn.executemany("INSERT INTO appointments (user_id, vehicle_id, date, time, status, total_cost, service_count, services_summary) "
+                         "VALUES (2, 1, ?, ?, ?, 145.0, 1, 'Oil Change')", rows)
+        conn.executemany("INSERT INTO appointment_services (appointment_id, service_id, service_name, labor_rate) VALUES (?, 1, 'Oil Change', 145.0)",
+                         [(n,) for n in range(1, len(rows) + 1)])
+        conn.commit()
+
+
+def six_calls(user_id): #HomePanel.load_data before get_user_dashboard
+    database.get_upcoming_appointment(user_id)
+    database.get_user_vehicles(user_id)
+    database.get_completed_appointments_count(user_id)
+    appointments = database.get_user_appointments(user_id)
+    sum(1 for appt in appointments if appt['status'] == 'Completed')
+    database.get_appointment_status_message(user_id)
+    database.get_all_service_offers()
+
+
+def _timings(runs, func, *args):
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        func(*args)
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    return samples[len(samples) // 2] * 1000, samples[int(len(samples) * 0.95)] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HomePanel: six calls vs get_user_dashboard")
+    parser.add_argument("--appointments", type=int, default=2000, help="appointments of the customer")
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    database.DATABASE_NAME = os.path.join(tempfile.mkdtemp(prefix="mm_home_"), "home.db")
+    _seed(args.appointments)
+    database.get_all_service_offers() # the offers list is cached either way
+
+    before = _timings(args.runs, six_calls, 2)
+    after = _timings(args.runs, database.get_user_dashboard, 2)
+    database.close_connections()
+
+    print(f"customer with {args.appointments:,} appointments, {args.runs} runs")
+    print(f"{'':<26} {'p50 ms':>8} {'p95 ms':>8}")
+    print(f"{'six calls (before)':<26} {before[0]:>8.2f} {before[1]:>8.2f}")
+    print(f"{'get_user_dashboard':<26} {after[0]:>8.2f} {after[1]:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
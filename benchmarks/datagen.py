@@ -0,0 +1,266 @@
+#Synthetic shop data generator
+#Fills a database file with a repair shop's worth of customers, vehicles, appointments (with their
+#appointment_services rows), chat histories and deletion history. Everything is drawn from one
+#seeded random.Random, so the same --scale and --seed always produce the same database.
+#Triggers are dropped while loading and put back afterwards; the trigger-maintained tables
+#(counters, rollups, inbox, search index, lookup columns) are then rebuilt in one pass each.
+#Usage: python benchmarks/datagen.py OUT.db [--scale small|medium|large] [--seed 42]
+#       [--customers N] [--vehicles N] [--appointments N] [--messages N] [--years 5]
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database  # noqa: E402
+
+SCALES = {
+    "small": {"customers": 1_000, "vehicles": 2_000, "appointments": 20_000, "messages": 20_000},
+    "medium": {"customers": 10_000, "vehicles": 20_000, "appointments": 200_000, "messages": 200_000},
+    "large": {"customers": 100_000, "vehicles": 200_000, "appointments": 2_000_000, "messages": 1_000_000},
+}
+
+FIRST_NAMES = ["Mark", "Anthony", "Mariel", "Jose", "Ana", "Carlo", "Liza", "Ramon", "Grace", "Paolo", "Joy",
+               "Miguel", "Andrea", "Rafael", "Kristine", "Noel", "Janine", "Adrian", "Camille", "Renz"]
+LAST_NAMES = ["Cabogsan", "Lascano", "Santos", "Reyes", "Cruz", "Bautista", "Garcia", "Mendoza", "Torres",
+              "Flores", "Villanueva", "Ramos", "Aquino", "Castillo", "Dela Cruz", "Navarro", "Gonzales", "Tan"]
+PHONE_FORMATS = [  # how customers type their mobile number (d = the 10 digits after the leading 0)
+    lambda d: f"0{d}", lambda d: f"0{d}", lambda d: f"+63 {d}",
+    lambda d: f"0{d[:3]}-{d[3:6]}-{d[6:]}", lambda d: f"(0{d[:3]}) {d[3:]}",
+]
+VEHICLES = [  # (brand, model, weight)
+    ("Toyota", "Vios", 18), ("Toyota", "Innova", 10), ("Mitsubishi", "Mirage", 10), ("Honda", "Civic", 7),
+    ("Honda", "City", 8), ("Nissan", "Almera", 6), ("Ford", "Ranger", 6), ("Suzuki", "Ertiga", 6),
+    ("Hyundai", "Accent", 5), ("Isuzu", "D-Max", 5), ("Mitsubishi", "Montero Sport", 5), ("Kia", "Picanto", 3),
+]
+PAST_STATUSES = [("Completed", 75), ("Canceled", 15), ("Rejected", 10)]
+STATUS_MESSAGES = {
+    "Completed": "Your vehicle service is complete. Please proceed to the shop for pickup and payment. Thank you!",
+    "Canceled": "Appointment Canceled by user.",
+    "Rejected": "Sorry, this date and time is fully booked. Please choose another schedule.",
+    "Approved": "Appointment Approved please bring your vehicle at our shop to start the process, Thank you!",
+}
+SERVICE_COUNT_WEIGHTS = [60, 30, 10]  # one, two or three services per appointment
+CUSTOMER_PHRASES = ["Good morning, is my car ready?", "How much is the oil change?", "Can I move my appointment?",
+                    "The brakes are squeaking again", "Please check the aircon too", "Thank you!",
+                    "What time do you open on Saturday?", "Is the battery under warranty?"]
+ADMIN_PHRASES = ["Good day! Yes, it is ready for pickup.", "Oil change is PHP 145 for labor.",
+                 "Sure, please pick a new schedule in the app.", "Please bring it in so we can inspect it.",
+                 "Noted, we will include it.", "You're welcome!", "We open at 6:00 AM.", "Yes, one year warranty."]
+SLOT_TIMES = [f"{minute // 60:02d}:{minute % 60:02d}" for minute in range(6 * 60, 17 * 60 + 1, 30)]
+BATCH = 20_000
+
+
+def _skewed(rng, n, power=1.6): #0..n-1, lower numbers more often (regular customers book more)
+    return min(n - 1, int(n * rng.random() ** power))
+
+
+def _customers(rng, count):
+    now = datetime.now()
+    for i in range(count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        phone = rng.choice(PHONE_FORMATS)(f"9{rng.randrange(10 ** 9):09d}")
+        last_login = None
+        if rng.random() < 0.7:
+            last_login = (now - timedelta(minutes=rng.randrange(90 * 24 * 60))).strftime(database.TIMESTAMP_TEXT_FORMAT)
+        yield (f"{first.lower().replace(' ', '')}.{last.lower().replace(' ', '')}{i}", "password",
+               f"{first} {last}", phone, 0, last_login)
+
+
+def _plate(i): #Unique per index: three letters and four digits, e.g. "NDA 4821"
+    letters = i // 10000
+    return (chr(65 + letters // 676 % 26) + chr(65 + letters // 26 % 26) + chr(65 + letters % 26)
+            + f" {(i * 7919) % 10000:04d}")
+
+
+def _vehicles(rng, count, first_user_id, customers):
+    brands = [(brand, model) for brand, model, _ in VEHICLES]
+    weights = [weight for _, _, weight in VEHICLES]
+    for i in range(count):
+        # Every customer gets one vehicle first; the rest go mostly to a few fleet owners
+        owner = i if i < customers else _skewed(rng, customers, 3.0)
+        brand, model = rng.choices(brands, weights)[0]
+        yield (first_user_id + owner, brand, model, _plate(i))
+
+
+def _appointments(rng, count, vehicles, offers, years): #(appointment rows, appointment_services rows) batches in date order
+    statuses = [status for status, _ in PAST_STATUSES]
+    weights = [weight for _, weight in PAST_STATUSES]
+    today = date.today()
+    first_day = today - timedelta(days=365 * years)
+    days = (today - first_day).days
+    # About 1% are still to come: Pending/Approved, one per slot, over the next weeks
+    future = min(count // 100, 60 * len(SLOT_TIMES))
+    past = count - future
+    per_day = past / days
+
+    appointment_id, appt_rows, service_rows = 0, [], []
+
+    def add(day, slot, status):
+        nonlocal appointment_id
+        appointment_id += 1
+        vehicle_index = _skewed(rng, len(vehicles))
+        vehicle_id, user_id = vehicles[vehicle_index]
+        picked = sorted(rng.sample(offers, rng.choices([1, 2, 3], SERVICE_COUNT_WEIGHTS)[0]), key=lambda o: o[1])
+        is_deleted = 1 if status in ("Canceled", "Rejected") and rng.random() < 0.05 else 0
+        appt_rows.append((appointment_id, user_id, vehicle_id, day, slot, status,
+                          STATUS_MESSAGES.get(status) if rng.random() < 0.8 else None, is_deleted,
+                          sum(rate for _, _, rate in picked), len(picked), " | ".join(name for _, name, _ in picked)))
+        service_rows.extend((appointment_id, service_id, name, rate) for service_id, name, rate in picked)
+
+    produced = 0
+    for d in range(days):
+        day = (first_day + timedelta(days=d)).isoformat()
+        target = round(per_day * (d + 1))
+        for _ in range(target - produced):
+            add(day, rng.choice(SLOT_TIMES), rng.choices(statuses, weights)[0])
+        produced = target
+        if len(appt_rows) >= BATCH:
+            yield appt_rows, service_rows
+            appt_rows, service_rows = [], []
+    for n in range(future):
+        day = (today + timedelta(days=1 + n // len(SLOT_TIMES))).isoformat()
+        add(day, SLOT_TIMES[n % len(SLOT_TIMES)], "Approved" if rng.random() < 0.4 else "Pending")
+    if appt_rows:
+        yield appt_rows, service_rows
+
+
+def _messages(rng, count, admin_id, first_user_id, customers, years): #Admin <-> customer chats in time order; a few customers write most
+    now_ms = database.epoch_ms()
+    start_ms = now_ms - years * 365 * 24 * 3600 * 1000
+    step = (now_ms - start_ms) / max(count, 1)
+    unread_after = now_ms - 24 * 3600 * 1000
+    for i in range(count):
+        sent_ms = int(start_ms + i * step + rng.random() * step)
+        customer_id = first_user_id + _skewed(rng, customers, 2.5)
+        from_customer = rng.random() < 0.55
+        sender, receiver = (customer_id, admin_id) if from_customer else (admin_id, customer_id)
+        content = rng.choice(CUSTOMER_PHRASES if from_customer else ADMIN_PHRASES)
+        read_ms = None if sent_ms > unread_after else sent_ms + rng.randrange(60_000, 4 * 3600_000)
+        text = datetime.fromtimestamp(sent_ms / 1000).strftime(database.TIMESTAMP_TEXT_FORMAT)
+        yield (sender, receiver, content, text, sent_ms, read_ms)
+
+
+def _history(rng, count, first_user_id, customers, years):
+    now_ms = database.epoch_ms()
+    start_ms = now_ms - years * 365 * 24 * 3600 * 1000
+    for i in range(count):
+        deleted_ms = start_ms + (now_ms - start_ms) * i // max(count, 1)
+        if rng.random() < 0.7:
+            deleter, item_type = first_user_id + _skewed(rng, customers), "Appointment"
+            details = f"appointment_id: {i + 1} | status: Canceled | username: customer{deleter}"
+        else:
+            deleter, item_type = 1, "Vehicle"
+            details = f"vehicle_id: {i + 1} | brand: Toyota | model: Vios | plate_no: OLD {i % 10000:04d}"
+        text = datetime.fromtimestamp(deleted_ms / 1000).strftime(database.TIMESTAMP_TEXT_FORMAT)
+        yield (deleter, item_type, i + 1, details, text, deleted_ms)
+
+
+def _batches(rows, size=BATCH):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _rebuild_derived(conn): #The trigger-maintained tables, recomputed from the loaded rows
+    database._install_lookup_columns(conn)
+    database._rebuild_shop_counters(conn)
+    database._rebuild_report_rollups(conn)
+    database._rebuild_conversations(conn)
+    if database._has_search_index(conn):
+        database._rebuild_search_index(conn)
+
+
+def generate(path, customers, vehicles, appointments, messages, years=5, seed=42, history=None, verbose=True):
+    # Creates path (which must not exist yet) and fills it; returns the row count of each table
+    if os.path.exists(path):
+        raise FileExistsError(f"{path} already exists; datagen only writes new files.")
+    rng = random.Random(seed)
+    history = appointments // 100 if history is None else history
+    say = print if verbose else (lambda *a, **k: None)
+
+    database.DATABASE_NAME = path
+    database.set_storage_profile("bulk_import")
+    database.create_tables()
+    database.setup_initial_data()
+    t0 = time.perf_counter()
+
+    with database.db_connection() as conn:
+        triggers = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'").fetchall()
+        for name, _ in triggers:
+            conn.execute(f"DROP TRIGGER {name}")
+        conn.commit()
+
+        admin_id = conn.execute("SELECT user_id FROM users WHERE user_type = 1").fetchone()[0]
+        first_user_id = conn.execute("SELECT IFNULL(MAX(user_id), 0) + 1 FROM users").fetchone()[0]
+        offers = conn.execute("SELECT service_id, service_name, labor_rate FROM service_offers").fetchall()
+
+        for batch in _batches(_customers(rng, customers)):
+            conn.executemany("INSERT INTO users (username, password, full_name, phone_no, user_type, last_login) "
+                             "VALUES (?, ?, ?, ?, ?, ?)", batch)
+        say(f"  users         {customers:>10,}  {time.perf_counter() - t0:6.1f}s")
+
+        for batch in _batches(_vehicles(rng, vehicles, first_user_id, customers)):
+            conn.executemany("INSERT INTO vehicles (user_id, brand, model, plate_no) VALUES (?, ?, ?, ?)", batch)
+        vehicle_owners = conn.execute("SELECT vehicle_id, user_id FROM vehicles ORDER BY vehicle_id").fetchall()
+        say(f"  vehicles      {vehicles:>10,}  {time.perf_counter() - t0:6.1f}s")
+
+        for appt_rows, service_rows in _appointments(rng, appointments, vehicle_owners, offers, years):
+            conn.executemany("INSERT INTO appointments (appointment_id, user_id, vehicle_id, date, time, status, status_message, "
+                             "is_deleted, total_cost, service_count, services_summary) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                             appt_rows)
+            conn.executemany("INSERT INTO appointment_services (appointment_id, service_id, service_name, labor_rate) "
+                             "VALUES (?, ?, ?, ?)", service_rows)
+        say(f"  appointments  {appointments:>10,}  {time.perf_counter() - t0:6.1f}s")
+
+        for batch in _batches(_messages(rng, messages, admin_id, first_user_id, customers, years)):
+            conn.executemany("INSERT INTO messages (sender_id, receiver_id, content, timestamp, sent_at_ms, read_at_ms) "
+                             "VALUES (?, ?, ?, ?, ?, ?)", batch)
+        for batch in _batches(_history(rng, history, first_user_id, customers, years)):
+            conn.executemany("INSERT INTO deleted_items_history (deleter_id, item_type, item_id, details, deleted_at, deleted_at_ms) "
+                             "VALUES (?, ?, ?, ?, ?, ?)", batch)
+        conn.commit()
+        say(f"  messages      {messages:>10,}  {time.perf_counter() - t0:6.1f}s")
+
+        conn.execute("BEGIN IMMEDIATE")
+        for _, sql in triggers:
+            conn.execute(sql)
+        _rebuild_derived(conn)
+        conn.commit()
+        say(f"  derived tables rebuilt       {time.perf_counter() - t0:6.1f}s")
+
+        conn.execute("ANALYZE")
+        conn.commit()
+        counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                  for table in ("users", "vehicles", "appointments", "appointment_services", "messages", "deleted_items_history")}
+    database.close_connections()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic MM Auto Repair database")
+    parser.add_argument("output", help="database file to create")
+    parser.add_argument("--scale", choices=list(SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--years", type=int, default=5, help="years of appointment and chat history")
+    for name in SCALES["small"]:
+        parser.add_argument(f"--{name}", type=int, help=f"override the scale's {name} count")
+    args = parser.parse_args()
+
+    sizes = dict(SCALES[args.scale])
+    sizes.update({name: getattr(args, name) for name in sizes if getattr(args, name) is not None})
+    print(f"Generating {args.output} ({args.scale}, seed {args.seed}): " + ", ".join(f"{v:,} {k}" for k, v in sizes.items()))
+    t0 = time.perf_counter()
+    counts = generate(args.output, years=args.years, seed=args.seed, **sizes)
+    print(f"Done in {time.perf_counter() - t0:.1f}s: " + ", ".join(f"{v:,} {k}" for k, v in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
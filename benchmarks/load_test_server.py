@@ -0,0 +1,195 @@
+#API server load test
+#Starts server.py on a generated database (or targets --url) and drives it with hundreds of simulated
+#front-desk clients on localhost, each on its own keep-alive connection. Clients mostly read (Home
+#dashboard, appointment list, offers, free slots, chat) and sometimes book appointments (racing for the
+#same slots) or send messages. Reports throughput and p50/p95/p99 latency per operation, then checks
+#that no slot was double-booked.
+#Usage: python benchmarks/load_test_server.py [--clients 200] [--duration 15] [--write-ratio 0.15]
+#       [--scale small] [--url http://127.0.0.1:8765]
+#Exits with status 1 on server errors (5xx / dropped connections) or a double booking.
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import defaultdict
+from datetime import date, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+import datagen  # noqa: E402
+
+READS = [ # (operation, weight)
+    ('get_user_dashboard', 40), ('get_user_appointments', 15), ('get_all_service_offers', 15),
+    ('get_available_slots', 15), ('get_messages_since', 15),
+]
+WRITES = [('book_appointment', 70), ('send_message', 30)]
+
+
+class HttpClient: # Minimal keep-alive HTTP/1.1 JSON client on asyncio streams
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+        self.token = None
+
+    async def post(self, path, payload): #-> (status, decoded JSON)
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        body = json.dumps(payload).encode('utf-8')
+        auth = f"Authorization: Bearer {self.token}\r\n" if self.token else ""
+        self.writer.write((f"POST {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Type: application/json\r\n"
+                           f"{auth}Content-Length: {len(body)}\r\n\r\n").encode('latin-1') + body)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            if name.lower() == 'content-length':
+                length = int(value)
+        return status, json.loads(await self.reader.readexactly(length))
+
+    async def call(self, operation, *args):
+        return await self.post(f"/api/{operation}", {'args': list(args)})
+
+    def close(self):
+        if self.writer:
+            self.writer.close()
+
+
+async def _customer(host, port, n, stop_at, results, first_day):
+    rng = random.Random(n)
+    client = HttpClient(host, port)
+    try:
+        username = f"load.{os.getpid()}.{n}"
+        await client.call('register', username, f"Load Customer {n}", f"0919{n:07d}", "pw")
+        status, body = await client.post('/api/login', {'username': username, 'password': 'pw'})
+        client.token = body['result']['token']
+        user_id = body['result']['user']['user_id']
+        await client.call('add_vehicle', "Toyota", "Vios", f"LD{os.getpid() % 1000:03d} {n:05d}")
+        _, body = await client.call('get_user_vehicles', user_id)
+        vehicle_id = body['result'][0]['vehicle_id']
+
+        while time.perf_counter() < stop_at:
+            pool = WRITES if rng.random() < results['write_ratio'] else READS
+            operation = rng.choices([op for op, _ in pool], [w for _, w in pool])[0]
+            day = (first_day + timedelta(days=rng.randrange(results['days']))).isoformat()
+            args = {
+                'get_user_dashboard': (user_id,), 'get_user_appointments': (user_id,), 'get_all_service_offers': (),
+                'get_available_slots': (day, day, 60), 'get_messages_since': (user_id, 1, 0, 50),
+                'book_appointment': (vehicle_id, [1, 2], day, f"{rng.randrange(6, 17):02d}:00"),
+                'send_message': (f"Load test message {n}",),
+            }[operation]
+            t0 = time.perf_counter()
+            status, _ = await client.call(operation, *args)
+            results['latency'][operation].append((time.perf_counter() - t0) * 1000)
+            results['status'][status] += 1
+    except (ConnectionError, asyncio.IncompleteReadError, OSError) as e:
+        results['dropped'].append(repr(e))
+    finally:
+        client.close()
+
+
+def _start_server(db_path, port, readers):
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT, "server.py"), "--db", db_path, "--port", str(port),
+                             "--readers", str(readers)], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1)
+            return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("server did not start: " + proc.stderr.read().decode(errors='replace'))
+
+
+def _double_bookings(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute("""
+            SELECT date, time, COUNT(*) FROM appointments
+            WHERE status IN ('Pending', 'Approved') AND is_deleted = 0
+            GROUP BY date, time HAVING COUNT(*) > 1
+        """).fetchall()
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def _run(host, port, args):
+    results = {'latency': defaultdict(list), 'status': defaultdict(int), 'dropped': [],
+               'write_ratio': args.write_ratio, 'days': args.days}
+    first_day = date.today() + timedelta(days=1)
+    t0 = time.perf_counter()
+    stop_at = t0 + args.duration
+    await asyncio.gather(*(_customer(host, port, n, stop_at, results, first_day) for n in range(args.clients)))
+    return results, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive server.py with many simulated clients.")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=15, help="seconds of traffic")
+    parser.add_argument("--write-ratio", type=float, default=0.15)
+    parser.add_argument("--days", type=int, default=30, help="bookings spread over this many days (fewer = more slot races)")
+    parser.add_argument("--scale", choices=list(datagen.SCALES), default="small", help="data the started server holds")
+    parser.add_argument("--readers", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--url", help="use a running server instead of starting one")
+    args = parser.parse_args()
+
+    proc = db_path = None
+    if args.url:
+        host, _, port = args.url.split('//')[-1].rstrip('/').partition(':')
+        port = int(port or 8765)
+    else:
+        work_dir = tempfile.mkdtemp(prefix="mm_load_")
+        db_path = os.path.join(work_dir, "load.db")
+        datagen.generate(db_path, verbose=False, **datagen.SCALES[args.scale])
+        host, port = "127.0.0.1", args.port
+        proc = _start_server(db_path, port, args.readers)
+    try:
+        results, elapsed = asyncio.run(_run(host, port, args))
+        health = json.load(urllib.request.urlopen(f"http://{host}:{port}/health", timeout=5))
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait(10)
+
+    total = sum(len(v) for v in results['latency'].values())
+    print(f"{args.clients} clients for {elapsed:.1f}s: {total:,} requests, {total / elapsed:,.0f} req/s")
+    print(f"{'operation':<26}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for operation, samples in sorted(results['latency'].items()):
+        ordered = sorted(samples)
+        print(f"{operation:<26}{len(ordered):>8,}{_percentile(ordered, 0.5):>10.2f}"
+              f"{_percentile(ordered, 0.95):>10.2f}{_percentile(ordered, 0.99):>10.2f}")
+    print("status codes:", dict(sorted(results['status'].items())), "(409 = slot already taken)")
+    print(f"server: {health['writes']:,} writes in {health['write_batches']:,} writer batches, "
+          f"longest write queue {health['max_write_queue']}")
+
+    failed = sum(count for status, count in results['status'].items() if status >= 500) + len(results['dropped'])
+    doubles = _double_bookings(db_path) if db_path else []
+    for error in results['dropped'][:5]:
+        print("  dropped:", error)
+    if db_path:
+        print(f"double-booked slots: {len(doubles)}")
+        shutil.rmtree(os.path.dirname(db_path), ignore_errors=True)
+    if failed or doubles:
+        print("FAIL")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+#Scale benchmark runner
+#For each scale, generates (or reuses) a synthetic database with benchmarks/datagen.py, then times
+#every public database.py function and every frontend load_data() path against a working copy.
+#Results are written as JSON; --compare flags functions whose p50 got slower than a baseline run.
+#Usage: python benchmarks/run_benchmarks.py [--scales small medium] [--runs 5] [--output results.json]
+#       [--compare baseline.json] [--threshold 1.25] [--skip REGEX] [--no-ui] [--data-dir DIR]
+#Read cases repeat --runs times; write cases get fresh rows each run (set up outside the timing);
+#heavy cases (full-table reads, rebuilds) run once. Exits with status 1 when --compare finds regressions.
+import argparse
+import json
+import os
+import platform
+import re
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+import database  # noqa: E402
+import datagen  # noqa: E402
+
+NOISE_FLOOR_MS = 0.05 # p50 changes smaller than this are never reported as regressions
+DEFAULT_PROFILE = database.STORAGE_PROFILE
+
+
+class Context: # IDs and dates the cases use, picked from the generated data
+    def __init__(self):
+        with database.db_connection() as conn:
+            q = lambda sql, *args: conn.execute(sql, args).fetchone()
+            self.admin_id = q("SELECT user_id FROM users WHERE user_type = 1 ORDER BY user_id")[0]
+            self.customer_id = q("SELECT user_id FROM appointments GROUP BY user_id ORDER BY COUNT(*) DESC LIMIT 1")[0]
+            username = q("SELECT username FROM users WHERE user_id = ?", self.customer_id)[0]
+            self.vehicle_id = q("SELECT vehicle_id FROM vehicles WHERE user_id = ? ORDER BY vehicle_id", self.customer_id)[0]
+            self.chat_partner_id = q("SELECT CASE WHEN sender_id = ? THEN receiver_id ELSE sender_id END AS partner "
+                                     "FROM messages GROUP BY partner ORDER BY COUNT(*) DESC LIMIT 1", self.admin_id)[0]
+            self.completed_id = q("SELECT MAX(appointment_id) FROM appointments WHERE status = 'Completed'")[0]
+            self.plate_prefix = q("SELECT plate_no FROM vehicles WHERE vehicle_id = ?", self.vehicle_id)[0][:3]
+            self.busy_day = q("SELECT date FROM appointments GROUP BY date ORDER BY COUNT(*) DESC LIMIT 1")[0]
+            self.first_day, self.last_day = q("SELECT MIN(date), MAX(date) FROM appointments")
+        self.customer = database.get_user_by_username(username)
+        self.today = date.today()
+        self.now_ms = database.epoch_ms()
+        self._future = 0
+
+    def future_slot(self): #A day far enough ahead that bookings made by the benchmark never collide
+        self._future += 1
+        return (self.today + timedelta(days=3650 + self._future)).isoformat(), "09:00"
+
+    def new_vehicle(self, n):
+        database.add_vehicle(self.customer_id, "Toyota", "Vios", f"BNC {n:06d}")
+        return database.find_vehicle_by_plate_prefix(f"BNC {n:06d}", 1)[0]['vehicle_id']
+
+    def new_appointment(self):
+        day, slot = self.future_slot()
+        database.add_appointment(self.customer_id, self.vehicle_id, [1, 2], day, slot)
+        with database.db_connection() as conn:
+            return conn.execute("SELECT MAX(appointment_id) FROM appointments").fetchone()[0]
+
+    def new_service(self, n):
+        database.add_service_offer(f"Benchmark Service {n}", 100.0)
+        with database.db_connection() as conn:
+            return conn.execute("SELECT MAX(service_id) FROM service_offers").fetchone()[0]
+
+
+def _drain(stream):
+    return sum(1 for _ in stream)
+
+
+def _with_conn(func):
+    with database.db_connection() as conn:
+        return func(conn)
+
+
+def cases(ctx): #name -> (kind, setup(n) returning the call's args); kind: read, write or heavy
+    c = ctx
+    week_ago = c.now_ms - 7 * 24 * 3600 * 1000
+    return {
+        'create_tables': ('heavy', lambda n: ()),
+        'get_schema_version': ('read', lambda n: ()),
+        'migrate_schema': ('read', lambda n: None), # special-cased: needs a connection
+        'setup_initial_data': ('read', lambda n: ()),
+        'log_deleted_item': ('write', lambda n: (c.admin_id, 'Benchmark', n, {'run': n})),
+        'get_user_by_username': ('read', lambda n: (c.customer['username'],)),
+        'update_last_login': ('write', lambda n: (c.customer_id,)),
+        'register_new_user': ('write', lambda n: (f"bench.user{n}", "Bench User", "09170000000", "pw")),
+        'update_user_profile': ('write', lambda n: (c.customer_id, c.customer['username'], c.customer['full_name'], c.customer['phone_no'])),
+        'get_user_vehicles': ('read', lambda n: (c.customer_id,)),
+        'add_vehicle': ('write', lambda n: (c.customer_id, "Honda", "City", f"BNA {n:06d}")),
+        'delete_vehicle': ('write', lambda n: (c.customer_id, c.new_vehicle(100000 + n))),
+        'delete_vehicles': ('write', lambda n: (c.customer_id, [c.new_vehicle(200000 + n * 3 + i) for i in range(3)])),
+        'get_vehicle_by_id': ('read', lambda n: (c.vehicle_id,)),
+        'get_service_offers_by_id': ('read', lambda n: ([1, 2, 3],)),
+        'add_appointment': ('write', lambda n: (c.customer_id, c.vehicle_id, [1, 2], *c.future_slot())),
+        'get_user_appointments': ('read', lambda n: (c.customer_id,)),
+        'get_all_appointments': ('heavy', lambda n: ()),
+        'get_upcoming_appointment': ('read', lambda n: (c.customer_id,)),
+        'get_appointments_by_id': ('read', lambda n: ([c.completed_id, c.completed_id - 1, c.completed_id - 2],)),
+        'update_appointment_status': ('write', lambda n: (c.new_appointment(), 'Approved')),
+        'delete_appointment': ('write', lambda n: (c.admin_id, c.new_appointment())),
+        'delete_appointments': ('write', lambda n: (c.admin_id, [c.new_appointment() for _ in range(3)])),
+        'cancel_appointment': ('write', lambda n: (c.customer_id, c.new_appointment())),
+        'cancel_appointments': ('write', lambda n: (c.customer_id, [c.new_appointment() for _ in range(3)])),
+        'reschedule_appointment': ('write', lambda n: (c.new_appointment(), *c.future_slot())),
+        'get_available_slots': ('read', lambda n: (c.today.isoformat(), (c.today + timedelta(days=30)).isoformat(), 30)),
+        'get_appointment_status_message': ('read', lambda n: (c.customer_id,)),
+        'get_billing_invoice': ('read', lambda n: (c.completed_id,)),
+        'get_all_service_offers': ('read', lambda n: ()),
+        'update_service_offer': ('write', lambda n: (1, 'Oil Change', 145.0)),
+        'add_service_offer': ('write', lambda n: (f"Benchmark Offer {n}", 99.0)),
+        'delete_service_offer': ('write', lambda n: (c.admin_id, c.new_service(100000 + n))),
+        'delete_service_offers': ('write', lambda n: (c.admin_id, [c.new_service(200000 + n * 3 + i) for i in range(3)])),
+        'send_message': ('write', lambda n: (c.chat_partner_id, c.admin_id, f"Benchmark message {n}")),
+        'get_messages': ('read', lambda n: (c.chat_partner_id, c.admin_id)),
+        'get_messages_since': ('read', lambda n: (c.chat_partner_id, c.admin_id, 0)),
+        'get_messages_before': ('read', lambda n: (c.chat_partner_id, c.admin_id)),
+        'get_messages_in_range': ('read', lambda n: (week_ago,)),
+        'get_recent_messages': ('read', lambda n: (24,)),
+        'rebuild_conversations': ('heavy', lambda n: ()),
+        'mark_conversation_read': ('write', lambda n: (c.admin_id, c.chat_partner_id)),
+        'get_admin_inbox': ('read', lambda n: (c.admin_id,)),
+        'get_unread_count': ('read', lambda n: (c.chat_partner_id,)),
+        'rebuild_search_index': ('heavy', lambda n: ()),
+        'search': ('read', lambda n: ("brakes",)),
+        'find_user_by_phone': ('read', lambda n: ("0917",)),
+        'find_vehicle_by_plate_prefix': ('read', lambda n: (c.plate_prefix,)),
+        'find_vehicle_by_plate_suffix': ('read', lambda n: ("123",)),
+        'rebuild_shop_counters': ('heavy', lambda n: ()),
+        'rebuild_report_rollups': ('heavy', lambda n: ()),
+        'get_revenue_report': ('read', lambda n: (c.first_day, c.last_day, 'month')),
+        'get_service_mix_report': ('read', lambda n: (c.first_day, c.last_day)),
+        'get_total_active_customers': ('read', lambda n: ()),
+        'get_pending_appointments_count': ('read', lambda n: ()),
+        'get_total_service_revenue': ('read', lambda n: ()),
+        'get_todays_appointments': ('read', lambda n: (c.busy_day,)),
+        'get_deleted_items_history': ('read', lambda n: (c.admin_id, 1)),
+        'get_deleted_items_in_range': ('read', lambda n: (week_ago,)),
+        'get_all_users': ('read', lambda n: ()),
+        'get_completed_appointments_count': ('read', lambda n: (c.customer_id,)),
+        'get_user_dashboard': ('read', lambda n: (c.customer_id,)),
+        'get_all_vehicles': ('heavy', lambda n: ()),
+        'iter_user_vehicles': ('read', lambda n: (c.customer_id,)),
+        'iter_user_appointments': ('read', lambda n: (c.customer_id,)),
+        'iter_all_appointments': ('heavy', lambda n: ()),
+        'iter_all_service_offers': ('read', lambda n: ()),
+        'iter_messages': ('read', lambda n: (c.chat_partner_id, c.admin_id)),
+        'iter_todays_appointments': ('read', lambda n: (c.busy_day,)),
+        'iter_deleted_items_history': ('read', lambda n: (c.admin_id, 1)),
+        'iter_all_users': ('heavy', lambda n: ()),
+        'iter_all_vehicles': ('heavy', lambda n: ()),
+        'get_appointments_page': ('read', lambda n: (100,)),
+        'get_users_page': ('read', lambda n: (100,)),
+        'get_vehicles_page': ('read', lambda n: (100,)),
+    }
+
+
+def public_functions(): #Every function database.py wraps for instrumentation, i.e. its public query API
+    return sorted(name for name, func in vars(database).items() if callable(func) and hasattr(func, '__wrapped__')
+                  and getattr(func, '__module__', None) == database.__name__ and name not in database._NOT_INSTRUMENTED)
+
+
+def _summary(samples, rows):
+    ordered = sorted(samples)
+    return {
+        'runs': len(ordered), 'rows': rows,
+        'p50_ms': round(ordered[len(ordered) // 2], 4),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 4),
+        'min_ms': round(ordered[0], 4),
+        'mean_ms': round(sum(ordered) / len(ordered), 4),
+    }
+
+
+def time_functions(ctx, runs, skip):
+    results, table = {}, cases(ctx)
+    for name in public_functions():
+        if name not in table or (skip and re.search(skip, name)):
+            continue
+        kind, setup = table[name]
+        func = getattr(database, name)
+        samples, rows = [], 0
+        for n in range(1 if kind == 'heavy' else runs):
+            args = setup(n)
+            t0 = time.perf_counter()
+            if name == 'migrate_schema':
+                result = _with_conn(func)
+            else:
+                result = func(*args)
+                if name.startswith('iter_'):
+                    result = _drain(result)
+            samples.append((time.perf_counter() - t0) * 1000)
+            rows = result if isinstance(result, int) and name.startswith('iter_') else database._row_count(result)
+        results[name] = dict(_summary(samples, rows), kind=kind)
+        print(f"    {name:<34} {kind:<6} p50 {results[name]['p50_ms']:>10.3f} ms  rows {rows:>9,}")
+    return results
+
+
+def time_ui(ctx, runs, skip): #Every content frame's load_data() on both dashboards (needs a display)
+    import tkinter as tk
+    import backend
+    import frontend
+
+    class BenchApp(backend.MMAutoRepairShop):
+        def state(self, newstate=None): # 'zoomed' only exists on Windows; the window stays hidden anyway
+            return 'withdrawn'
+
+    try:
+        app = BenchApp()
+    except tk.TclError as e:
+        print(f"    UI skipped: {e}")
+        return {'skipped': str(e)}
+    app.withdraw()
+    frontend.LOADER_POLL_MS = 1 # Pick up finished loads at once so the timings are not rounded up to the poll interval
+    results = {}
+    try:
+        sessions = [
+            ("AdminDashboard", database.get_user_by_username('Admin'), "set_admin_data"),
+            ("UserDashboard", database.get_user_by_username(ctx.customer['username']), "set_user_data"),
+        ]
+        for dashboard_name, user, setter in sessions:
+            app.current_user = user
+            dashboard = app.frames[dashboard_name]
+            getattr(dashboard, setter)(user)
+            for frame_name, frame in dashboard.content_frames.items():
+                path = f"{dashboard_name}.{frame_name}"
+                if not hasattr(frame, 'load_data') or (skip and re.search(skip, path)):
+                    continue
+                samples = []
+                for _ in range(runs):
+                    t0 = time.perf_counter()
+                    frame.load_data()
+                    while frontend.loader.is_loading(): # Queries run on loader threads; wait until they are rendered
+                        app.update()
+                    app.update_idletasks()
+                    samples.append((time.perf_counter() - t0) * 1000)
+                results[path] = _summary(samples, 0)
+                print(f"    {path:<40} p50 {results[path]['p50_ms']:>10.3f} ms")
+    finally:
+        app.destroy()
+    return results
+
+
+def _database_for(scale, seed, data_dir):
+    path = os.path.join(data_dir, f"mm_{scale}_seed{seed}.db")
+    if not os.path.exists(path):
+        print(f"  generating {path}")
+        datagen.generate(path, seed=seed, **datagen.SCALES[scale])
+        database.set_storage_profile(DEFAULT_PROFILE)
+    return path
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(BENCH_DIR),
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    print(f"\nCompared with {baseline.get('created_at')} (commit {baseline.get('git_commit')}):")
+    for scale, current in results['scales'].items():
+        old = baseline.get('scales', {}).get(scale)
+        if not old:
+            print(f"  {scale}: not in baseline")
+            continue
+        for section in ('functions', 'ui'):
+            for name, now in current.get(section, {}).items():
+                before = old.get(section, {}).get(name)
+                if not isinstance(now, dict) or not isinstance(before, dict) or 'p50_ms' not in before:
+                    continue
+                ratio = now['p50_ms'] / before['p50_ms'] if before['p50_ms'] else float('inf')
+                slower = ratio > threshold and now['p50_ms'] - before['p50_ms'] > NOISE_FLOOR_MS
+                faster = ratio < 1 / threshold and before['p50_ms'] - now['p50_ms'] > NOISE_FLOOR_MS
+                if slower or faster:
+                    print(f"  {'SLOWER' if slower else 'faster'}  {scale:<7} {name:<40} "
+                          f"{before['p50_ms']:>10.3f} -> {now['p50_ms']:>10.3f} ms  (x{ratio:.2f})")
+                if slower:
+                    regressions.append((scale, name, ratio))
+    print(f"  {len(regressions)} regression(s) over x{threshold}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time database.py and the frontend load_data paths at several data scales.")
+    parser.add_argument("--scales", nargs="+", choices=list(datagen.SCALES), default=["small"])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "mm_bench_data"),
+                        help="where generated databases are kept between runs")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/run-<time>.json)")
+    parser.add_argument("--compare", help="baseline results file to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="p50 ratio counted as a regression")
+    parser.add_argument("--skip", help="regex of function names / UI paths to leave out")
+    parser.add_argument("--no-ui", action="store_true", help="do not time the frontend load_data paths")
+    args = parser.parse_args()
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    results = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': _git_commit(),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'storage_profile': DEFAULT_PROFILE,
+        'seed': args.seed,
+        'runs': args.runs,
+        'scales': {},
+    }
+    for scale in args.scales:
+        print(f"[{scale}] " + ", ".join(f"{v:,} {k}" for k, v in datagen.SCALES[scale].items()))
+        source = _database_for(scale, args.seed, args.data_dir)
+        work = os.path.join(tempfile.mkdtemp(prefix="mm_bench_run_"), "work.db")
+        shutil.copyfile(source, work) # write cases change the data; every run starts from the same file
+        database.DATABASE_NAME = work
+        database.create_tables()
+        ctx = Context()
+
+        scale_results = {'sizes': datagen.SCALES[scale]}
+        print("  database functions")
+        scale_results['functions'] = time_functions(ctx, args.runs, args.skip)
+        scale_results['uncovered'] = [name for name in public_functions() if name not in cases(ctx)]
+        for name in scale_results['uncovered']:
+            print(f"    WARNING: no benchmark case for database.{name}")
+        if not args.no_ui:
+            print("  frontend load_data")
+            scale_results['ui'] = time_ui(ctx, min(args.runs, 3), args.skip)
+        results['scales'][scale] = scale_results
+        database.close_connections()
+        shutil.rmtree(os.path.dirname(work), ignore_errors=True)
+
+    output = args.output or os.path.join(BENCH_DIR, "results", f"run-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
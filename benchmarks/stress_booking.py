@@ -0,0 +1,143 @@
+#Concurrent booking stress test
+#Many customers race for the same slots through database.add_appointment (threads inside each process,
+#optionally several processes on one database file). Every thread tries the slots in the same order, so
+#each slot is contested by all of them, and accepted bookings are kept. Afterwards every slot must hold
+#exactly one Pending/Approved appointment, the stored bookings must be exactly the ones add_appointment
+#reported as accepted (by appointment_id), and every booking must have all of its services.
+#Usage: python benchmarks/stress_booking.py [--processes 4] [--threads 8] [--attempts 50]
+#Exits with status 1 on a double booking, a lost or unreported booking, a half-written booking, or no contention.
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database  # noqa: E402
+
+CUSTOMERS = 50
+SERVICE_IDS = [1, 2, 3]
+
+
+def _slots(count): #The first `count` hourly slots of the shop's day, spilling into the next days
+    return [(f"2040-01-{1 + i // 12:02d}", f"{6 + i % 12:02d}:00") for i in range(count)]
+
+
+def _seed(path):
+    database.DATABASE_NAME = path
+    database.create_tables()
+    database.setup_initial_data()
+    with database.db_connection() as conn:
+        conn.executemany("INSERT INTO users (username, password, full_name, phone_no) VALUES (?, ?, ?, ?)",
+                         [(f"racer{i}", "pw", f"Racer {i}", f"0918{i:07d}") for i in range(CUSTOMERS)])
+        conn.executemany("INSERT INTO vehicles (user_id, brand, model, plate_no) VALUES (?, ?, ?, ?)",
+                         [(2 + i, "Honda", "City", f"RACE {i:04d}") for i in range(CUSTOMERS)])
+        conn.commit()
+    database.close_connections()
+
+
+def _worker_process(path, process_id, threads, attempts, results):
+    database.DATABASE_NAME = path
+    accepted, rejected, errors = [], [0], []  # accepted: (date, time, appointment_id)
+    lock = threading.Lock()
+    slot_list = _slots(attempts)
+
+    def customer(thread_id):
+        user_id = 2 + (process_id * threads + thread_id) % CUSTOMERS
+        for day, slot in slot_list: # Same order in every thread: each slot is a race between all of them
+            try:
+                result = database.add_appointment(user_id, user_id - 1, SERVICE_IDS, day, slot)
+            except Exception as e:  # lock timeouts etc. count as failures of the test, not rejections
+                with lock:
+                    errors.append(repr(e))
+                continue
+            with lock:
+                if result[0]:
+                    accepted.append((day, slot, result.value))
+                elif result[1] == database.SLOT_TAKEN_MESSAGE:
+                    rejected[0] += 1
+                else:
+                    errors.append(result[1])
+
+    pool = [threading.Thread(target=customer, args=(i,)) for i in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    database.close_connections()
+    results.put((accepted, rejected[0], errors))
+
+
+def _verify(path):
+    database.DATABASE_NAME = path
+    with database.db_connection() as conn:
+        doubles = conn.execute("""
+            SELECT date, time, COUNT(*) FROM appointments
+            WHERE status IN ('Pending', 'Approved') AND is_deleted = 0
+            GROUP BY date, time HAVING COUNT(*) > 1
+        """).fetchall()
+        stored = {row[0] for row in conn.execute(
+            "SELECT appointment_id FROM appointments WHERE status IN ('Pending', 'Approved') AND is_deleted = 0")}
+        partial = conn.execute("""
+            SELECT a.appointment_id FROM appointments a
+            LEFT JOIN appointment_services aps ON aps.appointment_id = a.appointment_id
+            GROUP BY a.appointment_id HAVING COUNT(aps.service_id) != ?
+        """, (len(SERVICE_IDS),)).fetchall()
+        total = conn.execute("SELECT COUNT(*) FROM appointments").fetchone()[0]
+    database.close_connections()
+    return doubles, stored, partial, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Race many bookings for a few slots and check for double bookings.")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--attempts", type=int, default=50, help="slots, each tried once by every thread")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="mm_stress_"), "stress.db")
+    _seed(path)
+
+    results = multiprocessing.Queue()
+    t0 = time.perf_counter()
+    procs = [multiprocessing.Process(target=_worker_process, args=(path, i, args.threads, args.attempts, results))
+             for i in range(args.processes)]
+    for p in procs:
+        p.start()
+    outcomes = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - t0
+
+    accepted = [booking for o in outcomes for booking in o[0]]
+    rejected = sum(o[1] for o in outcomes)
+    errors = [e for o in outcomes for e in o[2]]
+    doubles, stored, partial, total = _verify(path)
+
+    per_slot = {}
+    for day, slot, appointment_id in accepted:
+        per_slot.setdefault((day, slot), []).append(appointment_id)
+    double_accepts = {slot: ids for slot, ids in per_slot.items() if len(ids) > 1}
+    reported = {appointment_id for _, _, appointment_id in accepted}
+    contenders = args.processes * args.threads
+
+    print(f"{args.processes} processes x {args.threads} threads racing for {args.attempts} slots in {elapsed:.1f}s")
+    print(f"accepted: {len(accepted)}  rejected (slot taken): {rejected}  errors: {len(errors)}  appointments stored: {total}")
+    print(f"double-booked slots: {len(doubles)}  slots accepted twice: {len(double_accepts)}  "
+          f"slots left empty: {args.attempts - len(per_slot)}  appointments with missing services: {len(partial)}")
+    print(f"accepted but not stored: {len(reported - stored)}  stored but not reported: {len(stored - reported)}")
+    for e in errors[:5]:
+        print("  error:", e)
+    if contenders > 1 and not rejected:
+        print("no booking was rejected, so no slot was contested")
+    if (doubles or double_accepts or partial or errors or reported != stored or len(per_slot) != args.attempts
+            or (contenders > 1 and not rejected)):
+        print("FAIL")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import http.client
+import json
+import threading
+from functools import partial
+from urllib.parse import urlsplit
+import database
+import services
+import server
+
+#Client mode: stand-ins for the database and services modules that run every call on an API server
+#(server.py) instead of opening the database file. python backend.py --server http://HOST:8765 starts the
+#desktop app this way. Results arrive as plain dicts, which the screens read exactly like Records.
+
+
+class ApiClient: # One keep-alive HTTP connection per thread; raises the services.ServiceError type the server reported
+    def __init__(self, url, timeout=30):
+        parts = urlsplit(url if '//' in url else f"http://{url}")
+        self.host = parts.hostname or server.DEFAULT_HOST
+        self.port = parts.port or server.DEFAULT_PORT
+        self.timeout = timeout
+        self.token = None
+        self._local = threading.local()
+
+    def _connection(self): #-> (connection, reused)
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            return conn, True
+        conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return conn, False
+
+    def _drop_connection(self):
+        conn, self._local.conn = getattr(self._local, 'conn', None), None
+        if conn is not None:
+            conn.close()
+
+    def post(self, path, payload):
+        body = json.dumps(payload).encode('utf-8')
+        headers = {'Content-Type': 'application/json'}
+        if self.token:
+            headers['Authorization'] = f"Bearer {self.token}"
+        while True:
+            conn, reused = self._connection()
+            try:
+                conn.request('POST', path, body, headers)
+                response = conn.getresponse()
+                data = response.read()
+                break
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError) as e:
+                self._drop_connection()
+                if not reused: # a kept-alive connection the server had closed is retried once on a fresh one
+                    raise services.ServiceError(f"Lost the connection to the server at {self.host}:{self.port}: {e}") from None
+            except (http.client.HTTPException, OSError) as e:
+                self._drop_connection()
+                raise services.ServiceError(f"Cannot reach the server at {self.host}:{self.port}: {e}") from None
+        if response.getheader('Connection', '').lower() == 'close':
+            self._drop_connection()
+        decoded = json.loads(data)
+        if response.status >= 400:
+            raise _error(decoded.get('error') or {})
+        return decoded['result']
+
+    def call(self, operation, *args, **kwargs):
+        return self.post(f"/api/{operation}", {'args': list(args), 'kwargs': kwargs})
+
+    def login(self, username, password): #Starts a session; returns the user (without the password)
+        result = self.post('/api/login', {'username': username, 'password': password})
+        self.token = result['token']
+        return result['user']
+
+    def logout(self):
+        if self.token:
+            try:
+                self.post('/api/logout', {})
+            finally:
+                self.token = None
+
+def _error(info): #{"type", "message"} from the server -> the matching services.ServiceError subclass
+    error_type = getattr(services, info.get('type', ''), None)
+    if not (isinstance(error_type, type) and issubclass(error_type, services.ServiceError)):
+        error_type = services.ServiceError
+    return error_type(info.get('message', "The server could not complete the request."))
+
+def _outcome(result):
+    if isinstance(result, dict) and result.keys() == {'message', 'data'}:
+        return services.Outcome(result['message'], result['data'])
+    return result
+
+
+class RemoteDatabase: # database.get_x(...) -> get_x on the server; constants (SLOW_QUERY_MS, ...) stay local
+    def __init__(self, api):
+        self._api = api
+
+    def __getattr__(self, name):
+        if name in server.OPERATIONS:
+            return partial(self._api.call, name)
+        if name.isupper():
+            return getattr(database, name)
+        raise AttributeError(f"database.{name} is not available in client mode")
+
+    def create_tables(self): # the server owns the schema
+        pass
+
+    def setup_initial_data(self):
+        pass
+
+    def export_instrumentation_json(self, path=None): #The server's statistics, saved on this machine
+        data = self._api.call('export_instrumentation_json')
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(data)
+        return data
+
+
+class RemoteServices: # services.x(user, ...) -> x on the server, for the user logged in on this client
+    def __init__(self, api):
+        self._api = api
+
+    def login(self, username, password):
+        return self._api.login(username, password)
+
+    def logout(self, user):
+        self._api.logout()
+
+    def __getattr__(self, name):
+        operation = server.OPERATIONS.get(name)
+        if operation and operation[1] == 'user':
+            # the server supplies the user from the session
+            return lambda user, *args, **kwargs: _outcome(self._api.call(name, *args, **kwargs))
+        if operation:
+            return lambda *args, **kwargs: _outcome(self._api.call(name, *args, **kwargs))
+        return getattr(services, name) # error classes, Outcome, is_admin, ...
+
+def connect(url): #-> (database stand-in, services stand-in) sharing one session
+    api = ApiClient(url)
+    return RemoteDatabase(api), RemoteServices(api)
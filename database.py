@@ -1,444 +1,1259 @@
+import os
+import re
+import json
+import logging
+import functools
+import inspect
+import base64
 import sqlite3
-from datetime import datetime
+import threading
+import queue
+import time
+import atexit
+from contextlib import contextmanager
+from collections import deque
+from datetime import datetime, timedelta
+from functools import partial
 #36 method used
 #relational data models using sqlite
-#Lists of Dictionaries: Multi-row queries, such as get_all_appointments()
-#Dictionaries (dict): Every database query function (like get_user_by_username or get_vehicle_by_id)
+#Lists of Records: Multi-row queries, such as get_all_appointments()
+#Records (read-only, dict-style row['key'] access): Every database query function (like get_user_by_username or get_vehicle_by_id)
 DATABASE_NAME = "mm_auto_repair.db"
 
-def get_db_connection():
+# Connection pool settings
+POOL_SIZE = 4 # Max connections shared by worker (non-main) threads
+POOL_TIMEOUT = 10 # Seconds a worker waits for a free pooled connection
+HEALTH_CHECK_INTERVAL = 30 # Seconds a connection can sit idle before it is pinged again
+STREAM_BATCH_SIZE = 500 # Rows per fetchmany() call in the iter_* functions
+
+# Storage profiles: PRAGMAs applied to every new connection
+# legacy      - SQLite defaults (rollback journal), readers and writers block each other
+# front_desk  - WAL so admin reads never block customer bookings; safe against app crashes
+# bulk_import - WAL with syncing off and big caches, for imports/benchmarks only (not power-loss safe)
+# See benchmarks/bench_storage_profiles.py and the README for measured numbers.
+STORAGE_PROFILES = {
+    "legacy": {
+        "journal_mode": "DELETE", "synchronous": "FULL", "cache_size": -2000,
+        "mmap_size": 0, "temp_store": "DEFAULT", "busy_timeout": 5000,
+    },
+    "front_desk": {
+        "journal_mode": "WAL", "synchronous": "NORMAL", "cache_size": -16000,
+        "mmap_size": 256 * 1024 * 1024, "temp_store": "MEMORY", "busy_timeout": 5000,
+    },
+    "bulk_import": {
+        "journal_mode": "WAL", "synchronous": "OFF", "cache_size": -64000,
+        "mmap_size": 1024 * 1024 * 1024, "temp_store": "MEMORY", "busy_timeout": 30000,
+    },
+}
+# Chosen per deployment with the MM_DB_PROFILE environment variable or set_storage_profile()
+STORAGE_PROFILE = os.environ.get("MM_DB_PROFILE", "front_desk")
+
+def _apply_storage_profile(conn, profile_name):
+    if profile_name not in STORAGE_PROFILES:
+        raise ValueError(f"Unknown storage profile '{profile_name}'. Choose from: {', '.join(STORAGE_PROFILES)}")
+    profile = STORAGE_PROFILES[profile_name]
+    # busy_timeout goes first so switching journal_mode can wait out other connections
+    conn.execute(f"PRAGMA busy_timeout = {int(profile['busy_timeout'])}")
+    conn.execute(f"PRAGMA journal_mode = {profile['journal_mode']}")
+    conn.execute(f"PRAGMA synchronous = {profile['synchronous']}")
+    conn.execute(f"PRAGMA cache_size = {int(profile['cache_size'])}")
+    conn.execute(f"PRAGMA mmap_size = {int(profile['mmap_size'])}")
+    conn.execute(f"PRAGMA temp_store = {profile['temp_store']}")
+
+def get_db_connection(database_name=None, profile_name=None):
     # Connects to the database and returns the connection object
-    conn = sqlite3.connect(DATABASE_NAME)
+    # check_same_thread is off because pooled connections are handed between worker threads
+    conn = sqlite3.connect(database_name or DATABASE_NAME, check_same_thread=False)
     # Enable foreign key support for cascade deletes
     conn.execute("PRAGMA foreign_keys = ON")
+    _apply_storage_profile(conn, profile_name or STORAGE_PROFILE)
     return conn
 
+def set_storage_profile(profile_name): #Switches the PRAGMA profile; open connections are replaced on next use.
+    global STORAGE_PROFILE
+    if profile_name not in STORAGE_PROFILES:
+        raise ValueError(f"Unknown storage profile '{profile_name}'. Choose from: {', '.join(STORAGE_PROFILES)}")
+    STORAGE_PROFILE = profile_name
+    close_connections()
+
+class ConnectionManager: # Keeps connections open between calls instead of connect/close per query
+    def __init__(self, database_name, profile_name, pool_size=POOL_SIZE, pool_timeout=POOL_TIMEOUT):
+        self.database_name = database_name
+        self.profile_name = profile_name
+        self.pool_size = pool_size
+        self.pool_timeout = pool_timeout
+        self._local = threading.local()
+        self._idle = queue.LifoQueue() # (conn, last_used) pairs waiting for a worker thread
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._lock = threading.Lock()
+        self._open_conns = set()
+        self._trace_state = {} # conn -> instrumentation generation its trace callback matches
+
+    def _open(self):
+        conn = get_db_connection(self.database_name, self.profile_name)
+        with self._lock:
+            self._open_conns.add(conn)
+        return conn
+
+    def _discard(self, conn):
+        with self._lock:
+            self._open_conns.discard(conn)
+            self._trace_state.pop(conn, None)
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def _is_healthy(self, conn, last_used): # Pings connections that have been idle for a while
+        if time.monotonic() - last_used < HEALTH_CHECK_INTERVAL:
+            return True
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _checkout(self):
+        local = self._local
+        # The main (Tk) thread keeps one long-lived connection of its own
+        if threading.current_thread() is threading.main_thread():
+            conn = getattr(local, 'owned', None)
+            if conn is not None and not self._is_healthy(conn, local.owned_last_used):
+                self._discard(conn)
+                conn = None
+            if conn is None:
+                conn = self._open()
+                local.owned = conn
+            return conn, False
+
+        # Worker threads borrow from a bounded pool
+        if not self._slots.acquire(timeout=self.pool_timeout):
+            raise sqlite3.OperationalError(f"Connection pool exhausted ({self.pool_size} connections in use).")
+        try:
+            while True:
+                try:
+                    conn, last_used = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._open(), True
+                if self._is_healthy(conn, last_used):
+                    return conn, True
+                self._discard(conn)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _attach_trace(self, conn): # Turns statement capture on/off to match enable/disable_instrumentation()
+        generation = _instrumentation.generation
+        if self._trace_state.get(conn) != generation:
+            conn.set_trace_callback(_instrumentation.trace if _instrumentation.enabled else None)
+            self._trace_state[conn] = generation
+
+    def _checkin(self, conn, pooled, healthy=True):
+        if not healthy:
+            self._discard(conn)
+            if not pooled:
+                self._local.owned = None
+        elif pooled:
+            self._idle.put((conn, time.monotonic()))
+        else:
+            self._local.owned_last_used = time.monotonic()
+        if pooled:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self): # Yields this thread's connection; nested calls share it
+        local = self._local
+        if getattr(local, 'depth', 0):
+            local.depth += 1
+            try:
+                yield local.conn
+            finally:
+                local.depth -= 1
+            return
+
+        conn, pooled = self._checkout()
+        self._attach_trace(conn)
+        local.conn, local.depth = conn, 1
+        healthy = True
+        try:
+            yield conn
+        finally:
+            local.conn, local.depth = None, 0
+            # Work that was never committed is rolled back, same as closing the connection used to do
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+            except sqlite3.Error:
+                healthy = False
+            self._checkin(conn, pooled, healthy)
+
+    @contextmanager
+    def dedicated_connection(self): # Own connection for a long-lived cursor, opened outside the pool's bound
+        # Streams can stay open for a whole export, so they never take one of the pool_size worker slots
+        conn = self._open()
+        self._attach_trace(conn)
+        try:
+            yield conn
+        finally:
+            self._discard(conn)
+
+    def close_all(self):
+        with self._lock:
+            conns = list(self._open_conns)
+            self._open_conns.clear()
+        for conn in conns:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._trace_state.clear()
+
+_manager = None
+_manager_lock = threading.Lock()
+
+def _get_manager(): # Rebuilds the manager if DATABASE_NAME, STORAGE_PROFILE or POOL_SIZE was changed
+    global _manager
+    with _manager_lock:
+        if _manager is None or (_manager.database_name, _manager.profile_name, _manager.pool_size) != (DATABASE_NAME, STORAGE_PROFILE, POOL_SIZE):
+            if _manager is not None:
+                _manager.close_all()
+            _manager = ConnectionManager(DATABASE_NAME, STORAGE_PROFILE, POOL_SIZE)
+        return _manager
+
+def db_connection(): #Context manager used by every function below: with db_connection() as conn: ...
+    return _get_manager().connection()
+
+@contextmanager
+def transaction(): #with transaction() as conn: ... runs the block as one BEGIN IMMEDIATE transaction.
+    # IMMEDIATE takes the write lock up front, so checks made inside the block still hold at COMMIT.
+    # A block nested inside another transaction on the same connection joins the outer one.
+    with db_connection() as conn:
+        if conn.in_transaction:
+            yield conn
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+def close_connections(): #Closes every pooled and thread-local connection (called on exit).
+    global _manager
+    with _manager_lock:
+        if _manager is not None:
+            _manager.close_all()
+            _manager = None
+    _cache.close()
+
+# INSTRUMENTATION (opt-in)
+# When enabled, every public function below is timed: calls, total/p50/p95/p99/max latency and the
+# rows it returned. The SQL it ran is captured through the connections' trace callback; a call slower
+# than SLOW_QUERY_MS goes to the slow-query log with the EXPLAIN QUERY PLAN of each statement.
+# Turn it on with MM_DB_INSTRUMENT=1 or enable_instrumentation(); while off, a call costs one flag check.
+# Admins see the numbers under Diagnostics (export_instrumentation_json() writes the same data).
+SLOW_QUERY_MS = float(os.environ.get("MM_DB_SLOW_MS", 100)) # Calls slower than this are logged with their query plans
+INSTRUMENTATION_SAMPLES = 1000 # Latest latencies kept per function for the percentiles
+SLOW_LOG_SIZE = 100 # Slow calls kept in the log
+_MAX_CAPTURED_STATEMENTS = 20 # Distinct statements kept per call
+
+logger = logging.getLogger("database")
+
+class Instrumentation:
+    def __init__(self):
+        self.enabled = False
+        self.generation = 0 # bumped on enable/disable so connections re-attach their trace callback
+        self.slow_ms = SLOW_QUERY_MS
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._functions = {}
+            self._slow = deque(maxlen=SLOW_LOG_SIZE)
+
+    def set_enabled(self, enabled, slow_ms=None):
+        self.enabled = enabled
+        if slow_ms is not None:
+            self.slow_ms = slow_ms
+        self.generation += 1
+
+    def trace(self, statement): # sqlite3 trace callback: runs on the thread executing the statement
+        stack = getattr(self._local, 'stack', None)
+        if stack and not statement.startswith('--'): # "-- TRIGGER ..." lines are the triggers' own statements
+            captured = stack[-1]
+            if statement not in captured and len(captured) < _MAX_CAPTURED_STATEMENTS:
+                captured.append(statement)
+
+    def call(self, name, func, args, kwargs):
+        stack = self._local.__dict__.setdefault('stack', [])
+        stack.append([])
+        t0 = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            elapsed_ms = (time.perf_counter() - t0) * 1000
+            statements = stack.pop()
+            if stack: # the caller's capture includes what its nested calls ran
+                stack[-1].extend(sql for sql in statements if sql not in stack[-1])
+        if inspect.isgenerator(result): # iter_* streams: timed until the caller finishes the loop
+            return self._timed_stream(name, result, t0)
+        self.record(name, elapsed_ms, _row_count(result), statements)
+        return result
+
+    def _timed_stream(self, name, stream, t0):
+        rows = 0
+        try:
+            for row in stream:
+                rows += 1
+                yield row
+        finally:
+            self.record(name, (time.perf_counter() - t0) * 1000, rows)
+
+    def record(self, name, elapsed_ms, rows, statements=()):
+        with self._lock:
+            stats = self._functions.get(name)
+            if stats is None:
+                stats = self._functions[name] = {'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0,
+                                                 'samples': deque(maxlen=INSTRUMENTATION_SAMPLES)}
+            stats['calls'] += 1
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+            stats['rows'] += rows or 0
+            stats['samples'].append(elapsed_ms)
+        if elapsed_ms >= self.slow_ms and statements:
+            entry = {'function': name, 'ms': round(elapsed_ms, 3), 'at_ms': epoch_ms(),
+                     'statements': [{'sql': inspect.cleandoc(sql), 'plan': _explain(sql)} for sql in statements]}
+            with self._lock:
+                self._slow.append(entry)
+            logger.warning("Slow database call %s: %.1f ms\n%s", name, elapsed_ms, "\n".join(
+                f"{item['sql']}\n    " + "\n    ".join(item['plan']) for item in entry['statements']))
+
+    def stats(self):
+        with self._lock:
+            functions = [(name, dict(stats, samples=sorted(stats['samples']))) for name, stats in self._functions.items()]
+        rows = []
+        for name, stats in functions:
+            samples = stats['samples']
+            rows.append({
+                'function': name, 'calls': stats['calls'], 'rows': stats['rows'],
+                'total_ms': round(stats['total_ms'], 3), 'mean_ms': round(stats['total_ms'] / stats['calls'], 3),
+                'p50_ms': _percentile(samples, 50), 'p95_ms': _percentile(samples, 95), 'p99_ms': _percentile(samples, 99),
+                'max_ms': round(stats['max_ms'], 3),
+            })
+        return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
+
+    def slow_log(self):
+        with self._lock:
+            return list(self._slow)
+
+_instrumentation = Instrumentation()
+
+def _percentile(ordered, pct): # nearest-rank percentile of an already sorted list
+    if not ordered:
+        return 0.0
+    return round(ordered[min(len(ordered) - 1, max(0, -(-len(ordered) * pct // 100) - 1))], 3)
+
+def _row_count(result): # rows in what a function returned: a list of Records, one Record, or nothing
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, (Record, dict)): # dicts are snapshots such as get_user_dashboard()
+        return 1
+    return 0
+
+def _explain(sql): #EXPLAIN QUERY PLAN lines for a captured statement (its values are already inlined)
+    if not sql.lstrip().upper().startswith(("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")):
+        return []
+    try:
+        with db_connection() as conn:
+            conn.set_trace_callback(None) # the EXPLAIN itself is not part of the call being logged
+            try:
+                return [detail for _, _, _, detail in conn.execute("EXPLAIN QUERY PLAN " + sql).fetchall()]
+            finally:
+                conn.set_trace_callback(_instrumentation.trace if _instrumentation.enabled else None)
+    except sqlite3.Error as e:
+        return [f"(no plan: {e})"]
+
+def _instrumented(func): # Wraps a public function in INSTRUMENTATION timing
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _instrumentation.enabled:
+            return func(*args, **kwargs)
+        return _instrumentation.call(name, func, args, kwargs)
+    return wrapper
+
+def enable_instrumentation(slow_ms=None): #Starts timing database calls (slow_ms: slow-query log threshold, default SLOW_QUERY_MS).
+    _instrumentation.set_enabled(True, slow_ms)
+
+def disable_instrumentation(): #Stops timing; collected statistics are kept until reset_instrumentation().
+    _instrumentation.set_enabled(False)
+
+def is_instrumentation_enabled():
+    return _instrumentation.enabled
+
+def reset_instrumentation():
+    _instrumentation.reset()
+
+def get_instrumentation_stats(): #One dict per function called: calls, rows, total/mean/p50/p95/p99/max ms (slowest total first).
+    return _instrumentation.stats()
+
+def get_slow_queries(): #Slow-query log, oldest first: function, ms, at_ms and the statements with their query plans.
+    return _instrumentation.slow_log()
+
+def export_instrumentation_json(path=None): #Stats, slow-query log and cache stats as JSON; written to path when given.
+    data = json.dumps({
+        'exported_at_ms': epoch_ms(),
+        'database': DATABASE_NAME,
+        'enabled': _instrumentation.enabled,
+        'slow_query_ms': _instrumentation.slow_ms,
+        'functions': get_instrumentation_stats(),
+        'slow_queries': get_slow_queries(),
+        'cache': get_cache_stats(),
+    }, indent=2)
+    if path:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(data)
+    return data
+
+atexit.register(close_connections)
+
+# ROW RECORDS
+# Rows come back as Records: tuples with dict-style access (row['plate_no'], row.get(...), keys(),
+# items(), dict(row)) plus attribute access (row.plate_no). A record stores only its values;
+# column names live once on a class that is cached per query shape, so no per-row dict is built.
+# Records are read-only; use row.to_dict() for a mutable copy (or before json.dumps, which
+# would otherwise write a record as a list).
+class Record(tuple):
+    __slots__ = ()
+    _fields = ()
+    _index = {}
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            try:
+                return tuple.__getitem__(self, self._index[key])
+            except KeyError:
+                raise KeyError(key) from None
+        return tuple.__getitem__(self, key)
+
+    def __getattr__(self, name):
+        index = type(self)._index.get(name)
+        if index is None:
+            raise AttributeError(f"{type(self).__name__} has no field '{name}'")
+        return tuple.__getitem__(self, index)
+
+    def get(self, key, default=None):
+        index = self._index.get(key)
+        return default if index is None else tuple.__getitem__(self, index)
+
+    def keys(self):
+        return self._fields
+
+    def values(self):
+        return tuple(tuple.__iter__(self))
+
+    def items(self):
+        return zip(self._fields, tuple.__iter__(self))
+
+    def __iter__(self): # Iterates over column names, like a dict
+        return iter(self._fields)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __eq__(self, other):
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return tuple.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = tuple.__hash__
+
+    def to_dict(self):
+        return dict(zip(self._fields, tuple.__iter__(self)))
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+class UserRecord(Record): # users rows (get_user_by_username, get_all_users, ...)
+    __slots__ = ()
+
+class VehicleRecord(Record): # vehicles rows (get_user_vehicles, get_all_vehicles, ...)
+    __slots__ = ()
+
+class AppointmentRecord(Record): # appointment list/detail rows
+    __slots__ = ()
+
+class ServiceRecord(Record): # service_offers and appointment_services rows
+    __slots__ = ()
+
+class MessageRecord(Record): # chat messages
+    __slots__ = ()
+
+class HistoryRecord(Record): # deleted_items_history rows
+    __slots__ = ()
+
+class ReportRecord(Record): # rows of the range reports (get_revenue_report, get_service_mix_report)
+    __slots__ = ()
+
+class ConversationRecord(Record): # admin inbox rows (get_admin_inbox)
+    __slots__ = ()
+
+class SearchRecord(Record): # search() results
+    __slots__ = ()
+
+class DashboardRecord(Record): # get_user_dashboard() tile row
+    __slots__ = ()
+
+# WRITE RESULTS
+# Write functions return (success, message). A Result is that pair (it unpacks, indexes and compares
+# like the plain tuple) with extras as attributes: value is what the call created (add_appointment:
+# the new appointment_id), so callers need no second query to find it.
+# Failed Results name their cause in .error, so callers map it without reading the message text.
+# None: an unexpected database error.
+NOT_FOUND = 'not_found'
+CONFLICT = 'conflict'   # Duplicate name/plate or a taken slot
+INVALID = 'invalid'     # Nothing (valid) selected
+
+class Result(tuple):
+    def __new__(cls, success, message, value=None, error=None):
+        result = super().__new__(cls, (success, message))
+        result.value = value
+        result.error = error
+        return result
+
+_record_classes = {}
+
+def _record_class(record_type, columns): #Returns the cached subclass that knows these column names.
+    key = (record_type, columns)
+    cls = _record_classes.get(key)
+    if cls is None:
+        fields = tuple(col[0] if isinstance(col, tuple) else col for col in columns)
+        cls = type(record_type.__name__, (record_type,), {
+            '__slots__': (),
+            '_fields': fields,
+            '_index': {name: i for i, name in enumerate(fields)},
+        })
+        _record_classes[key] = cls
+    return cls
+
+def _record(record_type, columns, row): #One row (or None) -> Record. columns is cursor.description or a tuple of names.
+    if row is None:
+        return None
+    return tuple.__new__(_record_class(record_type, columns), row)
+
+def _records(record_type, columns, rows): #Many rows -> list of Records, one class lookup for the whole list.
+    return list(map(partial(tuple.__new__, _record_class(record_type, columns)), rows))
+
 def create_tables():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Users table (0 for regular user, 1 for Admin)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            user_id INTEGER PRIMARY KEY,
-            username TEXT UNIQUE NOT NULL,
-            password TEXT NOT NULL,
-            full_name TEXT NOT NULL,
-            phone_no TEXT NOT NULL,
-            user_type INTEGER DEFAULT 0,
-            last_login TEXT 
-        )
-    """)
-    
-    # Vehicles table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS vehicles (
-            vehicle_id INTEGER PRIMARY KEY,
-            user_id INTEGER NOT NULL,
-            brand TEXT NOT NULL,
-            model TEXT NOT NULL,
-            plate_no TEXT UNIQUE NOT NULL,
-            FOREIGN KEY (user_id) REFERENCES users(user_id)
-        )
-    """)
-    
-    # Service Offers (Inventory/Pricing)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS service_offers (
-            service_id INTEGER PRIMARY KEY,
-            service_name TEXT UNIQUE NOT NULL,
-            labor_rate REAL NOT NULL 
-        )
-    """)
-    
-    # Appointments table (Updated for multi-service support and status messages)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS appointments (
-            appointment_id INTEGER PRIMARY KEY,
-            user_id INTEGER NOT NULL,
-            vehicle_id INTEGER NOT NULL,
-            date TEXT NOT NULL,
-            time TEXT NOT NULL,
-            status TEXT NOT NULL DEFAULT 'Pending', -- Pending, Approved, Rejected, Canceled, Completed
-            status_message TEXT,
-            is_deleted INTEGER DEFAULT 0, -- 1 if soft-deleted by user/admin
-            FOREIGN KEY (user_id) REFERENCES users(user_id),
-            FOREIGN KEY (vehicle_id) REFERENCES vehicles(vehicle_id)
-        )
-    """)
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        
+        # Users table (0 for regular user, 1 for Admin)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS users (
+                user_id INTEGER PRIMARY KEY,
+                username TEXT UNIQUE NOT NULL,
+                password TEXT NOT NULL,
+                full_name TEXT NOT NULL,
+                phone_no TEXT NOT NULL,
+                user_type INTEGER DEFAULT 0,
+                last_login TEXT 
+            )
+        """)
+        
+        # Vehicles table
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS vehicles (
+                vehicle_id INTEGER PRIMARY KEY,
+                user_id INTEGER NOT NULL,
+                brand TEXT NOT NULL,
+                model TEXT NOT NULL,
+                plate_no TEXT UNIQUE NOT NULL,
+                FOREIGN KEY (user_id) REFERENCES users(user_id)
+            )
+        """)
+        
+        # Service Offers (Inventory/Pricing)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS service_offers (
+                service_id INTEGER PRIMARY KEY,
+                service_name TEXT UNIQUE NOT NULL,
+                labor_rate REAL NOT NULL 
+            )
+        """)
+        
+        # Appointments table (Updated for multi-service support and status messages)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS appointments (
+                appointment_id INTEGER PRIMARY KEY,
+                user_id INTEGER NOT NULL,
+                vehicle_id INTEGER NOT NULL,
+                date TEXT NOT NULL,
+                time TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'Pending', -- Pending, Approved, Rejected, Canceled, Completed
+                status_message TEXT,
+                is_deleted INTEGER DEFAULT 0, -- 1 if soft-deleted by user/admin
+                FOREIGN KEY (user_id) REFERENCES users(user_id),
+                FOREIGN KEY (vehicle_id) REFERENCES vehicles(vehicle_id)
+            )
+        """)
 
-    # Appointment Services (M:M relationship for multiple services per appointment)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS appointment_services (
-            appt_service_id INTEGER PRIMARY KEY,
-            appointment_id INTEGER NOT NULL,
-            service_id INTEGER NOT NULL,
-            service_name TEXT NOT NULL, -- Store name for history even if offer changes
-            labor_rate REAL NOT NULL, -- Store rate at time of booking
-            FOREIGN KEY (appointment_id) REFERENCES appointments(appointment_id) ON DELETE CASCADE,
-            FOREIGN KEY (service_id) REFERENCES service_offers(service_id)
-        )
-    """)
+        # Appointment Services (M:M relationship for multiple services per appointment)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS appointment_services (
+                appt_service_id INTEGER PRIMARY KEY,
+                appointment_id INTEGER NOT NULL,
+                service_id INTEGER NOT NULL,
+                service_name TEXT NOT NULL, -- Store name for history even if offer changes
+                labor_rate REAL NOT NULL, -- Store rate at time of booking
+                FOREIGN KEY (appointment_id) REFERENCES appointments(appointment_id) ON DELETE CASCADE,
+                FOREIGN KEY (service_id) REFERENCES service_offers(service_id)
+            )
+        """)
+
+        # Messages/Chat table
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS messages (
+                message_id INTEGER PRIMARY KEY,
+                sender_id INTEGER NOT NULL,
+                receiver_id INTEGER NOT NULL,
+                content TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                FOREIGN KEY (sender_id) REFERENCES users(user_id),
+                FOREIGN KEY (receiver_id) REFERENCES users(user_id)
+            )
+        """)
+
+        # Deleted Items History table
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS deleted_items_history (
+                history_id INTEGER PRIMARY KEY,
+                deleter_id INTEGER, -- The user_id who deleted it (Admin or User)
+                item_type TEXT NOT NULL, -- e.g., 'Vehicle', 'Appointment', 'Service Offer'
+                item_id INTEGER NOT NULL,
+                details TEXT, -- Formatted string of item details (NO JSON)
+                deleted_at TEXT NOT NULL
+            )
+        """)
 
-    # Messages/Chat table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS messages (
-            message_id INTEGER PRIMARY KEY,
-            sender_id INTEGER NOT NULL,
-            receiver_id INTEGER NOT NULL,
-            content TEXT NOT NULL,
-            timestamp TEXT NOT NULL,
-            FOREIGN KEY (sender_id) REFERENCES users(user_id),
-            FOREIGN KEY (receiver_id) REFERENCES users(user_id)
-        )
-    """)
 
-    # Deleted Items History table
+        conn.commit()
+
+        # Bring older database files up to the current schema version
+        migrate_schema(conn)
+
+# SCHEMA MIGRATIONS
+# PRAGMA user_version stores the last migration applied to a database file, so existing
+# mm_auto_repair.db files are upgraded in place the next time create_tables() runs.
+# Never edit a migration that has shipped; append a new version instead.
+# A step is either an SQL string or a function that receives the connection.
+MIGRATIONS = [
+    (1, "Indexes for slot checks, per-user lists, chat and service joins", [
+        # Slot-conflict check in add_appointment/reschedule_appointment (active rows only)
+        "CREATE INDEX IF NOT EXISTS idx_appointments_slot ON appointments(date, time, status) WHERE is_deleted = 0",
+        # get_user_appointments / get_upcoming_appointment (ordered by date, time)
+        "CREATE INDEX IF NOT EXISTS idx_appointments_user_date ON appointments(user_id, date, time)",
+        # get_completed_appointments_count / get_appointment_status_message
+        "CREATE INDEX IF NOT EXISTS idx_appointments_user_status ON appointments(user_id, status)",
+        # get_pending_appointments_count
+        "CREATE INDEX IF NOT EXISTS idx_appointments_status_active ON appointments(status) WHERE is_deleted = 0",
+        # get_all_appointments ordering and get_todays_appointments
+        "CREATE INDEX IF NOT EXISTS idx_appointments_date_time ON appointments(date, time, appointment_id)",
+        # delete_vehicle removes the vehicle's appointments
+        "CREATE INDEX IF NOT EXISTS idx_appointments_vehicle ON appointments(vehicle_id)",
+        # Every appointments -> appointment_services join (covers SUM/GROUP_CONCAT without touching the table)
+        "CREATE INDEX IF NOT EXISTS idx_appointment_services_appt ON appointment_services(appointment_id, service_name, labor_rate)",
+        # get_messages (both directions of a conversation)
+        "CREATE INDEX IF NOT EXISTS idx_messages_pair ON messages(sender_id, receiver_id, message_id)",
+        # get_user_vehicles
+        "CREATE INDEX IF NOT EXISTS idx_vehicles_user ON vehicles(user_id)",
+        # get_deleted_items_history for customers
+        "CREATE INDEX IF NOT EXISTS idx_history_deleter ON deleted_items_history(deleter_id, item_type)",
+    ]),
+    (2, "Indexes for keyset-paginated admin lists", [
+        # get_users_page sorted by name
+        "CREATE INDEX IF NOT EXISTS idx_users_name ON users(full_name, user_id)",
+        # get_vehicles_page sorted by customer: walk users by name, then each user's plates in order
+        "CREATE INDEX IF NOT EXISTS idx_vehicles_user_plate ON vehicles(user_id, plate_no)",
+    ]),
+    (3, "One Pending/Approved appointment per slot, enforced by a unique partial index", [
+        lambda conn: _reject_double_bookings(conn),
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_appointments_active_slot ON appointments(date, time) "
+        "WHERE status IN ('Pending', 'Approved') AND is_deleted = 0",
+    ]),
+    (4, "shop_counters aggregate table kept current by triggers", [
+        """
+        CREATE TABLE IF NOT EXISTS shop_counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+        """,
+        lambda conn: _install_shop_counters(conn),
+    ]),
+    (5, "Daily and per-service report rollups kept current by triggers", [
+        """
+        CREATE TABLE IF NOT EXISTS daily_rollups (
+            day TEXT PRIMARY KEY,
+            booked INTEGER NOT NULL DEFAULT 0,
+            completed INTEGER NOT NULL DEFAULT 0,
+            canceled INTEGER NOT NULL DEFAULT 0,
+            revenue_cents INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS service_daily_rollups (
+            day TEXT NOT NULL,
+            service_name TEXT NOT NULL,
+            completed INTEGER NOT NULL DEFAULT 0,
+            revenue_cents INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, service_name)
+        ) WITHOUT ROWID
+        """,
+        lambda conn: _install_report_rollups(conn),
+    ]),
+    (6, "Denormalized total_cost, service_count and services_summary on appointments", [
+        "ALTER TABLE appointments ADD COLUMN total_cost REAL",
+        "ALTER TABLE appointments ADD COLUMN service_count INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE appointments ADD COLUMN services_summary TEXT",
+        # Backfill from appointment_services (names in alphabetical order, like add_appointment writes them)
+        """
+        UPDATE appointments SET
+            total_cost = (SELECT SUM(s.labor_rate) FROM appointment_services s WHERE s.appointment_id = appointments.appointment_id),
+            service_count = (SELECT COUNT(*) FROM appointment_services s WHERE s.appointment_id = appointments.appointment_id),
+            services_summary = (
+                SELECT GROUP_CONCAT(service_name, ' | ') FROM (
+                    SELECT s.service_name FROM appointment_services s
+                    WHERE s.appointment_id = appointments.appointment_id ORDER BY s.service_name
+                )
+            )
+        """,
+    ]),
+    (7, "Epoch-millisecond timestamps for messages and deletion history", [
+        "ALTER TABLE messages ADD COLUMN sent_at_ms INTEGER",
+        "ALTER TABLE deleted_items_history ADD COLUMN deleted_at_ms INTEGER",
+        lambda conn: _backfill_epoch_ms(conn),
+        "CREATE INDEX IF NOT EXISTS idx_messages_sent_at ON messages(sent_at_ms)",
+        "CREATE INDEX IF NOT EXISTS idx_history_deleted_at ON deleted_items_history(deleted_at_ms)",
+    ]),
+    (8, "conversations table (admin inbox) and message read receipts", [
+        "ALTER TABLE messages ADD COLUMN read_at_ms INTEGER",
+        # Read state of older messages is unknown; count them as read when they were sent
+        "UPDATE messages SET read_at_ms = sent_at_ms",
+        "CREATE INDEX IF NOT EXISTS idx_messages_unread ON messages(receiver_id, sender_id) WHERE read_at_ms IS NULL",
+        """
+        CREATE TABLE IF NOT EXISTS conversations (
+            admin_id INTEGER NOT NULL,
+            customer_id INTEGER NOT NULL,
+            last_message_id INTEGER,
+            last_sender_id INTEGER,
+            last_message_preview TEXT,
+            last_activity_ms INTEGER,
+            unread_for_admin INTEGER NOT NULL DEFAULT 0,
+            unread_for_customer INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (admin_id, customer_id)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_conversations_recent ON conversations(admin_id, last_activity_ms DESC)",
+        lambda conn: _install_conversations(conn),
+    ]),
+    (9, "FTS5 search index over users, vehicles, messages and deletion history", [
+        lambda conn: _install_search_index(conn),
+    ]),
+    (10, "Normalized phone and plate columns for front-desk lookups", [
+        # Version 9 re-indexed on an update of any column; the lookup triggers below update their own rows
+        lambda conn: _narrow_search_update_triggers(conn),
+        "ALTER TABLE users ADD COLUMN phone_norm TEXT",
+        "ALTER TABLE users ADD COLUMN phone_rev TEXT",
+        "ALTER TABLE vehicles ADD COLUMN plate_norm TEXT",
+        "ALTER TABLE vehicles ADD COLUMN plate_rev TEXT",
+        lambda conn: _install_lookup_columns(conn),
+        "CREATE INDEX IF NOT EXISTS idx_users_phone_norm ON users(phone_norm)",
+        "CREATE INDEX IF NOT EXISTS idx_users_phone_rev ON users(phone_rev)",
+        "CREATE INDEX IF NOT EXISTS idx_vehicles_plate_norm ON vehicles(plate_norm)",
+        "CREATE INDEX IF NOT EXISTS idx_vehicles_plate_rev ON vehicles(plate_rev)",
+    ]),
+    (11, "table_versions change counters for the reference data cache", [
+        """
+        CREATE TABLE IF NOT EXISTS table_versions (
+            table_name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+        """,
+        lambda conn: _install_table_versions(conn),
+    ]),
+    (12, "Row counters that size the admin list pages", [
+        lambda conn: _install_row_counters(conn),
+    ]),
+    (13, "Report rollups drop permanently deleted appointments, like shop_counters", [
+        lambda conn: _install_rollup_deletes(conn),
+    ]),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+# Slot rules: Pending/Approved bookings are unique per (date, time) through idx_appointments_active_slot.
+# A Completed appointment also occupies its slot, but old data may legitimately hold two completed
+# jobs at one time, so that part is checked inside the booking's BEGIN IMMEDIATE transaction instead.
+SLOT_TAKEN_MESSAGE = "The selected date and time is already booked or is too soon. Please choose another slot."
+DOUBLE_BOOKING_MESSAGE = "This slot was double-booked before the booking fix, please reschedule your appointment, Thank you!"
+
+def _reject_double_bookings(conn): #Keeps one Pending/Approved booking per slot (Approved first, then oldest) and rejects the rest; returns the rejected IDs.
+    rejected = [row[0] for row in conn.execute("""
+        SELECT appointment_id FROM (
+            SELECT appointment_id, ROW_NUMBER() OVER (
+                PARTITION BY date, time ORDER BY status = 'Approved' DESC, appointment_id
+            ) AS slot_rank
+            FROM appointments
+            WHERE status IN ('Pending', 'Approved') AND is_deleted = 0
+        ) WHERE slot_rank > 1
+        ORDER BY appointment_id
+    """)]
+    for placeholders, chunk in _id_chunks(rejected):
+        conn.execute(f"UPDATE appointments SET status = 'Rejected', status_message = ? WHERE appointment_id IN ({placeholders})",
+                     (DOUBLE_BOOKING_MESSAGE, *chunk))
+    if rejected:
+        # The customers only see status_message; this leaves the shop a list to follow up on
+        logger.warning("Migration 3 rejected %d double-booked appointment(s), IDs: %s",
+                       len(rejected), ", ".join(map(str, rejected)))
+    return rejected
+
+def _slot_has_completed(cursor, date_str, time_str, exclude_id=None):
     cursor.execute("""
-        CREATE TABLE IF NOT EXISTS deleted_items_history (
-            history_id INTEGER PRIMARY KEY,
-            deleter_id INTEGER, -- The user_id who deleted it (Admin or User)
-            item_type TEXT NOT NULL, -- e.g., 'Vehicle', 'Appointment', 'Service Offer'
-            item_id INTEGER NOT NULL,
-            details TEXT, -- Formatted string of item details (NO JSON)
-            deleted_at TEXT NOT NULL
-        )
-    """)
+        SELECT 1 FROM appointments
+        WHERE date = ? AND time = ? AND status = 'Completed' AND is_deleted = 0 AND appointment_id != ?
+    """, (date_str, time_str, exclude_id or 0))
+    return cursor.fetchone() is not None
+
+def _is_slot_conflict(error): #True when an IntegrityError came from idx_appointments_active_slot.
+    return "UNIQUE constraint failed: appointments.date, appointments.time" in str(error)
+
+# TIMESTAMPS
+# Messages and deletion history store when they happened as epoch milliseconds (sent_at_ms,
+# deleted_at_ms): sortable, indexable and usable in range queries. The old text columns
+# (timestamp, deleted_at) are still written, as sortable local 'YYYY-MM-DD HH:MM:SS', for anyone
+# reading the file directly; the app formats the epoch values for display in frontend.py.
+TIMESTAMP_TEXT_FORMAT = "%Y-%m-%d %H:%M:%S"
+_LEGACY_TIMESTAMP_FORMATS = ("%Y-%m-%d %I:%M %p", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M")
+
+def epoch_ms(moment=None): #datetime (local time, default now) -> epoch milliseconds.
+    if moment is None:
+        return int(time.time() * 1000)
+    return int(moment.timestamp() * 1000)
+
+def _parse_legacy_timestamp(text): #Stored timestamp text -> local datetime (None if unreadable).
+    for fmt in _LEGACY_TIMESTAMP_FORMATS:
+        try:
+            return datetime.strptime(text, fmt)
+        except (TypeError, ValueError):
+            continue
+    return None
 
+def _backfill_epoch_ms(conn): #Migration step: fills the *_ms columns and rewrites the text columns as sortable ISO.
+    for table, key, text_col, ms_col in (("messages", "message_id", "timestamp", "sent_at_ms"),
+                                         ("deleted_items_history", "history_id", "deleted_at", "deleted_at_ms")):
+        updates = []
+        for row_id, text in conn.execute(f"SELECT {key}, {text_col} FROM {table}").fetchall():
+            moment = _parse_legacy_timestamp(text)
+            if moment is not None:
+                updates.append((epoch_ms(moment), moment.strftime(TIMESTAMP_TEXT_FORMAT), row_id))
+        conn.executemany(f"UPDATE {table} SET {ms_col} = ?, {text_col} = ? WHERE {key} = ?", updates)
+
+def get_schema_version(): #Returns the migration version stored in the database file.
+    with db_connection() as conn:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate_schema(conn): #Applies every migration newer than PRAGMA user_version, one transaction each.
+    current = conn.execute("PRAGMA user_version").fetchone()[0]
+    if current > SCHEMA_VERSION:
+        raise RuntimeError(f"Database schema version {current} is newer than this application ({SCHEMA_VERSION}).")
+
+    applied = False
+    for version, description, steps in MIGRATIONS:
+        if version <= current:
+            continue
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied = True
 
-    conn.commit()
-    conn.close()
+    if applied:
+        # Refresh planner statistics so the new indexes get used straight away
+        conn.execute("PRAGMA optimize")
+    return SCHEMA_VERSION
 
 def setup_initial_data(): #set up the default admin user and service offers.
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Check and insert Admin if not exists
-    cursor.execute("SELECT user_id FROM users WHERE username = 'Admin'")
-    if cursor.fetchone() is None:
-        try:
-            # user_type 1 for Admin
-            cursor.execute("INSERT INTO users (username, password, full_name, phone_no, user_type) VALUES (?, ?, ?, ?, ?)", 
-                           ('Admin', 'admin123', 'Admin', '09991234567', 1))
-        except sqlite3.IntegrityError:
-            pass 
-    
-    # Check and insert default service offers
-    default_offers = [
-        ('Oil Change', 145.00), ('Brake Repair and Inspection', 500.00), ('Electrical System Repairs', 1000.00),
-        ('Engine Diagnostic Services', 600.00), ('Tire Services', 250.00), ('Battery Services', 450.00),
-        ('Heating and Air Conditioning (A/C) Repairs', 1500.00), ('Suspension and Steering System Repairs', 750.00), 
-        ('Transmission Repair', 2000.00)
-    ]
-    for name, rate in default_offers:
-        cursor.execute("SELECT service_id FROM service_offers WHERE service_name = ?", (name,))
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        
+        # Check and insert Admin if not exists
+        cursor.execute("SELECT user_id FROM users WHERE username = 'Admin'")
         if cursor.fetchone() is None:
             try:
-                cursor.execute("INSERT INTO service_offers (service_name, labor_rate) VALUES (?, ?)", (name, rate))
+                # user_type 1 for Admin
+                cursor.execute("INSERT INTO users (username, password, full_name, phone_no, user_type) VALUES (?, ?, ?, ?, ?)", 
+                               ('Admin', 'admin123', 'Admin', '09991234567', 1))
             except sqlite3.IntegrityError:
                 pass 
+        
+        # Check and insert default service offers
+        default_offers = [
+            ('Oil Change', 145.00), ('Brake Repair and Inspection', 500.00), ('Electrical System Repairs', 1000.00),
+            ('Engine Diagnostic Services', 600.00), ('Tire Services', 250.00), ('Battery Services', 450.00),
+            ('Heating and Air Conditioning (A/C) Repairs', 1500.00), ('Suspension and Steering System Repairs', 750.00), 
+            ('Transmission Repair', 2000.00)
+        ]
+        for name, rate in default_offers:
+            cursor.execute("SELECT service_id FROM service_offers WHERE service_name = ?", (name,))
+            if cursor.fetchone() is None:
+                try:
+                    cursor.execute("INSERT INTO service_offers (service_name, labor_rate) VALUES (?, ?)", (name, rate))
+                except sqlite3.IntegrityError:
+                    pass 
 
-    conn.commit()
-    conn.close()
+        conn.commit()
 
 #helper function
 def _format_details(data): #Formats a dictionary into a simple string.
     return " | ".join([f"{k}: {v}" for k, v in data.items()])
 
-def log_deleted_item(deleter_id, item_type, item_id, details_dict):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    details = _format_details(details_dict)
-    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    cursor.execute("""
-        INSERT INTO deleted_items_history (deleter_id, item_type, item_id, details, deleted_at)
-        VALUES (?, ?, ?, ?, ?)
-    """, (deleter_id, item_type, item_id, details, now))
-    conn.commit()
-    conn.close()
+_AUDIT_INSERT_SQL = """
+    INSERT INTO deleted_items_history (deleter_id, item_type, item_id, details, deleted_at, deleted_at_ms)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+def _audit_row(deleter_id, item_type, item_id, details_dict):
+    now = datetime.now()
+    return (deleter_id, item_type, item_id, _format_details(details_dict), now.strftime(TIMESTAMP_TEXT_FORMAT), epoch_ms(now))
+
+def log_deleted_item(deleter_id, item_type, item_id, details_dict, conn=None): #Pass conn to write the row inside the caller's transaction.
+    if conn is not None:
+        conn.execute(_AUDIT_INSERT_SQL, _audit_row(deleter_id, item_type, item_id, details_dict))
+        return True
+    with transaction() as conn:
+        conn.execute(_AUDIT_INSERT_SQL, _audit_row(deleter_id, item_type, item_id, details_dict))
     return True
 
+# UNIT OF WORK
+# Deletes and their deleted_items_history rows are written in one BEGIN IMMEDIATE transaction,
+# so the data and the audit log can never disagree and each delete (or bulk delete) is one commit.
+#   with unit_of_work() as uow:
+#       uow.cursor.execute("DELETE ...")
+#       uow.log_deleted(deleter_id, 'Vehicle', vehicle_id, vehicle_details)
+# An exception inside the block rolls everything back, audit rows included.
+class UnitOfWork:
+    def __init__(self, conn):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self._audit_rows = []
+
+    def log_deleted(self, deleter_id, item_type, item_id, details_dict): #Queues an audit row; written with one executemany before commit.
+        self._audit_rows.append(_audit_row(deleter_id, item_type, item_id, details_dict))
+
+    def flush(self):
+        if self._audit_rows:
+            self.cursor.executemany(_AUDIT_INSERT_SQL, self._audit_rows)
+            self._audit_rows = []
+
+@contextmanager
+def unit_of_work():
+    with transaction() as conn:
+        uow = UnitOfWork(conn)
+        yield uow
+        uow.flush()
+
+def _id_chunks(ids, size=500): #Splits a list of IDs into (placeholders, chunk) pairs that stay under SQLite's variable limit.
+    for start in range(0, len(ids), size):
+        chunk = ids[start:start + size]
+        yield ','.join('?' for _ in chunk), chunk
+
+def _unique_ids(ids):
+    return list(dict.fromkeys(int(i) for i in ids))
+
 # user function
 
 def get_user_by_username(username):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    # SELECT * is used to get all columns, including 'password'
-    cursor.execute("SELECT * FROM users WHERE username = ?", (username,))
-    user_data = cursor.fetchone()
-    conn.close()
-    if user_data:
-        # Get column names for dictionary conversion
-        cols = [col[0] for col in cursor.description]
-        return dict(zip(cols, user_data))
-    return None
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        # SELECT * is used to get all columns, including 'password'
+        cursor.execute("SELECT * FROM users WHERE username = ?", (username,))
+        user_data = cursor.fetchone()
+    return _record(UserRecord, cursor.description, user_data)
 
 def update_last_login(user_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    cursor.execute("UPDATE users SET last_login = ? WHERE user_id = ?", (now, user_id))
-    conn.commit()
-    conn.close()
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        cursor.execute("UPDATE users SET last_login = ? WHERE user_id = ?", (now, user_id))
+        conn.commit()
+    invalidate_cache('users')
 
 def register_new_user(username, full_name, phone_no, password):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute("INSERT INTO users (username, password, full_name, phone_no, user_type) VALUES (?, ?, ?, ?, ?)", 
-                       (username, password, full_name, phone_no, 0))
-        conn.commit()
-        conn.close()
-        return True, "Registration successful. You can now log in."
-    except sqlite3.IntegrityError:
-        conn.close()
-        return False, "Username already exists. Please choose a different one."
-    except Exception as e:
-        conn.close()
-        return False, f"An unexpected error occurred: {e}"
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("INSERT INTO users (username, password, full_name, phone_no, user_type) VALUES (?, ?, ?, ?, ?)", 
+                           (username, password, full_name, phone_no, 0))
+            conn.commit()
+            invalidate_cache('users')
+            return True, "Registration successful. You can now log in."
+        except sqlite3.IntegrityError:
+            return Result(False, "Username already exists. Please choose a different one.", error=CONFLICT)
+        except Exception as e:
+            return False, f"An unexpected error occurred: {e}"
 
 
 def update_user_profile(user_id, username, full_name, phone_no, new_password=None):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    try:
-        cursor.execute("SELECT user_id FROM users WHERE username = ? AND user_id != ?", (username, user_id))
-        if cursor.fetchone():
-            return "Error: Username already exists. Please choose a different one."
-            
-        if new_password:
-            import hashlib
-            hashed_password = hashlib.sha256(new_password.encode('utf-8')).hexdigest()
-            
-            query = """
-                UPDATE users SET 
-                    username = ?, 
-                    full_name = ?, 
-                    phone_no = ?,
-                    password = ? 
-                WHERE user_id = ?
-            """
-            params = (username, full_name, phone_no, hashed_password, user_id)
-        else:
-            query = """
-                UPDATE users SET 
-                    username = ?, 
-                    full_name = ?, 
-                    phone_no = ?
-                WHERE user_id = ?
-            """
-            params = (username, full_name, phone_no, user_id)
-            
-        cursor.execute(query, params)
-        conn.commit()
-        return "Success: Profile updated successfully."
-        
-    except sqlite3.Error as e:
-        return f"Database Error: {e}"
+    with db_connection() as conn:
+        cursor = conn.cursor()
         
-    finally:
-        conn.close()
+        try:
+            cursor.execute("SELECT user_id FROM users WHERE username = ? AND user_id != ?", (username, user_id))
+            if cursor.fetchone():
+                return Result(False, "Username already exists. Please choose a different one.", error=CONFLICT)
+                
+            if new_password:
+                import hashlib
+                hashed_password = hashlib.sha256(new_password.encode('utf-8')).hexdigest()
+                
+                query = """
+                    UPDATE users SET 
+                        username = ?, 
+                        full_name = ?, 
+                        phone_no = ?,
+                        password = ? 
+                    WHERE user_id = ?
+                """
+                params = (username, full_name, phone_no, hashed_password, user_id)
+            else:
+                query = """
+                    UPDATE users SET 
+                        username = ?, 
+                        full_name = ?, 
+                        phone_no = ?
+                    WHERE user_id = ?
+                """
+                params = (username, full_name, phone_no, user_id)
+                
+            cursor.execute(query, params)
+            conn.commit()
+            invalidate_cache('users')
+            return True, "Profile updated successfully."
+            
+        except sqlite3.Error as e:
+            return False, f"Database Error: {e}"
 
 # vehicle function
 
+# User-facing columns only: plate_norm/plate_rev are search shadows (migration 10) and must not
+# reach the UI, the API or the deleted-items audit details.
+_VEHICLE_COLUMNS = "vehicle_id, user_id, brand, model, plate_no"
+
+_USER_VEHICLES_SQL = f"SELECT {_VEHICLE_COLUMNS} FROM vehicles WHERE user_id = ?"
+
 def get_user_vehicles(user_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM vehicles WHERE user_id = ?", (user_id,))
-    vehicles_data = cursor.fetchall()
-    cols = [col[0] for col in cursor.description]
-    conn.close()
-    return [dict(zip(cols, row)) for row in vehicles_data]
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(_USER_VEHICLES_SQL, (user_id,))
+        vehicles_data = cursor.fetchall()
+    return _records(VehicleRecord, cursor.description, vehicles_data)
 
 def add_vehicle(user_id, brand, model, plate_no):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute("INSERT INTO vehicles (user_id, brand, model, plate_no) VALUES (?, ?, ?, ?)", (user_id, brand, model, plate_no.upper()))
-        conn.commit()
-        conn.close()
-        return True, "Vehicle added successfully."
-    except sqlite3.IntegrityError:
-        conn.close()
-        return False, f"Plate number '{plate_no}' already exists in the system."
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("INSERT INTO vehicles (user_id, brand, model, plate_no) VALUES (?, ?, ?, ?)", (user_id, brand, model, plate_no.upper()))
+            conn.commit()
+            return True, "Vehicle added successfully."
+        except sqlite3.IntegrityError:
+            return Result(False, f"Plate number '{plate_no}' already exists in the system.", error=CONFLICT)
+
+def _delete_vehicles(uow, deleter_id, vehicle_ids): #Deletes vehicles and their appointments inside uow. None (nothing changed) if an ID is missing.
+    vehicles = []
+    for placeholders, chunk in _id_chunks(vehicle_ids):
+        uow.cursor.execute(f"SELECT {_VEHICLE_COLUMNS} FROM vehicles WHERE vehicle_id IN ({placeholders})", chunk)
+        vehicles += _records(VehicleRecord, uow.cursor.description, uow.cursor.fetchall())
+    if len(vehicles) != len(vehicle_ids):
+        return None
 
-def delete_vehicle(user_id, vehicle_id): #Deletes a vehicle and logs the action.
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # 1. Get vehicle details for logging (and check if it belongs to user if user_id is provided)
-    cursor.execute("SELECT * FROM vehicles WHERE vehicle_id = ?", (vehicle_id,))
-    vehicle = cursor.fetchone()
-    if not vehicle:
-        conn.close()
-        return False, "Vehicle not found."
-    
-    cols = [col[0] for col in cursor.description]
-    vehicle_details = dict(zip(cols, vehicle))
-    
-    # 2. Delete associated appointments (cascaded from appointments to appointment_services is needed)
-    cursor.execute("DELETE FROM appointments WHERE vehicle_id = ?", (vehicle_id,))
-    
-    # 3. Then delete the vehicle
-    cursor.execute("DELETE FROM vehicles WHERE vehicle_id = ?", (vehicle_id,))
-    conn.commit()
-    conn.close()
+    for placeholders, chunk in _id_chunks(vehicle_ids):
+        # Delete associated appointments first (appointment_services cascade from appointments)
+        uow.cursor.execute(f"DELETE FROM appointments WHERE vehicle_id IN ({placeholders})", chunk)
+        uow.cursor.execute(f"DELETE FROM vehicles WHERE vehicle_id IN ({placeholders})", chunk)
+    for vehicle in vehicles:
+        uow.log_deleted(deleter_id, 'Vehicle', vehicle['vehicle_id'], vehicle)
+    return vehicles
 
-    # 4. Log deletion
-    log_deleted_item(user_id, 'Vehicle', vehicle_id, vehicle_details)
-    return True, f"Vehicle (Plate: {vehicle_details['plate_no']}) and associated appointments deleted."
+def delete_vehicle(user_id, vehicle_id): #Deletes a vehicle and logs the action.
+    with unit_of_work() as uow:
+        deleted = _delete_vehicles(uow, user_id, _unique_ids([vehicle_id]))
+    if not deleted:
+        return Result(False, "Vehicle not found.", error=NOT_FOUND)
+    return True, f"Vehicle (Plate: {deleted[0]['plate_no']}) and associated appointments deleted."
+
+def delete_vehicles(user_id, vehicle_ids): #Bulk delete_vehicle: all vehicles and audit rows in one transaction, or none.
+    vehicle_ids = _unique_ids(vehicle_ids)
+    if not vehicle_ids:
+        return Result(False, "No vehicles selected.", error=INVALID)
+    with unit_of_work() as uow:
+        deleted = _delete_vehicles(uow, user_id, vehicle_ids)
+    if not deleted:
+        return Result(False, "One or more vehicles were not found. Nothing was deleted.", error=NOT_FOUND)
+    return True, f"{len(deleted)} vehicle(s) and their associated appointments deleted."
 
 def get_vehicle_by_id(vehicle_id): #Fetches a vehicle by ID.
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM vehicles WHERE vehicle_id = ?", (vehicle_id,))
-    vehicle_data = cursor.fetchone()
-    conn.close()
-    if vehicle_data:
-        cols = [col[0] for col in cursor.description]
-        return dict(zip(cols, vehicle_data))
-    return None
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT {_VEHICLE_COLUMNS} FROM vehicles WHERE vehicle_id = ?", (vehicle_id,))
+        vehicle_data = cursor.fetchone()
+    return _record(VehicleRecord, cursor.description, vehicle_data)
 
 # appointment function
 
 def get_service_offers_by_id(service_ids): #Fetches service offers by a list of IDs.
     if not service_ids:
         return []
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    # Use IN clause for multiple IDs
-    placeholders = ','.join('?' for _ in service_ids)
-    cursor.execute(f"SELECT * FROM service_offers WHERE service_id IN ({placeholders})", service_ids)
-    offers_data = cursor.fetchall()
-    cols = [col[0] for col in cursor.description]
-    conn.close()
-    return [dict(zip(cols, row)) for row in offers_data]
-
-def add_appointment(user_id, vehicle_id, service_ids, date_str, time_str): #Adds a new appointment with multiple services.
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Check for existing pending/approved appointment for the same time slot
-    cursor.execute("""
-        SELECT 1 FROM appointments 
-        WHERE date = ? AND time = ? AND status IN ('Pending', 'Approved', 'Completed') AND is_deleted = 0
-    """, (date_str, time_str))
-    if cursor.fetchone():
-        conn.close()
-        return False, "The selected date and time is already booked or is too soon. Please choose another slot."
-
-    # 1. Insert into appointments table
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        # Use IN clause for multiple IDs
+        placeholders = ','.join('?' for _ in service_ids)
+        cursor.execute(f"SELECT {_SERVICE_OFFER_COLUMNS} FROM service_offers WHERE service_id IN ({placeholders})", service_ids)
+        offers_data = cursor.fetchall()
+    return _records(ServiceRecord, cursor.description, offers_data)
+
+def add_appointment(user_id, vehicle_id, service_ids, date_str, time_str): #Adds a new appointment with multiple services in one transaction; Result.value is its appointment_id.
+    if not service_ids:
+        return Result(False, "No valid services selected.", error=INVALID)
     try:
-        cursor.execute("""
-            INSERT INTO appointments (user_id, vehicle_id, date, time, status) 
-            VALUES (?, ?, ?, ?, ?)
-        """, (user_id, vehicle_id, date_str, time_str, 'Pending'))
-        appointment_id = cursor.lastrowid
-    except Exception as e:
-        conn.close()
-        return False, f"Failed to create appointment: {e}"
-
-    # 2. Get current service rates and insert into appointment_services
-    selected_services = get_service_offers_by_id(service_ids)
-    if not selected_services:
-        conn.rollback()
-        conn.close()
-        return False, "No valid services selected."
-
-    for service in selected_services:
-        try:
+        with transaction() as conn:
+            cursor = conn.cursor()
+
+            # 1. Get current service rates (same connection and transaction as the inserts)
+            placeholders = ','.join('?' for _ in service_ids)
+            cursor.execute(f"SELECT service_id, service_name, labor_rate FROM service_offers WHERE service_id IN ({placeholders})", list(service_ids))
+            selected_services = cursor.fetchall()
+            if not selected_services:
+                return Result(False, "No valid services selected.", error=INVALID)
+
+            # 2. A completed job keeps its slot (Pending/Approved clashes are caught by the unique index)
+            if _slot_has_completed(cursor, date_str, time_str):
+                return Result(False, SLOT_TAKEN_MESSAGE, error=CONFLICT)
+
+            # 3. Insert into appointments table, with the cost and services summary the lists display
+            selected_services.sort(key=lambda service: service[1])
+            total_cost = sum(rate for _, _, rate in selected_services)
+            services_summary = ' | '.join(name for _, name, _ in selected_services)
             cursor.execute("""
+                INSERT INTO appointments (user_id, vehicle_id, date, time, status, total_cost, service_count, services_summary) 
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (user_id, vehicle_id, date_str, time_str, 'Pending', total_cost, len(selected_services), services_summary))
+            appointment_id = cursor.lastrowid
+
+            # 4. Insert the booked services with the rates read above
+            cursor.executemany("""
                 INSERT INTO appointment_services (appointment_id, service_id, service_name, labor_rate)
                 VALUES (?, ?, ?, ?)
-            """, (appointment_id, service['service_id'], service['service_name'], service['labor_rate']))
-        except Exception as e:
-            conn.rollback()
-            conn.close()
-            return False, f"Failed to add service detail: {e}"
-            
-    conn.commit()
-    conn.close()
-    return True, "Appointment booked! Awaiting admin approval."
+            """, [(appointment_id, service_id, name, rate) for service_id, name, rate in selected_services])
+    except sqlite3.IntegrityError as e:
+        if _is_slot_conflict(e):
+            return Result(False, SLOT_TAKEN_MESSAGE, error=CONFLICT)
+        return False, f"Failed to create appointment: {e}"
+    except sqlite3.Error as e:
+        return False, f"Failed to create appointment: {e}"
+    return Result(True, "Appointment booked! Awaiting admin approval.", appointment_id)
+
+_USER_APPOINTMENTS_SQL = """
+    SELECT 
+        a.appointment_id, a.date, a.time, a.status, a.status_message, a.is_deleted, 
+        v.plate_no, v.brand, v.model,
+        a.services_summary AS services_names, a.total_cost
+    FROM appointments a
+    JOIN vehicles v ON a.vehicle_id = v.vehicle_id
+    WHERE a.user_id = ? 
+    ORDER BY a.date DESC, a.time DESC
+"""
 
 def get_user_appointments(user_id): #Fetches all appointments (including canceled/deleted, with service details) for a user.
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        SELECT 
-            a.appointment_id, a.date, a.time, a.status, a.status_message, a.is_deleted, 
-            v.plate_no, v.brand, v.model,
-            GROUP_CONCAT(s.service_name, ' | ') AS services_names,
-            SUM(s.labor_rate) AS total_cost
-        FROM appointments a
-        JOIN vehicles v ON a.vehicle_id = v.vehicle_id
-        LEFT JOIN appointment_services s ON a.appointment_id = s.appointment_id
-        WHERE a.user_id = ? 
-        GROUP BY a.appointment_id
-        ORDER BY a.date DESC, a.time DESC
-    """, (user_id,))
-    
-    appointments_data = cursor.fetchall()
-    cols = [col[0] for col in cursor.description]
-    conn.close()
-    return [dict(zip(cols, row)) for row in appointments_data]
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(_USER_APPOINTMENTS_SQL, (user_id,))
+        
+        appointments_data = cursor.fetchall()
+    return _records(AppointmentRecord, cursor.description, appointments_data)
+
+_ALL_APPOINTMENTS_SQL = """
+    SELECT 
+        a.appointment_id, a.date, a.time, a.status, a.status_message, a.is_deleted,
+        u.full_name, u.phone_no,
+        v.plate_no, v.brand, v.model,
+        a.services_summary AS services_names, a.total_cost
+    FROM appointments a
+    JOIN users u ON a.user_id = u.user_id
+    JOIN vehicles v ON a.vehicle_id = v.vehicle_id
+    ORDER BY a.date DESC, a.time DESC
+"""
 
 def get_all_appointments(): #Fetches all appointments (Admin view, with user and service details).
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        SELECT 
-            a.appointment_id, a.date, a.time, a.status, a.status_message, a.is_deleted,
-            u.full_name, u.phone_no,
-            v.plate_no, v.brand, v.model,
-            GROUP_CONCAT(s.service_name, ' | ') AS services_names,
-            SUM(s.labor_rate) AS total_cost
-        FROM appointments a
-        JOIN users u ON a.user_id = u.user_id
-        JOIN vehicles v ON a.vehicle_id = v.vehicle_id
-        LEFT JOIN appointment_services s ON a.appointment_id = s.appointment_id
-        GROUP BY a.appointment_id
-        ORDER BY a.date DESC, a.time DESC
-    """)
-    
-    appointments_data = cursor.fetchall()
-    cols = [col[0] for col in cursor.description]
-    conn.close()
-    return [dict(zip(cols, row)) for row in appointments_data]
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(_ALL_APPOINTMENTS_SQL)
+        
+        appointments_data = cursor.fetchall()
+    return _records(AppointmentRecord, cursor.description, appointments_data)
 
 def get_upcoming_appointment(user_id): #Fetches the nearest appointment that is Pending or Approved.
     now = datetime.now()
     now_date = now.strftime("%Y-%m-%d")
     now_time = now.strftime("%H:%M")
     
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        SELECT 
-            a.status, v.plate_no, a.date, a.time
-        FROM appointments a
-        JOIN vehicles v ON a.vehicle_id = v.vehicle_id
-        WHERE a.user_id = ? AND a.status IN ('Pending', 'Approved') AND a.is_deleted = 0
-        AND (a.date > ? OR (a.date = ? AND a.time > ?))
-        ORDER BY a.date ASC, a.time ASC
-        LIMIT 1
-    """, (user_id, now_date, now_date, now_time))
-    
-    upcoming = cursor.fetchone()
-    conn.close()
-    
-    if upcoming:
-        cols = ['status', 'plate_no', 'date', 'time']
-        return dict(zip(cols, upcoming))
-    return None
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT 
+                a.status, v.plate_no, a.date, a.time
+            FROM appointments a
+            JOIN vehicles v ON a.vehicle_id = v.vehicle_id
+            WHERE a.user_id = ? AND a.status IN ('Pending', 'Approved') AND a.is_deleted = 0
+            AND (a.date > ? OR (a.date = ? AND a.time > ?))
+            ORDER BY a.date ASC, a.time ASC
+            LIMIT 1
+        """, (user_id, now_date, now_date, now_time))
+        
+        upcoming = cursor.fetchone()
+    return _record(AppointmentRecord, cursor.description, upcoming)
+
+def get_appointments_by_id(appointment_ids): #Owner, vehicle, slot and status of each appointment (missing IDs are left out).
+    appointment_ids = _unique_ids(appointment_ids)
+    appointments = []
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        for placeholders, chunk in _id_chunks(appointment_ids):
+            cursor.execute(f"""
+                SELECT appointment_id, user_id, vehicle_id, date, time, status, is_deleted
+                FROM appointments WHERE appointment_id IN ({placeholders})
+            """, chunk)
+            appointments += _records(AppointmentRecord, cursor.description, cursor.fetchall())
+    return appointments
 
 def update_appointment_status(appointment_id, new_status, full_name=None): #Updates the appointment status and sets the corresponding status message.
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
     if new_status == 'Approved':
         message = "Appointment Approved please bring your vehicle at our shop to start the process, Thank you!"
     elif new_status == 'Rejected':
@@ -448,361 +1263,1629 @@ def update_appointment_status(appointment_id, new_status, full_name=None): #Upda
     else:
         message = None # For Pending, Canceled etc.
 
-    cursor.execute("UPDATE appointments SET status = ?, status_message = ? WHERE appointment_id = ?",
-                   (new_status, message, appointment_id))
-    conn.commit()
-    conn.close()
-
-def delete_appointment(deleter_id, appointment_id, status): #Permanently deletes an appointment and logs the action.
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    try:
+        with transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute("UPDATE appointments SET status = ?, status_message = ? WHERE appointment_id = ?",
+                           (new_status, message, appointment_id))
+    except sqlite3.IntegrityError as e:
+        # e.g. approving a Rejected appointment whose slot has since been booked by someone else
+        if _is_slot_conflict(e):
+            return Result(False, "Another appointment already holds this date and time. Ask the customer to reschedule.", error=CONFLICT)
+        return False, f"Failed to update appointment: {e}"
+    return True, f"Appointment status updated to {new_status}."
+
+def _delete_appointments(uow, deleter_id, appointment_ids): #Permanently deletes appointments inside uow. None (nothing changed) if an ID is missing.
+    appointments = []
+    for placeholders, chunk in _id_chunks(appointment_ids):
+        # Get appointment details for logging
+        uow.cursor.execute(f"""
+            SELECT 
+                a.appointment_id, a.date, a.time, a.status, u.username, v.plate_no, a.total_cost
+            FROM appointments a
+            JOIN users u ON a.user_id = u.user_id
+            JOIN vehicles v ON a.vehicle_id = v.vehicle_id
+            WHERE a.appointment_id IN ({placeholders})
+        """, chunk)
+        appointments += _records(AppointmentRecord, uow.cursor.description, uow.cursor.fetchall())
+    if len(appointments) != len(appointment_ids):
+        return None
 
-    # 1. Get appointment details for logging
-    cursor.execute("""
-        SELECT 
-            a.appointment_id, a.date, a.time, a.status, u.username, v.plate_no, SUM(s.labor_rate) AS total_cost
-        FROM appointments a
-        JOIN users u ON a.user_id = u.user_id
-        JOIN vehicles v ON a.vehicle_id = v.vehicle_id
-        LEFT JOIN appointment_services s ON a.appointment_id = s.appointment_id
-        WHERE a.appointment_id = ?
-        GROUP BY a.appointment_id
-    """, (appointment_id,))
-    appt = cursor.fetchone()
-    if not appt:
-        conn.close()
-        return False, "Appointment not found."
-        
-    cols = ['appointment_id', 'date', 'time', 'status', 'username', 'plate_no', 'total_cost']
-    appt_details = dict(zip(cols, appt))
-    
-    # 2. Delete the appointment (appointment_services will cascade delete)
-    cursor.execute("DELETE FROM appointments WHERE appointment_id = ?", (appointment_id,))
-    conn.commit()
-    conn.close()
+    for placeholders, chunk in _id_chunks(appointment_ids):
+        # appointment_services will cascade delete
+        uow.cursor.execute(f"DELETE FROM appointments WHERE appointment_id IN ({placeholders})", chunk)
+    for appt in appointments:
+        uow.log_deleted(deleter_id, 'Appointment', appt['appointment_id'], appt)
+    return appointments
+
+def delete_appointment(deleter_id, appointment_id): #Permanently deletes an appointment and logs the action.
+    with unit_of_work() as uow:
+        deleted = _delete_appointments(uow, deleter_id, _unique_ids([appointment_id]))
+    if not deleted:
+        return Result(False, "Appointment not found.", error=NOT_FOUND)
+    return True, f"Appointment (ID: {appointment_id}, Status: {deleted[0]['status']}) permanently deleted."
+
+def delete_appointments(deleter_id, appointment_ids): #Bulk delete_appointment: all appointments and audit rows in one transaction, or none.
+    appointment_ids = _unique_ids(appointment_ids)
+    if not appointment_ids:
+        return Result(False, "No appointments selected.", error=INVALID)
+    with unit_of_work() as uow:
+        deleted = _delete_appointments(uow, deleter_id, appointment_ids)
+    if not deleted:
+        return Result(False, "One or more appointments were not found. Nothing was deleted.", error=NOT_FOUND)
+    return True, f"{len(deleted)} appointment(s) permanently deleted."
+
+def _cancel_appointments(uow, user_id, appointment_ids): #Cancels (soft-deletes) appointments inside uow. None (nothing changed) if an ID is missing.
+    appointments = []
+    for placeholders, chunk in _id_chunks(appointment_ids):
+        # Get appointment details for logging
+        uow.cursor.execute(f"""
+            SELECT 
+                a.appointment_id, a.date, a.time, a.status, u.username, v.plate_no
+            FROM appointments a
+            JOIN users u ON a.user_id = u.user_id
+            JOIN vehicles v ON a.vehicle_id = v.vehicle_id
+            WHERE a.appointment_id IN ({placeholders})
+        """, chunk)
+        appointments += _records(AppointmentRecord, uow.cursor.description, uow.cursor.fetchall())
+    if len(appointments) != len(appointment_ids):
+        return None
 
-    # 3. Log deletion
-    log_deleted_item(deleter_id, 'Appointment', appointment_id, appt_details)
-    return True, f"Appointment (ID: {appointment_id}, Status: {status}) permanently deleted."
+    for placeholders, chunk in _id_chunks(appointment_ids):
+        # Update status and soft delete flag
+        uow.cursor.execute(f"UPDATE appointments SET status = 'Canceled', status_message = 'Appointment canceled by user.', is_deleted = 1 WHERE appointment_id IN ({placeholders})", chunk)
+    for appt in appointments:
+        uow.log_deleted(user_id, 'Appointment_Canceled', appt['appointment_id'], appt)
+    return appointments
 
 def cancel_appointment(user_id, appointment_id): #Cancels an appointment (soft-delete and status update) and logs the action.
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # 1. Get appointment details for logging
-    cursor.execute("""
-        SELECT 
-            a.appointment_id, a.date, a.time, a.status, u.username, v.plate_no
-        FROM appointments a
-        JOIN users u ON a.user_id = u.user_id
-        JOIN vehicles v ON a.vehicle_id = v.vehicle_id
-        WHERE a.appointment_id = ?
-    """, (appointment_id,))
-    appt = cursor.fetchone()
-    if not appt:
-        conn.close()
-        return False, "Appointment not found."
-    
-    cols = ['appointment_id', 'date', 'time', 'status', 'username', 'plate_no']
-    appt_details = dict(zip(cols, appt))
-    
-    # 2. Update status and soft delete flag
-    cursor.execute("UPDATE appointments SET status = 'Canceled', status_message = 'Appointment canceled by user.', is_deleted = 1 WHERE appointment_id = ?", (appointment_id,))
-    conn.commit()
-    conn.close()
-
-    # 3. Log cancellation
-    log_deleted_item(user_id, 'Appointment_Canceled', appointment_id, appt_details)
+    with unit_of_work() as uow:
+        canceled = _cancel_appointments(uow, user_id, _unique_ids([appointment_id]))
+    if not canceled:
+        return Result(False, "Appointment not found.", error=NOT_FOUND)
     return True, f"Appointment (ID: {appointment_id}) has been successfully canceled."
 
+def cancel_appointments(user_id, appointment_ids): #Bulk cancel_appointment: all cancellations and audit rows in one transaction, or none.
+    appointment_ids = _unique_ids(appointment_ids)
+    if not appointment_ids:
+        return Result(False, "No appointments selected.", error=INVALID)
+    with unit_of_work() as uow:
+        canceled = _cancel_appointments(uow, user_id, appointment_ids)
+    if not canceled:
+        return Result(False, "One or more appointments were not found. Nothing was canceled.", error=NOT_FOUND)
+    return True, f"{len(canceled)} appointment(s) canceled."
+
 def reschedule_appointment(appointment_id, new_date, new_time): #Reschedules an appointment (updates date/time and resets status to Pending).
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Check for time slot availability
-    cursor.execute("""
-        SELECT 1 FROM appointments 
-        WHERE date = ? AND time = ? AND status IN ('Pending', 'Approved', 'Completed') AND appointment_id != ? AND is_deleted = 0
-    """, (new_date, new_time, appointment_id))
-    if cursor.fetchone():
-        conn.close()
-        return False, "The selected date and time is already booked. Please choose another slot."
-
-    # Update appointment details
-    cursor.execute("UPDATE appointments SET date = ?, time = ?, status = 'Pending', status_message = NULL WHERE appointment_id = ?", 
-                   (new_date, new_time, appointment_id))
-    conn.commit()
-    conn.close()
+    try:
+        with transaction() as conn:
+            cursor = conn.cursor()
+
+            # A completed job keeps its slot (Pending/Approved clashes are caught by the unique index)
+            if _slot_has_completed(cursor, new_date, new_time, exclude_id=appointment_id):
+                return Result(False, "The selected date and time is already booked. Please choose another slot.", error=CONFLICT)
+
+            # Update appointment details
+            cursor.execute("UPDATE appointments SET date = ?, time = ?, status = 'Pending', status_message = NULL WHERE appointment_id = ?", 
+                           (new_date, new_time, appointment_id))
+    except sqlite3.IntegrityError as e:
+        if _is_slot_conflict(e):
+            return Result(False, "The selected date and time is already booked. Please choose another slot.", error=CONFLICT)
+        return False, f"Failed to reschedule appointment: {e}"
     return True, "Appointment successfully rescheduled. Awaiting admin approval."
 
-def get_appointment_status_message(user_id): #Fetches the status and message of the latest approved/rejected/completed/canceled appointment.
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        SELECT status, status_message 
-        FROM appointments 
-        WHERE user_id = ? AND status IN ('Approved', 'Rejected', 'Completed', 'Canceled')
-        ORDER BY appointment_id DESC
-        LIMIT 1
-    """, (user_id,))
-    
-    status_data = cursor.fetchone()
-    conn.close()
-    if status_data:
-        return {'status': status_data[0], 'message': status_data[1]}
-    return None
+# Shop hours for get_available_slots: the same 06:00-17:00 window MMAutoRepairShop.book_appointment accepts (17:00 included)
+SHOP_OPEN_MINUTE = 6 * 60
+SHOP_CLOSE_MINUTE = 17 * 60
 
-def get_billing_invoice(appointment_id): #Fetches all necessary data to generate a billing invoice."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+def _minute_of_day(time_str): #'HH:MM' -> minutes after midnight (None if the stored time cannot be read).
+    try:
+        hours, minutes = time_str.split(':')[:2]
+        return int(hours) * 60 + int(minutes)
+    except (AttributeError, ValueError):
+        return None
 
-    # 1. Fetch appointment and user/vehicle details
-    cursor.execute("""
-        SELECT 
-            a.appointment_id, a.date, a.time, a.status, a.status_message, 
-            u.full_name, u.phone_no, u.username,
-            v.plate_no, v.brand, v.model
-        FROM appointments a
-        JOIN users u ON a.user_id = u.user_id
-        JOIN vehicles v ON a.vehicle_id = v.vehicle_id
-        WHERE a.appointment_id = ?
-    """, (appointment_id,))
-    appt_data = cursor.fetchone()
+def get_available_slots(date_from, date_to, slot_minutes=60): #Free 'HH:MM' slot starts per day between two 'YYYY-MM-DD' dates (inclusive).
+    first_day = datetime.strptime(date_from, "%Y-%m-%d").date()
+    last_day = datetime.strptime(date_to, "%Y-%m-%d").date()
+    if slot_minutes <= 0:
+        raise ValueError("slot_minutes must be a positive number of minutes.")
+
+    # One range query for the whole period. Each day becomes a bitmap: bit n is set when a
+    # Pending/Approved/Completed appointment starts n minutes after opening.
+    busy = {}
+    with db_connection() as conn:
+        cursor = conn.execute("""
+            SELECT date, time FROM appointments
+            WHERE date BETWEEN ? AND ? AND status IN ('Pending', 'Approved', 'Completed') AND is_deleted = 0
+        """, (first_day.isoformat(), last_day.isoformat()))
+        for day_str, time_str in cursor:
+            minute = _minute_of_day(time_str)
+            if minute is not None and SHOP_OPEN_MINUTE <= minute <= SHOP_CLOSE_MINUTE:
+                busy[day_str] = busy.get(day_str, 0) | (1 << (minute - SHOP_OPEN_MINUTE))
+
+    # A slot is free when no appointment starts inside [start, start + slot_minutes)
+    slot_mask = (1 << slot_minutes) - 1
+    starts = range(0, SHOP_CLOSE_MINUTE - SHOP_OPEN_MINUTE + 1, slot_minutes)
+    labels = ["%02d:%02d" % divmod(SHOP_OPEN_MINUTE + start, 60) for start in starts]
+
+    # Past days and the passed part of today cannot be booked either
+    now = datetime.now()
+    today = now.date()
+    now_offset = now.hour * 60 + now.minute - SHOP_OPEN_MINUTE
+
+    slots = {}
+    day = first_day
+    while day <= last_day:
+        day_str = day.isoformat()
+        day_busy = busy.get(day_str, 0)
+        if day < today:
+            slots[day_str] = []
+        elif not day_busy and day > today:
+            slots[day_str] = list(labels)
+        else:
+            slots[day_str] = [label for start, label in zip(starts, labels)
+                              if not (day_busy >> start) & slot_mask and (day > today or start > now_offset)]
+        day += timedelta(days=1)
+    return slots
 
-    if not appt_data:
-        conn.close()
-        return None
+def get_appointment_status_message(user_id): #Fetches the status and message of the latest approved/rejected/completed/canceled appointment.
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT status, status_message AS message
+            FROM appointments 
+            WHERE user_id = ? AND status IN ('Approved', 'Rejected', 'Completed', 'Canceled')
+            ORDER BY appointment_id DESC
+            LIMIT 1
+        """, (user_id,))
+        
+        status_data = cursor.fetchone()
+    return _record(AppointmentRecord, cursor.description, status_data)
 
-    cols = ['appointment_id', 'date', 'time', 'status', 'status_message', 'full_name', 'phone_no', 'username', 'plate_no', 'brand', 'model']
-    invoice = dict(zip(cols, appt_data))
+def get_billing_invoice(appointment_id): #Fetches all necessary data to generate a billing invoice."""
+    with db_connection() as conn:
+        cursor = conn.cursor()
 
-    # 2. Fetch service details and calculate total
-    cursor.execute("""
-        SELECT service_name, labor_rate 
-        FROM appointment_services 
-        WHERE appointment_id = ?
-    """, (appointment_id,))
-    
-    services_data = cursor.fetchall()
-    service_cols = ['service_name', 'labor_rate']
-    invoice['services'] = [dict(zip(service_cols, row)) for row in services_data]
+        # 1. Fetch appointment and user/vehicle details
+        cursor.execute("""
+            SELECT 
+                a.appointment_id, a.date, a.time, a.status, a.status_message, 
+                u.full_name, u.phone_no, u.username,
+                v.plate_no, v.brand, v.model
+            FROM appointments a
+            JOIN users u ON a.user_id = u.user_id
+            JOIN vehicles v ON a.vehicle_id = v.vehicle_id
+            WHERE a.appointment_id = ?
+        """, (appointment_id,))
+        appt_data = cursor.fetchone()
+
+        if not appt_data:
+            return None
+
+        # The invoice is a plain dict because the services list and total are added to it below
+        invoice = _record(AppointmentRecord, cursor.description, appt_data).to_dict()
+
+        # 2. Fetch service details and calculate total
+        cursor.execute("""
+            SELECT service_name, labor_rate 
+            FROM appointment_services 
+            WHERE appointment_id = ?
+        """, (appointment_id,))
+        
+        services_data = cursor.fetchall()
+    invoice['services'] = _records(ServiceRecord, cursor.description, services_data)
     invoice['total_labor_cost'] = sum(s['labor_rate'] for s in invoice['services'])
 
-    conn.close()
     return invoice
 
+# REFERENCE DATA CACHE
+# Lists that every screen asks for but that rarely change (service offers, users) are kept in memory.
+# Each cached value remembers the table_versions of the tables it was read from; triggers bump a
+# table's version on every insert, update and delete, whichever process made it.
+# Checking for changes is one PRAGMA data_version on the cache's own connection: it only moves when
+# another connection (a pooled one in this process, or another process) commits. Only then are
+# table_versions re-read and the entries of changed tables dropped.
+# Write functions in this module also call invalidate_cache() so the next read never waits on that.
+CACHED_TABLES = ("service_offers", "users")
+
+_TABLE_VERSION_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS trg_version_{table}_{event} AFTER {event.upper()} ON {table}
+    BEGIN
+        UPDATE table_versions SET version = version + 1 WHERE table_name = '{table}';
+    END"""
+    for table in CACHED_TABLES
+    for event in ("insert", "update", "delete")
+]
+
+def _install_table_versions(conn): #Migration step: one counter row per cached table, plus its triggers.
+    conn.executemany("INSERT OR IGNORE INTO table_versions (table_name) VALUES (?)", [(table,) for table in CACHED_TABLES])
+    for sql in _TABLE_VERSION_TRIGGERS:
+        conn.execute(sql)
+
+class ReferenceCache: # Read-through cache for the reference lists (one per process, see _cache)
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._conn = None
+        self._database_name = None
+        self._data_version = None
+        self._versions = {}
+        self._entries = {} # key: (tables, versions when loaded, value)
+        self._stats = {}
+
+    def _key_stats(self, key):
+        return self._stats.setdefault(key, {'hits': 0, 'misses': 0, 'invalidations': 0})
+
+    def _drop(self, keys):
+        for key in keys:
+            del self._entries[key]
+            self._key_stats(key)['invalidations'] += 1
+
+    def _sync(self): # Called with the lock held; brings self._versions up to date
+        if self._conn is None or self._database_name != DATABASE_NAME:
+            self._close()
+            self._database_name = DATABASE_NAME
+            self._conn = get_db_connection(DATABASE_NAME)
+        data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._data_version:
+            return
+        self._data_version = data_version
+        self._versions = dict(self._conn.execute("SELECT table_name, version FROM table_versions").fetchall())
+        self._drop([key for key, (tables, versions, _) in self._entries.items()
+                    if versions != tuple(self._versions.get(table) for table in tables)])
+
+    def get(self, key, tables, loader):
+        with self._lock:
+            self._sync()
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._key_stats(key)['hits'] += 1
+                return entry[2]
+            self._key_stats(key)['misses'] += 1
+            # Versions are taken before loading: a write that lands mid-load makes the entry stale, not wrong
+            versions = tuple(self._versions.get(table) for table in tables)
+            database_name = self._database_name
+        # Loaded without the lock, so a slow miss never holds up hits on other keys (or pooled connections waiting here)
+        value = loader()
+        with self._lock:
+            if self._database_name == database_name: # Not closed or switched to another file meanwhile
+                self._entries[key] = (tables, versions, value)
+        return value
+
+    def invalidate(self, *tables):
+        with self._lock:
+            self._drop([key for key, (entry_tables, _, _) in self._entries.items()
+                        if not tables or set(tables) & set(entry_tables)])
+
+    def stats(self):
+        with self._lock:
+            per_key = {key: dict(counts, cached=key in self._entries) for key, counts in self._stats.items()}
+        hits = sum(counts['hits'] for counts in per_key.values())
+        misses = sum(counts['misses'] for counts in per_key.values())
+        return {
+            'hits': hits,
+            'misses': misses,
+            'invalidations': sum(counts['invalidations'] for counts in per_key.values()),
+            'hit_ratio': hits / (hits + misses) if hits + misses else 0.0,
+            'entries': per_key,
+        }
+
+    def _close(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except sqlite3.Error:
+                pass
+        self._conn, self._database_name, self._data_version = None, None, None
+        self._versions = {}
+        self._entries.clear()
+
+    def close(self): # Forgets everything cached (statistics are kept)
+        with self._lock:
+            self._close()
+
+_cache = ReferenceCache()
+
+def invalidate_cache(*tables): #Drops cached lists read from the given tables (all of them when none are given).
+    _cache.invalidate(*tables)
+
+def get_cache_stats(): #Hit/miss/invalidation counts, overall and per cached list, plus the hit ratio.
+    return _cache.stats()
+
+def _cached_records(key, tables, record_type, sql): #Cached list of Records; callers get their own copy of the list.
+    def load():
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql)
+            rows = cursor.fetchall()
+        return _records(record_type, cursor.description, rows)
+    return list(_cache.get(key, tables, load))
+
 # SERVICE OFFER FUNCTIONS (CRUD) 
 
-def get_all_service_offers():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM service_offers ORDER BY service_name")
-    offers_data = cursor.fetchall()
-    cols = [col[0] for col in cursor.description]
-    conn.close()
-    return [dict(zip(cols, row)) for row in offers_data]
+_SERVICE_OFFER_COLUMNS = "service_id, service_name, labor_rate"
+
+_ALL_SERVICE_OFFERS_SQL = f"SELECT {_SERVICE_OFFER_COLUMNS} FROM service_offers ORDER BY service_name"
+
+def get_all_service_offers(): #Served from the reference cache (see REFERENCE DATA CACHE).
+    return _cached_records('service_offers', ('service_offers',), ServiceRecord, _ALL_SERVICE_OFFERS_SQL)
 
 def update_service_offer(service_id, service_name, labor_rate):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute("UPDATE service_offers SET service_name = ?, labor_rate = ? WHERE service_id = ?",
-                       (service_name, labor_rate, service_id))
-        conn.commit()
-        conn.close()
-        return True, "Service offer updated successfully."
-    except sqlite3.IntegrityError:
-        conn.close()
-        return False, "Service name already exists."
-    except Exception as e:
-        conn.close()
-        return False, f"Error updating service offer: {e}"
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("UPDATE service_offers SET service_name = ?, labor_rate = ? WHERE service_id = ?",
+                           (service_name, labor_rate, service_id))
+            conn.commit()
+            invalidate_cache('service_offers')
+            return True, "Service offer updated successfully."
+        except sqlite3.IntegrityError:
+            return Result(False, "Service name already exists.", error=CONFLICT)
+        except Exception as e:
+            return False, f"Error updating service offer: {e}"
     
 def add_service_offer(service_name, labor_rate):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute("INSERT INTO service_offers (service_name, labor_rate) VALUES (?, ?)", 
-                       (service_name, labor_rate))
-        conn.commit()
-        conn.close()
-        return True, "Service offer added successfully."
-    except sqlite3.IntegrityError:
-        conn.close()
-        return False, "Service name already exists."
-    except Exception as e:
-        conn.close()
-        return False, f"Error adding service offer: {e}"
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("INSERT INTO service_offers (service_name, labor_rate) VALUES (?, ?)", 
+                           (service_name, labor_rate))
+            conn.commit()
+            invalidate_cache('service_offers')
+            return True, "Service offer added successfully."
+        except sqlite3.IntegrityError:
+            return Result(False, "Service name already exists.", error=CONFLICT)
+        except Exception as e:
+            return False, f"Error adding service offer: {e}"
+
+def _delete_service_offers(uow, deleter_id, service_ids): #Deletes service offers inside uow. None (nothing changed) if an ID is missing.
+    services = []
+    for placeholders, chunk in _id_chunks(service_ids):
+        uow.cursor.execute(f"SELECT {_SERVICE_OFFER_COLUMNS} FROM service_offers WHERE service_id IN ({placeholders})", chunk)
+        services += _records(ServiceRecord, uow.cursor.description, uow.cursor.fetchall())
+    if len(services) != len(service_ids):
+        return None
 
-def delete_service_offer(deleter_id, service_id): #Deletes a service offer and logs the action.
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # 1. Get service details for logging
-    cursor.execute("SELECT * FROM service_offers WHERE service_id = ?", (service_id,))
-    service = cursor.fetchone()
-    if not service:
-        conn.close()
-        return False, "Service offer not found."
-        
-    cols = [col[0] for col in cursor.description]
-    service_details = dict(zip(cols, service))
-    
-    # 2. Delete the service offer
-    cursor.execute("DELETE FROM service_offers WHERE service_id = ?", (service_id,))
-    conn.commit()
-    conn.close()
+    for placeholders, chunk in _id_chunks(service_ids):
+        uow.cursor.execute(f"DELETE FROM service_offers WHERE service_id IN ({placeholders})", chunk)
+    # NOTE: Existing appointment_services will retain the name/rate
+    for service in services:
+        uow.log_deleted(deleter_id, 'Service Offer', service['service_id'], service)
+    return services
 
-    # 3. Log deletion (NOTE: Existing appointment_services will retain the name/rate)
-    log_deleted_item(deleter_id, 'Service Offer', service_id, service_details)
-    return True, f"Service offer '{service_details['service_name']}' permanently deleted."
+def delete_service_offer(deleter_id, service_id): #Deletes a service offer and logs the action.
+    with unit_of_work() as uow:
+        deleted = _delete_service_offers(uow, deleter_id, _unique_ids([service_id]))
+    invalidate_cache('service_offers')
+    if not deleted:
+        return Result(False, "Service offer not found.", error=NOT_FOUND)
+    return True, f"Service offer '{deleted[0]['service_name']}' permanently deleted."
+
+def delete_service_offers(deleter_id, service_ids): #Bulk delete_service_offer: all offers and audit rows in one transaction, or none.
+    service_ids = _unique_ids(service_ids)
+    if not service_ids:
+        return Result(False, "No service offers selected.", error=INVALID)
+    with unit_of_work() as uow:
+        deleted = _delete_service_offers(uow, deleter_id, service_ids)
+    invalidate_cache('service_offers')
+    if not deleted:
+        return Result(False, "One or more service offers were not found. Nothing was deleted.", error=NOT_FOUND)
+    return True, f"{len(deleted)} service offer(s) permanently deleted."
 
 # MESSAGE FUNCTIONS
 
 def send_message(sender_id, receiver_id, content): #Sends a new chat message.
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    now = datetime.now().strftime("%Y-%m-%d %I:%M %p")
-    try:
-        cursor.execute("""
-            INSERT INTO messages (sender_id, receiver_id, content, timestamp)
-            VALUES (?, ?, ?, ?)
-        """, (sender_id, receiver_id, content, now))
-        conn.commit()
-        conn.close()
-        return True, "Message sent."
-    except Exception as e:
-        conn.close()
-        return False, f"Failed to send message: {e}"
+    now = datetime.now()
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                INSERT INTO messages (sender_id, receiver_id, content, timestamp, sent_at_ms)
+                VALUES (?, ?, ?, ?, ?)
+            """, (sender_id, receiver_id, content, now.strftime(TIMESTAMP_TEXT_FORMAT), epoch_ms(now)))
+            conn.commit()
+            return True, "Message sent."
+        except Exception as e:
+            return False, f"Failed to send message: {e}"
+
+_MESSAGES_SQL = """
+    SELECT 
+        m.message_id, m.sender_id, m.content, m.sent_at_ms,
+        s.username AS sender_username
+    FROM messages m
+    JOIN users s ON m.sender_id = s.user_id
+    WHERE (m.sender_id = ? AND m.receiver_id = ?) OR (m.sender_id = ? AND m.receiver_id = ?)
+    ORDER BY m.message_id ASC
+"""
 
 def get_messages(user_id, partner_id): #Fetches all messages between two users (Admin and a Customer).
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("""
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(_MESSAGES_SQL, (user_id, partner_id, partner_id, user_id))
+        
+        messages_data = cursor.fetchall()
+    return _records(MessageRecord, cursor.description, messages_data)
+
+# Incremental chat loading. message_id is the cursor (it increases with every message sent, so it
+# also settles messages sent in the same millisecond). Each direction of the
+# conversation is a range scan on idx_messages_pair (sender_id, receiver_id, message_id) that stops
+# after `limit` rows, so a page costs the same however long the chat history is.
+_MESSAGE_PAGE_SQL = """
+    SELECT 
+        m.message_id, m.sender_id, m.content, m.sent_at_ms,
+        s.username AS sender_username
+    FROM (
+        SELECT message_id FROM (
+            SELECT message_id FROM messages WHERE sender_id = ? AND receiver_id = ? AND {cursor}
+            ORDER BY message_id {direction} LIMIT ?
+        )
+        UNION ALL
+        SELECT message_id FROM (
+            SELECT message_id FROM messages WHERE sender_id = ? AND receiver_id = ? AND {cursor}
+            ORDER BY message_id {direction} LIMIT ?
+        )
+    ) page
+    JOIN messages m ON m.message_id = page.message_id
+    JOIN users s ON m.sender_id = s.user_id
+    ORDER BY m.message_id {direction}
+    LIMIT ?
+"""
+
+def get_messages_since(user_id, partner_id, after_message_id=0, limit=100): #Up to `limit` messages newer than after_message_id, oldest first.
+    sql = _MESSAGE_PAGE_SQL.format(cursor="message_id > ?", direction="ASC")
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(sql, (user_id, partner_id, after_message_id or 0, limit,
+                             partner_id, user_id, after_message_id or 0, limit, limit))
+        messages_data = cursor.fetchall()
+    return _records(MessageRecord, cursor.description, messages_data)
+
+def get_messages_before(user_id, partner_id, before_message_id=None, limit=50): #The `limit` messages just older than before_message_id (None = latest), oldest first.
+    sql = _MESSAGE_PAGE_SQL.format(cursor="message_id < ?", direction="DESC")
+    before = before_message_id if before_message_id is not None else 2 ** 63 - 1 # largest SQLite rowid
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(sql, (user_id, partner_id, before, limit,
+                             partner_id, user_id, before, limit, limit))
+        messages_data = cursor.fetchall()
+    messages_data.reverse()
+    return _records(MessageRecord, cursor.description, messages_data)
+
+def get_messages_in_range(start_ms, end_ms=None, user_id=None, limit=None): #Messages with start_ms <= sent_at_ms < end_ms (end None = now), oldest first; user_id limits to that user's chats.
+    sql = """
         SELECT 
-            m.message_id, m.sender_id, m.content, m.timestamp,
+            m.message_id, m.sender_id, m.receiver_id, m.content, m.sent_at_ms,
             s.username AS sender_username
         FROM messages m
         JOIN users s ON m.sender_id = s.user_id
-        WHERE (m.sender_id = ? AND m.receiver_id = ?) OR (m.sender_id = ? AND m.receiver_id = ?)
-        ORDER BY m.timestamp ASC
-    """, (user_id, partner_id, partner_id, user_id))
-    
-    messages_data = cursor.fetchall()
-    cols = [col[0] for col in cursor.description]
-    conn.close()
-    return [dict(zip(cols, row)) for row in messages_data]
-
-# REPORTS/SUMMARY FUNCTIONS
-
-def get_total_active_customers():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(user_id) FROM users WHERE user_type = 0")
-    count = cursor.fetchone()[0]
-    conn.close()
-    return count
+        WHERE m.sent_at_ms >= ? AND m.sent_at_ms < ?
+    """
+    params = [start_ms, end_ms if end_ms is not None else epoch_ms() + 1]
+    if user_id is not None:
+        sql += " AND (m.sender_id = ? OR m.receiver_id = ?)"
+        params += [user_id, user_id]
+    sql += " ORDER BY m.sent_at_ms, m.message_id"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        messages_data = cursor.fetchall()
+    return _records(MessageRecord, cursor.description, messages_data)
+
+def get_recent_messages(hours=24, user_id=None): #Messages from the last `hours` hours (e.g. the last 24h), oldest first.
+    return get_messages_in_range(epoch_ms() - int(hours * 3600 * 1000), None, user_id)
+
+# CONVERSATIONS (Admin inbox)
+# One conversations row per (admin, customer) pair with the last message, last activity and an
+# unread count for each side. Triggers on messages keep it current: a new message updates the
+# preview and adds one unread for the receiver; setting read_at_ms (mark_conversation_read) takes it
+# off again. The inbox is then one range scan on idx_conversations_recent.
+CONVERSATION_PREVIEW_LENGTH = 80
+_NOW_MS_SQL = "CAST((julianday('now') - 2440587.5) * 86400000 AS INTEGER)"
+_SENDER_IS_ADMIN = "(SELECT user_type FROM users WHERE user_id = NEW.sender_id) IS 1"
+
+_CONVERSATION_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS trg_conversations_message_insert AFTER INSERT ON messages
+    BEGIN
+        INSERT INTO conversations (admin_id, customer_id, last_message_id, last_sender_id, last_message_preview,
+                                   last_activity_ms, unread_for_admin, unread_for_customer)
+        VALUES (
+            CASE WHEN {_SENDER_IS_ADMIN} THEN NEW.sender_id ELSE NEW.receiver_id END,
+            CASE WHEN {_SENDER_IS_ADMIN} THEN NEW.receiver_id ELSE NEW.sender_id END,
+            NEW.message_id, NEW.sender_id, substr(NEW.content, 1, {CONVERSATION_PREVIEW_LENGTH}),
+            IFNULL(NEW.sent_at_ms, {_NOW_MS_SQL}),
+            NEW.read_at_ms IS NULL AND NOT {_SENDER_IS_ADMIN},
+            NEW.read_at_ms IS NULL AND {_SENDER_IS_ADMIN}
+        )
+        ON CONFLICT (admin_id, customer_id) DO UPDATE SET
+            last_message_id = excluded.last_message_id, last_sender_id = excluded.last_sender_id,
+            last_message_preview = excluded.last_message_preview, last_activity_ms = excluded.last_activity_ms,
+            unread_for_admin = unread_for_admin + excluded.unread_for_admin,
+            unread_for_customer = unread_for_customer + excluded.unread_for_customer;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_conversations_message_read AFTER UPDATE OF read_at_ms ON messages
+    WHEN OLD.read_at_ms IS NULL AND NEW.read_at_ms IS NOT NULL
+    BEGIN
+        UPDATE conversations SET unread_for_admin = unread_for_admin - 1
+        WHERE admin_id = NEW.receiver_id AND customer_id = NEW.sender_id AND NOT {_SENDER_IS_ADMIN};
+        UPDATE conversations SET unread_for_customer = unread_for_customer - 1
+        WHERE admin_id = NEW.sender_id AND customer_id = NEW.receiver_id AND {_SENDER_IS_ADMIN};
+    END""",
+]
+
+def _rebuild_conversations(conn): #Recomputes the conversations table from messages.
+    conn.execute("DELETE FROM conversations")
+    conn.execute(f"""
+        WITH pairs AS (
+            SELECT m.message_id, m.sender_id, m.content, m.sent_at_ms, m.read_at_ms,
+                   su.user_type IS 1 AS from_admin,
+                   CASE WHEN su.user_type IS 1 THEN m.sender_id ELSE m.receiver_id END AS admin_id,
+                   CASE WHEN su.user_type IS 1 THEN m.receiver_id ELSE m.sender_id END AS customer_id
+            FROM messages m
+            JOIN users su ON su.user_id = m.sender_id
+        )
+        INSERT INTO conversations (admin_id, customer_id, last_message_id, last_sender_id, last_message_preview,
+                                   last_activity_ms, unread_for_admin, unread_for_customer)
+        SELECT p.admin_id, p.customer_id, last.message_id, last.sender_id, substr(last.content, 1, {CONVERSATION_PREVIEW_LENGTH}),
+               last.sent_at_ms, p.unread_admin, p.unread_customer
+        FROM (
+            SELECT admin_id, customer_id, MAX(message_id) AS last_id,
+                   SUM(read_at_ms IS NULL AND NOT from_admin) AS unread_admin,
+                   SUM(read_at_ms IS NULL AND from_admin) AS unread_customer
+            FROM pairs GROUP BY admin_id, customer_id
+        ) p
+        JOIN messages last ON last.message_id = p.last_id
+    """)
+    return conn.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+
+def _install_conversations(conn): #Migration step: creates the triggers, then fills conversations from existing messages.
+    for sql in _CONVERSATION_TRIGGERS:
+        conn.execute(sql)
+    _rebuild_conversations(conn)
+
+def rebuild_conversations(): #Consistency rebuild of the conversations table; returns the number of conversations.
+    with transaction() as conn:
+        return _rebuild_conversations(conn)
+
+def mark_conversation_read(reader_id, partner_id, up_to_message_id=None): #Read receipt: marks partner's unread messages to reader (up to up_to_message_id, if given) as read; returns how many.
+    with transaction() as conn:
+        cursor = conn.execute("""
+            UPDATE messages SET read_at_ms = ?
+            WHERE receiver_id = ? AND sender_id = ? AND read_at_ms IS NULL
+              AND (? IS NULL OR message_id <= ?)
+        """, (epoch_ms(), reader_id, partner_id, up_to_message_id, up_to_message_id))
+        return cursor.rowcount
+
+def get_admin_inbox(admin_id, limit=100): #Conversations with customers, most recent activity first, with unread counts and a preview.
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT 
+                c.customer_id, u.full_name, u.username,
+                c.last_message_id, c.last_sender_id, c.last_message_preview, c.last_activity_ms,
+                c.unread_for_admin AS unread_count
+            FROM conversations c
+            JOIN users u ON u.user_id = c.customer_id
+            WHERE c.admin_id = ?
+            ORDER BY c.last_activity_ms DESC
+            LIMIT ?
+        """, (admin_id, limit))
+        inbox_data = cursor.fetchall()
+    return _records(ConversationRecord, cursor.description, inbox_data)
+
+def get_unread_count(customer_id): #Messages from the shop the customer has not read yet.
+    with db_connection() as conn:
+        row = conn.execute("SELECT IFNULL(SUM(unread_for_customer), 0) FROM conversations WHERE customer_id = ?",
+                           (customer_id,)).fetchone()
+    return row[0]
+
+# SEARCH
+# search_index is an FTS5 table with one row per user, vehicle, message and deletion-history entry,
+# kept in sync by triggers. Its rowid is ref_id * 4 + the kind's code, so a trigger can replace or
+# remove an entry without a lookup. owner_id is the customer the entry belongs to (the customer side
+# of a message, the deleter of a history entry), used to open the right screen from a result.
+# Python builds without FTS5 skip the index; search() then raises RuntimeError.
+SEARCH_KINDS = {'user': 0, 'vehicle': 1, 'message': 2, 'history': 3}
+
+_SEARCH_SOURCES = {
+    # kind: (table, key, title SQL, body SQL, owner SQL) using the row alias {row}
+    'user': ("users", "user_id", "{row}.full_name || ' ' || {row}.username", "{row}.phone_no", "{row}.user_id"),
+    'vehicle': ("vehicles", "vehicle_id", "{row}.plate_no", "{row}.brand || ' ' || {row}.model", "{row}.user_id"),
+    'message': ("messages", "message_id", "''", "{row}.content",
+                "CASE WHEN (SELECT user_type FROM users WHERE user_id = {row}.sender_id) IS 1 THEN {row}.receiver_id ELSE {row}.sender_id END"),
+    'history': ("deleted_items_history", "history_id", "{row}.item_type", "{row}.details", "{row}.deleter_id"),
+}
+
+# Only updates of these columns re-index a row (marking a message read or stamping last_login does not)
+_SEARCH_UPDATE_COLUMNS = {
+    'user': "full_name, username, phone_no",
+    'vehicle': "plate_no, brand, model, user_id",
+    'message': "content, sender_id, receiver_id",
+    'history': "item_type, details, deleter_id",
+}
+
+def _search_insert_sql(kind, row): #INSERT of one source row ({row} = NEW, or a table alias for the bulk fill).
+    table, key, title, body, owner = _SEARCH_SOURCES[kind]
+    return (f"INSERT INTO search_index (rowid, title, body, kind, ref_id, owner_id) "
+            f"SELECT {row}.{key} * 4 + {SEARCH_KINDS[kind]}, IFNULL({title.format(row=row)}, ''), "
+            f"IFNULL({body.format(row=row)}, ''), '{kind}', {row}.{key}, {owner.format(row=row)}")
+
+def _search_triggers():
+    triggers = []
+    for kind, (table, key, title, body, owner) in _SEARCH_SOURCES.items():
+        triggers += [
+            f"""CREATE TRIGGER IF NOT EXISTS trg_search_{kind}_insert AFTER INSERT ON {table}
+            BEGIN
+                {_search_insert_sql(kind, "NEW")};
+            END""",
+            f"""CREATE TRIGGER IF NOT EXISTS trg_search_{kind}_update AFTER UPDATE OF {_SEARCH_UPDATE_COLUMNS[kind]} ON {table}
+            BEGIN
+                DELETE FROM search_index WHERE rowid = OLD.{key} * 4 + {SEARCH_KINDS[kind]};
+                {_search_insert_sql(kind, "NEW")};
+            END""",
+            f"""CREATE TRIGGER IF NOT EXISTS trg_search_{kind}_delete AFTER DELETE ON {table}
+            BEGIN
+                DELETE FROM search_index WHERE rowid = OLD.{key} * 4 + {SEARCH_KINDS[kind]};
+            END""",
+        ]
+    return triggers
+
+def _install_search_index(conn): #Migration step: creates and fills search_index (skipped when SQLite lacks FTS5).
+    try:
+        conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+                title, body, kind, ref_id UNINDEXED, owner_id UNINDEXED,
+                tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+            )
+        """)
+    except sqlite3.OperationalError:
+        return False # no such module: fts5
+    for sql in _search_triggers():
+        conn.execute(sql)
+    _rebuild_search_index(conn)
+    return True
 
-def get_pending_appointments_count():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(appointment_id) FROM appointments WHERE status = 'Pending' AND is_deleted = 0")
-    count = cursor.fetchone()[0]
-    conn.close()
-    return count
+def _narrow_search_update_triggers(conn): #Migration step: recreates the search update triggers with their column lists.
+    if not _has_search_index(conn):
+        return
+    for kind in _SEARCH_SOURCES:
+        conn.execute(f"DROP TRIGGER IF EXISTS trg_search_{kind}_update")
+    for sql in _search_triggers():
+        conn.execute(sql)
+
+def _rebuild_search_index(conn):
+    conn.execute("DELETE FROM search_index")
+    for kind, (table, key, title, body, owner) in _SEARCH_SOURCES.items():
+        conn.execute(_search_insert_sql(kind, "src") + f" FROM {table} src")
+    conn.execute("INSERT INTO search_index (search_index) VALUES ('optimize')")
+    return conn.execute("SELECT COUNT(*) FROM search_index").fetchone()[0]
+
+def _has_search_index(conn):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'search_index'").fetchone() is not None
+
+def rebuild_search_index(): #Refills search_index from the base tables (creating it if missing); returns the number of entries.
+    with transaction() as conn:
+        if not _has_search_index(conn):
+            if not _install_search_index(conn):
+                raise RuntimeError("Full-text search is not available: this SQLite was built without FTS5.")
+            return conn.execute("SELECT COUNT(*) FROM search_index").fetchone()[0]
+        return _rebuild_search_index(conn)
+
+def _fts_query(text, kinds): #User text -> FTS5 query: every word must match (as a prefix) in title or body.
+    words = re.findall(r"\w+", text)
+    if not words:
+        return None
+    query = "{title body} : (" + " ".join(f'"{word}"*' for word in words) + ")"
+    if kinds:
+        query += " AND kind : (" + " OR ".join(kinds) + ")"
+    return query
+
+def search(query, kinds=None, limit=20): #Ranked full-text search. kinds: subset of SEARCH_KINDS (default all).
+    # Each result: kind, ref_id, owner_id, owner_name, title/snippet with [matches] bracketed, body (full text), score
+    kinds = list(kinds or [])
+    unknown = [kind for kind in kinds if kind not in SEARCH_KINDS]
+    if unknown:
+        raise ValueError(f"Unknown search kind(s): {', '.join(unknown)}. Use: {', '.join(SEARCH_KINDS)}.")
+    fts_query = _fts_query(query, kinds)
+    if fts_query is None:
+        return []
 
-def get_total_service_revenue():
-    # Placeholder: Sum of labor rates for completed services (using the new table)
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    # Join appointment_services with appointments to only sum completed ones
-    cursor.execute("""
-        SELECT IFNULL(SUM(aps.labor_rate), 0)
+    with db_connection() as conn:
+        if not _has_search_index(conn):
+            raise RuntimeError("Full-text search is not available: this SQLite was built without FTS5.")
+        cursor = conn.cursor()
+        # bm25 weights: a hit in the title (name, plate, history type) counts 10x a hit in the body
+        cursor.execute("""
+            SELECT 
+                hit.kind, hit.ref_id, hit.owner_id, u.full_name AS owner_name,
+                hit.title, hit.snippet, hit.body, hit.score
+            FROM (
+                SELECT kind, ref_id, owner_id, body,
+                       highlight(search_index, 0, '[', ']') AS title,
+                       snippet(search_index, 1, '[', ']', '...', 12) AS snippet,
+                       bm25(search_index, 10.0, 1.0, 0.0) AS score
+                FROM search_index
+                WHERE search_index MATCH ?
+                ORDER BY score
+                LIMIT ?
+            ) hit
+            LEFT JOIN users u ON u.user_id = hit.owner_id
+            ORDER BY hit.score
+        """, (fts_query, limit))
+        results = cursor.fetchall()
+    return _records(SearchRecord, cursor.description, results)
+
+# FRONT-DESK LOOKUPS
+# users.phone_norm and vehicles.plate_norm hold phone_no/plate_no without spaces, dashes, dots,
+# brackets and '+'; phones also lose the +63/63 country code ("+63 917-123 4567" -> "09171234567",
+# and "+63 9" -> "09" while typing)
+# and plates are upper-cased ("abc-1234" -> "ABC1234"). The *_rev columns hold the same text reversed
+# so "ends with" lookups (last digits of a phone, the number part of a plate) are index range scans too.
+# Triggers fill the columns in SQL; _normalize_phone/_normalize_plate apply the same rules to what
+# staff type, and must be kept in step with _PHONE_NORM_SQL/_PLATE_NORM_SQL.
+_LOOKUP_REVERSE_LENGTH = 24 # longer values keep only their last 24 characters in *_rev
+
+def _strip_separators_sql(expr):
+    for char in (' ', '-', '.', '(', ')', '+'):
+        expr = f"REPLACE({expr}, '{char}', '')"
+    return expr
+
+def _phone_norm_sql(expr):
+    digits = _strip_separators_sql(f"IFNULL({expr}, '')")
+    return (f"(SELECT CASE WHEN intl OR (length(p) = 12 AND p LIKE '63%') THEN '0' || substr(p, 3) "
+            f"WHEN length(p) = 10 AND p LIKE '9%' THEN '0' || p ELSE p END "
+            f"FROM (SELECT {digits} AS p, ltrim(IFNULL({expr}, '')) LIKE '+63%' AS intl))")
+
+def _plate_norm_sql(expr):
+    return "UPPER(" + _strip_separators_sql(f"IFNULL({expr}, '')") + ")"
+
+def _reverse_sql(column):
+    return " || ".join(f"substr({column}, -{n}, 1)" for n in range(1, _LOOKUP_REVERSE_LENGTH + 1))
+
+_PHONE_NORM_SQL = _phone_norm_sql("NEW.phone_no")
+_PLATE_NORM_SQL = _plate_norm_sql("NEW.plate_no")
+
+_LOOKUP_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS trg_lookup_{table}_{event} AFTER {event.upper()}{' OF ' + column if event == 'update' else ''} ON {table}
+    BEGIN
+        UPDATE {table} SET {norm} = {norm_sql} WHERE {key} = NEW.{key};
+        UPDATE {table} SET {rev} = {_reverse_sql(norm)} WHERE {key} = NEW.{key};
+    END"""
+    for table, key, column, norm, rev, norm_sql in [
+        ("users", "user_id", "phone_no", "phone_norm", "phone_rev", _PHONE_NORM_SQL),
+        ("vehicles", "vehicle_id", "plate_no", "plate_norm", "plate_rev", _PLATE_NORM_SQL),
+    ]
+    for event in ("insert", "update")
+]
+
+def _install_lookup_columns(conn): #Migration step: creates the triggers and fills the columns for existing rows.
+    for sql in _LOOKUP_TRIGGERS:
+        conn.execute(sql)
+    conn.execute(f"UPDATE users SET phone_norm = {_phone_norm_sql('phone_no')}")
+    conn.execute(f"UPDATE users SET phone_rev = {_reverse_sql('phone_norm')}")
+    conn.execute(f"UPDATE vehicles SET plate_norm = {_plate_norm_sql('plate_no')}")
+    conn.execute(f"UPDATE vehicles SET plate_rev = {_reverse_sql('plate_norm')}")
+
+_SEPARATORS = str.maketrans('', '', ' -.()+')
+
+def _normalize_phone(phone):
+    digits = (phone or '').translate(_SEPARATORS)
+    if (phone or '').lstrip(' ').startswith('+63') or (len(digits) == 12 and digits.startswith('63')):
+        return '0' + digits[2:]
+    if len(digits) == 10 and digits.startswith('9'):
+        return '0' + digits
+    return digits
+
+def _normalize_plate(plate):
+    return (plate or '').translate(_SEPARATORS).upper()
+
+def _prefix_bounds(prefix): #[low, high) range holding every string that starts with prefix
+    return prefix, prefix + '\U0010ffff'
+
+_PHONE_LOOKUP_SQL = """
+    SELECT user_id, username, full_name, phone_no, user_type, last_login
+    FROM users WHERE {column} >= ? AND {column} < ?
+    ORDER BY {column}
+    LIMIT ?
+"""
+
+def find_user_by_phone(phone, limit=10): #Users whose phone starts or ends with what was typed (any spacing/+63 form); exact matches first.
+    typed = _normalize_phone(phone)
+    if not typed:
+        return []
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(_PHONE_LOOKUP_SQL.format(column="phone_norm"), (*_prefix_bounds(typed), limit))
+        starts = cursor.fetchall()
+        cursor.execute(_PHONE_LOOKUP_SQL.format(column="phone_rev"), (*_prefix_bounds(typed[::-1][:_LOOKUP_REVERSE_LENGTH]), limit))
+        ends = cursor.fetchall()
+    users = {}
+    for row in _records(UserRecord, cursor.description, starts + ends):
+        users.setdefault(row['user_id'], row)
+    exact = [u for u in users.values() if _normalize_phone(u['phone_no']) == typed]
+    return (exact + [u for u in users.values() if u not in exact])[:limit]
+
+_PLATE_LOOKUP_SQL = """
+    SELECT v.vehicle_id, v.brand, v.model, v.plate_no, v.user_id, u.full_name AS customer_name, u.phone_no
+    FROM vehicles v
+    JOIN users u ON v.user_id = u.user_id
+    WHERE v.{column} >= ? AND v.{column} < ?
+    ORDER BY v.{column}
+    LIMIT ?
+"""
+
+def find_vehicle_by_plate_prefix(prefix, limit=10): #Vehicles whose plate starts with prefix, ignoring case, spaces and dashes ("abc1" finds "ABC 1234").
+    typed = _normalize_plate(prefix)
+    if not typed:
+        return []
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(_PLATE_LOOKUP_SQL.format(column="plate_norm"), (*_prefix_bounds(typed), limit))
+        vehicles_data = cursor.fetchall()
+    return _records(VehicleRecord, cursor.description, vehicles_data)
+
+def find_vehicle_by_plate_suffix(suffix, limit=10): #Vehicles whose plate ends with suffix ("234" finds "ABC 1234").
+    typed = _normalize_plate(suffix)
+    if not typed:
+        return []
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(_PLATE_LOOKUP_SQL.format(column="plate_rev"), (*_prefix_bounds(typed[::-1][:_LOOKUP_REVERSE_LENGTH]), limit))
+        vehicles_data = cursor.fetchall()
+    return _records(VehicleRecord, cursor.description, vehicles_data)
+
+# SHOP COUNTERS
+# The admin dashboard tiles read single rows from shop_counters instead of counting/summing the
+# whole history. Triggers on users, appointments and appointment_services keep the rows current
+# inside the same transaction as the change. Revenue is stored in centavos so repeated +/- never
+# drifts. If the table is ever suspect, rebuild it: python database.py rebuild-counters
+#   active_customers         users with user_type = 0
+#   pending_appointments     appointments with status 'Pending' and is_deleted = 0
+#   completed_revenue_cents  labor_rate of every service on a 'Completed' appointment, x 100
+#   users, vehicles          every row of the table (the Manage Users / View All Vehicles sizes)
+#   appointments             every appointment, soft-deleted ones included
+#   listed_appointments      appointments with is_deleted = 0 (the Manage Appointments size)
+_CENTS = "CAST(ROUND(IFNULL({}, 0) * 100) AS INTEGER)"
+_APPT_REVENUE_CENTS = "(SELECT IFNULL(SUM(" + _CENTS.format("labor_rate") + "), 0) FROM appointment_services WHERE appointment_id = {}.appointment_id)"
+_IS_COMPLETED_APPT = "EXISTS (SELECT 1 FROM appointments WHERE appointment_id = {}.appointment_id AND status = 'Completed')"
+
+_SHOP_COUNTER_TRIGGERS = [
+    # Customers
+    """CREATE TRIGGER IF NOT EXISTS trg_counters_user_insert AFTER INSERT ON users WHEN NEW.user_type IS 0
+    BEGIN
+        UPDATE shop_counters SET value = value + 1 WHERE name = 'active_customers';
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_counters_user_delete AFTER DELETE ON users WHEN OLD.user_type IS 0
+    BEGIN
+        UPDATE shop_counters SET value = value - 1 WHERE name = 'active_customers';
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_counters_user_type AFTER UPDATE OF user_type ON users
+    WHEN (NEW.user_type IS 0) != (OLD.user_type IS 0)
+    BEGIN
+        UPDATE shop_counters SET value = value + (NEW.user_type IS 0) - (OLD.user_type IS 0) WHERE name = 'active_customers';
+    END""",
+    # Appointments (pending count, and revenue when an appointment enters/leaves 'Completed')
+    """CREATE TRIGGER IF NOT EXISTS trg_counters_appt_insert AFTER INSERT ON appointments
+    WHEN NEW.status IS 'Pending' AND NEW.is_deleted IS 0
+    BEGIN
+        UPDATE shop_counters SET value = value + 1 WHERE name = 'pending_appointments';
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_counters_appt_update AFTER UPDATE OF status, is_deleted ON appointments
+    BEGIN
+        UPDATE shop_counters
+        SET value = value + (NEW.status IS 'Pending' AND NEW.is_deleted IS 0) - (OLD.status IS 'Pending' AND OLD.is_deleted IS 0)
+        WHERE name = 'pending_appointments'
+          AND (NEW.status IS 'Pending' AND NEW.is_deleted IS 0) != (OLD.status IS 'Pending' AND OLD.is_deleted IS 0);
+        UPDATE shop_counters
+        SET value = value + ((NEW.status IS 'Completed') - (OLD.status IS 'Completed')) * """ + _APPT_REVENUE_CENTS.format("NEW") + """
+        WHERE name = 'completed_revenue_cents' AND (NEW.status IS 'Completed') != (OLD.status IS 'Completed');
+    END""",
+    # BEFORE DELETE: the cascade removes appointment_services after this, so the services are still readable here
+    """CREATE TRIGGER IF NOT EXISTS trg_counters_appt_delete BEFORE DELETE ON appointments
+    BEGIN
+        UPDATE shop_counters SET value = value - 1
+        WHERE name = 'pending_appointments' AND OLD.status IS 'Pending' AND OLD.is_deleted IS 0;
+        UPDATE shop_counters SET value = value - """ + _APPT_REVENUE_CENTS.format("OLD") + """
+        WHERE name = 'completed_revenue_cents' AND OLD.status IS 'Completed';
+    END""",
+    # Services added to/removed from/repriced on an already completed appointment
+    """CREATE TRIGGER IF NOT EXISTS trg_counters_service_insert AFTER INSERT ON appointment_services
+    WHEN """ + _IS_COMPLETED_APPT.format("NEW") + """
+    BEGIN
+        UPDATE shop_counters SET value = value + """ + _CENTS.format("NEW.labor_rate") + """ WHERE name = 'completed_revenue_cents';
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_counters_service_delete AFTER DELETE ON appointment_services
+    WHEN """ + _IS_COMPLETED_APPT.format("OLD") + """
+    BEGIN
+        UPDATE shop_counters SET value = value - """ + _CENTS.format("OLD.labor_rate") + """ WHERE name = 'completed_revenue_cents';
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_counters_service_update AFTER UPDATE OF labor_rate, appointment_id ON appointment_services
+    BEGIN
+        UPDATE shop_counters SET value = value - """ + _CENTS.format("OLD.labor_rate") + """
+        WHERE name = 'completed_revenue_cents' AND """ + _IS_COMPLETED_APPT.format("OLD") + """;
+        UPDATE shop_counters SET value = value + """ + _CENTS.format("NEW.labor_rate") + """
+        WHERE name = 'completed_revenue_cents' AND """ + _IS_COMPLETED_APPT.format("NEW") + """;
+    END""",
+]
+
+# Row counts for the admin list pages (migration 12; migration 4 installs only the triggers above)
+_ROW_COUNTER_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS trg_counters_users_rows_insert AFTER INSERT ON users
+    BEGIN
+        UPDATE shop_counters SET value = value + 1 WHERE name = 'users';
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_counters_users_rows_delete AFTER DELETE ON users
+    BEGIN
+        UPDATE shop_counters SET value = value - 1 WHERE name = 'users';
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_counters_vehicles_rows_insert AFTER INSERT ON vehicles
+    BEGIN
+        UPDATE shop_counters SET value = value + 1 WHERE name = 'vehicles';
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_counters_vehicles_rows_delete AFTER DELETE ON vehicles
+    BEGIN
+        UPDATE shop_counters SET value = value - 1 WHERE name = 'vehicles';
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_counters_appt_rows_insert AFTER INSERT ON appointments
+    BEGIN
+        UPDATE shop_counters SET value = value + 1 WHERE name = 'appointments';
+        UPDATE shop_counters SET value = value + 1 WHERE name = 'listed_appointments' AND NEW.is_deleted IS 0;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_counters_appt_rows_deleted AFTER UPDATE OF is_deleted ON appointments
+    WHEN (NEW.is_deleted IS 0) != (OLD.is_deleted IS 0)
+    BEGIN
+        UPDATE shop_counters SET value = value + (NEW.is_deleted IS 0) - (OLD.is_deleted IS 0) WHERE name = 'listed_appointments';
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_counters_appt_rows_delete AFTER DELETE ON appointments
+    BEGIN
+        UPDATE shop_counters SET value = value - 1 WHERE name = 'appointments';
+        UPDATE shop_counters SET value = value - 1 WHERE name = 'listed_appointments' AND OLD.is_deleted IS 0;
+    END""",
+]
+
+_SHOP_COUNTER_SOURCES = {
+    'active_customers': "SELECT COUNT(user_id) FROM users WHERE user_type = 0",
+    'pending_appointments': "SELECT COUNT(appointment_id) FROM appointments WHERE status = 'Pending' AND is_deleted = 0",
+    'completed_revenue_cents': """
+        SELECT IFNULL(SUM(""" + _CENTS.format("aps.labor_rate") + """), 0)
         FROM appointment_services AS aps
         JOIN appointments a ON aps.appointment_id = a.appointment_id
         WHERE a.status = 'Completed'
+    """,
+}
+
+_ROW_COUNTER_SOURCES = {
+    'users': "SELECT COUNT(user_id) FROM users",
+    'vehicles': "SELECT COUNT(vehicle_id) FROM vehicles",
+    'appointments': "SELECT COUNT(appointment_id) FROM appointments",
+    'listed_appointments': "SELECT COUNT(appointment_id) FROM appointments WHERE is_deleted = 0",
+}
+
+def _rebuild_shop_counters(conn, sources=None): #Recomputes the counters (default: all of them) from the base tables; returns {name: (stored, recomputed)}.
+    stored = dict(conn.execute("SELECT name, value FROM shop_counters").fetchall())
+    changes = {}
+    for name, sql in (sources or {**_SHOP_COUNTER_SOURCES, **_ROW_COUNTER_SOURCES}).items():
+        value = conn.execute(sql).fetchone()[0]
+        conn.execute("INSERT OR REPLACE INTO shop_counters (name, value) VALUES (?, ?)", (name, value))
+        changes[name] = (stored.get(name), value)
+    return changes
+
+def _install_shop_counters(conn): #Migration step: creates the triggers, then fills the counters from existing data.
+    for sql in _SHOP_COUNTER_TRIGGERS:
+        conn.execute(sql)
+    _rebuild_shop_counters(conn, _SHOP_COUNTER_SOURCES)
+
+def _install_row_counters(conn): #Migration step: creates the row count triggers, then fills those counters.
+    for sql in _ROW_COUNTER_TRIGGERS:
+        conn.execute(sql)
+    _rebuild_shop_counters(conn, _ROW_COUNTER_SOURCES)
+
+def rebuild_shop_counters(): #Consistency rebuild of shop_counters in one transaction; returns {name: (stored, recomputed)}.
+    with transaction() as conn:
+        return _rebuild_shop_counters(conn)
+
+# REPORT ROLLUPS
+# daily_rollups (one row per appointment date) and service_daily_rollups (one row per date and
+# service name) hold what the range reports need, so a year of revenue is a few hundred row reads
+# instead of a scan of appointments joined to appointment_services.
+# Triggers keep them current: a new appointment adds to booked; a status or date change removes the
+# appointment's old contribution (OLD row) and adds its new one (NEW row), so moving an appointment
+# to Completed adds its services' revenue and moving it back takes it off again.
+# The rollups follow the same rule as shop_counters (migration 13): permanently deleting an appointment
+# takes its counts and revenue out, and services added to, removed from or repriced on a completed
+# appointment move its revenue. So the triggers always agree with a rebuild and with the revenue tile.
+# python database.py rebuild-rollups recomputes them from the appointments currently in the database.
+def _rollup_contribution_sql(row, sign): #Upserts one appointment row's (OLD or NEW) share of the rollups.
+    return f"""
+        INSERT INTO daily_rollups (day, booked, completed, canceled, revenue_cents)
+        VALUES ({row}.date, {sign}1, {sign}({row}.status IS 'Completed'), {sign}({row}.status IS 'Canceled'),
+                {sign}({row}.status IS 'Completed') * {_APPT_REVENUE_CENTS.format(row)})
+        ON CONFLICT (day) DO UPDATE SET
+            booked = booked + excluded.booked, completed = completed + excluded.completed,
+            canceled = canceled + excluded.canceled, revenue_cents = revenue_cents + excluded.revenue_cents;
+        INSERT INTO service_daily_rollups (day, service_name, completed, revenue_cents)
+        SELECT {row}.date, service_name, {sign}1, {sign}{_CENTS.format("labor_rate")}
+        FROM appointment_services WHERE appointment_id = {row}.appointment_id AND {row}.status IS 'Completed'
+        ON CONFLICT (day, service_name) DO UPDATE SET
+            completed = completed + excluded.completed, revenue_cents = revenue_cents + excluded.revenue_cents;
+    """
+
+_REPORT_ROLLUP_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS trg_rollups_appt_insert AFTER INSERT ON appointments
+    BEGIN
+        {_rollup_contribution_sql("NEW", "+")}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_rollups_appt_update AFTER UPDATE OF status, date ON appointments
+    WHEN OLD.status IS NOT NEW.status OR OLD.date IS NOT NEW.date
+    BEGIN
+        {_rollup_contribution_sql("OLD", "-")}
+        {_rollup_contribution_sql("NEW", "+")}
+    END""",
+]
+
+def _rollup_service_sql(row, sign): #Upserts one appointment_services row's (OLD or NEW) revenue when its appointment is completed.
+    return f"""
+        INSERT INTO daily_rollups (day, booked, completed, canceled, revenue_cents)
+        SELECT date, 0, 0, 0, {sign}{_CENTS.format(row + ".labor_rate")}
+        FROM appointments WHERE appointment_id = {row}.appointment_id AND status = 'Completed'
+        ON CONFLICT (day) DO UPDATE SET revenue_cents = revenue_cents + excluded.revenue_cents;
+        INSERT INTO service_daily_rollups (day, service_name, completed, revenue_cents)
+        SELECT date, {row}.service_name, {sign}1, {sign}{_CENTS.format(row + ".labor_rate")}
+        FROM appointments WHERE appointment_id = {row}.appointment_id AND status = 'Completed'
+        ON CONFLICT (day, service_name) DO UPDATE SET
+            completed = completed + excluded.completed, revenue_cents = revenue_cents + excluded.revenue_cents;
+    """
+
+# Migration 13 (migration 5 installs only the list above)
+_REPORT_ROLLUP_DELETE_TRIGGERS = [
+    # BEFORE DELETE: the cascade removes appointment_services after this, so the services are still readable here;
+    # the service triggers below then find no completed appointment and leave the rollups alone
+    f"""CREATE TRIGGER IF NOT EXISTS trg_rollups_appt_delete BEFORE DELETE ON appointments
+    BEGIN
+        {_rollup_contribution_sql("OLD", "-")}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_rollups_service_insert AFTER INSERT ON appointment_services
+    BEGIN
+        {_rollup_service_sql("NEW", "+")}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_rollups_service_delete AFTER DELETE ON appointment_services
+    BEGIN
+        {_rollup_service_sql("OLD", "-")}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_rollups_service_update AFTER UPDATE OF labor_rate, appointment_id, service_name ON appointment_services
+    BEGIN
+        {_rollup_service_sql("OLD", "-")}
+        {_rollup_service_sql("NEW", "+")}
+    END""",
+]
+
+def _rebuild_report_rollups(conn): #Recomputes both rollup tables from the current appointments.
+    conn.execute("DELETE FROM daily_rollups")
+    conn.execute("DELETE FROM service_daily_rollups")
+    conn.execute(f"""
+        INSERT INTO daily_rollups (day, booked, completed, canceled, revenue_cents)
+        SELECT a.date, COUNT(*), SUM(a.status = 'Completed'), SUM(a.status = 'Canceled'),
+               SUM(CASE WHEN a.status = 'Completed' THEN {_APPT_REVENUE_CENTS.format("a")} ELSE 0 END)
+        FROM appointments a
+        GROUP BY a.date
+    """)
+    conn.execute(f"""
+        INSERT INTO service_daily_rollups (day, service_name, completed, revenue_cents)
+        SELECT a.date, aps.service_name, COUNT(*), SUM({_CENTS.format("aps.labor_rate")})
+        FROM appointments a
+        JOIN appointment_services aps ON aps.appointment_id = a.appointment_id
+        WHERE a.status = 'Completed'
+        GROUP BY a.date, aps.service_name
     """)
-    revenue = cursor.fetchone()[0]
-    conn.close()
-    return revenue
+    return conn.execute("SELECT COUNT(*) FROM daily_rollups").fetchone()[0]
+
+def _install_report_rollups(conn): #Migration step: creates the triggers, then fills the rollups from existing data.
+    for sql in _REPORT_ROLLUP_TRIGGERS:
+        conn.execute(sql)
+    _rebuild_report_rollups(conn)
+
+def _install_rollup_deletes(conn): #Migration step: makes the rollups follow deletes and service edits, then recomputes them.
+    for sql in _REPORT_ROLLUP_DELETE_TRIGGERS:
+        conn.execute(sql)
+    _rebuild_report_rollups(conn)
+
+def rebuild_report_rollups(): #Consistency rebuild of the report rollups in one transaction; returns the number of days.
+    with transaction() as conn:
+        return _rebuild_report_rollups(conn)
+
+# Range reports read only the rollup tables. Periods are labelled by their first day's
+# date for weeks (Monday), 'YYYY-MM' for months and 'YYYY' for years.
+_REPORT_PERIODS = {
+    'day': "day",
+    'week': "date(day, '-6 days', 'weekday 1')",
+    'month': "substr(day, 1, 7)",
+    'year': "substr(day, 1, 4)",
+}
+
+def get_revenue_report(date_from, date_to, period='day'): #Bookings, completions, cancellations and revenue per period between two dates (inclusive).
+    if period not in _REPORT_PERIODS:
+        raise ValueError(f"Unknown report period '{period}'. Use one of: {', '.join(_REPORT_PERIODS)}.")
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT {_REPORT_PERIODS[period]} AS period, SUM(booked) AS booked, SUM(completed) AS completed,
+                   SUM(canceled) AS canceled, SUM(revenue_cents) / 100.0 AS revenue
+            FROM daily_rollups
+            WHERE day BETWEEN ? AND ?
+            GROUP BY 1
+            HAVING SUM(booked) > 0
+            ORDER BY 1
+        """, (date_from, date_to))
+        rows = cursor.fetchall()
+    return _records(ReportRecord, cursor.description, rows)
+
+def get_service_mix_report(date_from, date_to): #Completed count and revenue per service between two dates (inclusive), highest revenue first.
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT service_name, SUM(completed) AS completed, SUM(revenue_cents) / 100.0 AS revenue
+            FROM service_daily_rollups
+            WHERE day BETWEEN ? AND ?
+            GROUP BY service_name
+            HAVING SUM(completed) > 0
+            ORDER BY SUM(revenue_cents) DESC, service_name
+        """, (date_from, date_to))
+        rows = cursor.fetchall()
+    return _records(ReportRecord, cursor.description, rows)
+
+def _shop_counter(name):
+    with db_connection() as conn:
+        row = conn.execute("SELECT value FROM shop_counters WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else 0
+
+# REPORTS/SUMMARY FUNCTIONS
+
+def get_total_active_customers(): #O(1): reads the trigger-maintained counter.
+    return _shop_counter('active_customers')
+
+def get_pending_appointments_count(): #O(1): reads the trigger-maintained counter.
+    return _shop_counter('pending_appointments')
+
+def get_total_service_revenue(): #Sum of labor rates for completed appointments (trigger-maintained, stored in centavos).
+    return _shop_counter('completed_revenue_cents') / 100.0
+
+_TODAYS_APPOINTMENTS_SQL = """
+    SELECT 
+        u.full_name, v.plate_no, a.status, 
+        REPLACE(a.services_summary, ' | ', ', ') AS service_type
+    FROM appointments a
+    JOIN users u ON a.user_id = u.user_id
+    JOIN vehicles v ON a.vehicle_id = v.vehicle_id
+    WHERE a.date = ?
+    ORDER BY a.time
+"""
 
 def get_todays_appointments(date_str):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT 
-            u.full_name, v.plate_no, a.status, 
-            GROUP_CONCAT(s.service_name, ', ') AS service_type
-        FROM appointments a
-        JOIN users u ON a.user_id = u.user_id
-        JOIN vehicles v ON a.vehicle_id = v.vehicle_id
-        LEFT JOIN appointment_services s ON a.appointment_id = s.appointment_id
-        WHERE a.date = ?
-        GROUP BY a.appointment_id
-        ORDER BY a.time
-    """, (date_str,))
-    
-    appointments_data = cursor.fetchall()
-    cols = ['full_name', 'plate_no', 'status', 'service_type']
-    conn.close()
-    return [dict(zip(cols, row)) for row in appointments_data]
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(_TODAYS_APPOINTMENTS_SQL, (date_str,))
+        
+        appointments_data = cursor.fetchall()
+    return _records(AppointmentRecord, cursor.description, appointments_data)
+
+_ADMIN_HISTORY_SQL = """
+    SELECT history_id, item_type, details, deleted_at_ms, u.username AS deleter_username
+    FROM deleted_items_history h
+    LEFT JOIN users u ON h.deleter_id = u.user_id
+    ORDER BY deleted_at_ms DESC, history_id DESC
+"""
+
+_USER_HISTORY_SQL = """
+    SELECT history_id, item_type, details, deleted_at_ms, 'You' AS deleter_username
+    FROM deleted_items_history 
+    WHERE item_type = 'Appointment_Canceled' AND deleter_id = ?
+    ORDER BY deleted_at_ms DESC, history_id DESC
+"""
 
 def get_deleted_items_history(user_id, user_type):
     """Fetches deleted items history."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    if user_type == 1: # Admin: see all
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        
+        if user_type == 1: # Admin: see all
+            cursor.execute(_ADMIN_HISTORY_SQL)
+        else: # User: only see their own cancellations
+            cursor.execute(_USER_HISTORY_SQL, (user_id,))
+
+        history_data = cursor.fetchall()
+    return _records(HistoryRecord, cursor.description, history_data)
+
+def get_deleted_items_in_range(start_ms, end_ms=None): #Deletion history with start_ms <= deleted_at_ms < end_ms (end None = now), newest first.
+    with db_connection() as conn:
+        cursor = conn.cursor()
         cursor.execute("""
-            SELECT history_id, item_type, details, deleted_at, u.username AS deleter_username
+            SELECT history_id, item_type, item_id, details, deleted_at_ms, u.username AS deleter_username
             FROM deleted_items_history h
             LEFT JOIN users u ON h.deleter_id = u.user_id
-            ORDER BY deleted_at DESC
-        """)
-    else: # User: only see their own cancellations
-        cursor.execute("""
-            SELECT history_id, item_type, details, deleted_at, 'You' AS deleter_username
-            FROM deleted_items_history 
-            WHERE item_type = 'Appointment_Canceled' AND deleter_id = ?
-            ORDER BY deleted_at DESC
-        """, (user_id,))
+            WHERE deleted_at_ms >= ? AND deleted_at_ms < ?
+            ORDER BY deleted_at_ms DESC, history_id DESC
+        """, (start_ms, end_ms if end_ms is not None else epoch_ms() + 1))
+        history_data = cursor.fetchall()
+    return _records(HistoryRecord, cursor.description, history_data)
 
-    history_data = cursor.fetchall()
-    cols = [col[0] for col in cursor.description]
-    conn.close()
-    return [dict(zip(cols, row)) for row in history_data]
-
-def get_all_users(): #Fetches all users (including Admin) without their password.
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    # Exclude the password column for safety
-    cursor.execute("SELECT user_id, username, full_name, phone_no, user_type, last_login FROM users ORDER BY user_id")
-    users_data = cursor.fetchall()
-    cols = [col[0] for col in cursor.description]
-    conn.close()
-    return [dict(zip(cols, row)) for row in users_data]
+# Exclude the password column for safety
+_ALL_USERS_SQL = "SELECT user_id, username, full_name, phone_no, user_type, last_login FROM users ORDER BY user_id"
+
+def get_all_users(): #Fetches all users (including Admin) without their password. Served from the reference cache.
+    return _cached_records('users', ('users',), UserRecord, _ALL_USERS_SQL)
 
 def get_completed_appointments_count(user_id): #Counts the number of completed appointments for a specific user.
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(appointment_id) FROM appointments WHERE user_id = ? AND status = 'Completed' AND is_deleted = 0", (user_id,))
-    count = cursor.fetchone()[0]
-    conn.close()
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(appointment_id) FROM appointments WHERE user_id = ? AND status = 'Completed' AND is_deleted = 0", (user_id,))
+        count = cursor.fetchone()[0]
     return count
 
+# Every customer Home tile in one statement: each CTE yields at most one row, and the outer
+# SELECT joins them onto a single row, so a missing upcoming/latest appointment leaves NULLs.
+_USER_DASHBOARD_SQL = """
+    WITH
+    upcoming AS (
+        SELECT a.status, v.plate_no, a.date, a.time
+        FROM appointments a
+        JOIN vehicles v ON a.vehicle_id = v.vehicle_id
+        WHERE a.user_id = :user_id AND a.status IN ('Pending', 'Approved') AND a.is_deleted = 0
+        AND (a.date > :today OR (a.date = :today AND a.time > :now_time))
+        ORDER BY a.date ASC, a.time ASC
+        LIMIT 1
+    ),
+    vehicle_count AS (
+        SELECT COUNT(*) AS n FROM vehicles WHERE user_id = :user_id
+    ),
+    completed_count AS (
+        SELECT COUNT(*) AS n FROM appointments WHERE user_id = :user_id AND status = 'Completed' AND is_deleted = 0
+    ),
+    latest AS (
+        SELECT status, status_message
+        FROM appointments
+        WHERE user_id = :user_id AND status IN ('Approved', 'Rejected', 'Completed', 'Canceled')
+        ORDER BY appointment_id DESC
+        LIMIT 1
+    )
+    SELECT
+        upcoming.status AS upcoming_status, upcoming.plate_no AS upcoming_plate_no,
+        upcoming.date AS upcoming_date, upcoming.time AS upcoming_time,
+        vehicle_count.n AS vehicle_count, completed_count.n AS completed_count,
+        latest.status AS latest_status, latest.status_message AS latest_message
+    FROM vehicle_count
+    CROSS JOIN completed_count
+    LEFT JOIN upcoming ON 1
+    LEFT JOIN latest ON 1
+"""
+
+def get_user_dashboard(user_id): #Everything the customer Home panel shows, read in one statement on one connection.
+    # Returns the tile row (upcoming_*, vehicle_count, completed_count, latest_status/latest_message)
+    # as row['tiles'] plus row['service_offers'] from the reference cache.
+    now = datetime.now()
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(_USER_DASHBOARD_SQL, {
+            'user_id': user_id, 'today': now.strftime("%Y-%m-%d"), 'now_time': now.strftime("%H:%M"),
+        })
+        tiles = _record(DashboardRecord, cursor.description, cursor.fetchone())
+    return {'tiles': tiles, 'service_offers': get_all_service_offers()}
+
+_ALL_VEHICLES_SQL = """
+    SELECT 
+        v.vehicle_id, v.brand, v.model, v.plate_no, v.user_id, u.full_name AS customer_name
+    FROM vehicles v
+    JOIN users u ON v.user_id = u.user_id
+    ORDER BY customer_name, v.plate_no
+"""
+
 def get_all_vehicles(): #Fetches all vehicles in the system, including the customer's name.
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(_ALL_VEHICLES_SQL)
+        vehicles_data = cursor.fetchall()
+    return _records(VehicleRecord, cursor.description, vehicles_data)
+
+# STREAMING FUNCTIONS (Reports, exports, background jobs)
+# iter_* functions yield one Record at a time, reading STREAM_BATCH_SIZE rows per fetchmany()
+# from a cursor held open for the whole loop, so the full history is never in memory at once.
+# Each stream opens its own connection (not counted against POOL_SIZE) until the loop ends or the
+# generator is closed, so open streams never starve the pool; keep the loop body short under the
+# legacy storage profile, where an open read blocks writers.
+
+def _iter_rows(record_type, sql, params=(), batch_size=None):
+    batch_size = batch_size or STREAM_BATCH_SIZE
+    with _get_manager().dedicated_connection() as conn:
+        cursor = conn.cursor()
+        cursor.arraysize = batch_size
+        cursor.execute(sql, params)
+        make = partial(tuple.__new__, _record_class(record_type, cursor.description))
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            yield from map(make, batch)
+
+def iter_user_vehicles(user_id, batch_size=None):
+    return _iter_rows(VehicleRecord, _USER_VEHICLES_SQL, (user_id,), batch_size)
+
+def iter_user_appointments(user_id, batch_size=None):
+    return _iter_rows(AppointmentRecord, _USER_APPOINTMENTS_SQL, (user_id,), batch_size)
+
+def iter_all_appointments(batch_size=None):
+    return _iter_rows(AppointmentRecord, _ALL_APPOINTMENTS_SQL, (), batch_size)
+
+def iter_all_service_offers(batch_size=None):
+    return _iter_rows(ServiceRecord, _ALL_SERVICE_OFFERS_SQL, (), batch_size)
+
+def iter_messages(user_id, partner_id, batch_size=None):
+    return _iter_rows(MessageRecord, _MESSAGES_SQL, (user_id, partner_id, partner_id, user_id), batch_size)
+
+def iter_todays_appointments(date_str, batch_size=None):
+    return _iter_rows(AppointmentRecord, _TODAYS_APPOINTMENTS_SQL, (date_str,), batch_size)
+
+def iter_deleted_items_history(user_id, user_type, batch_size=None):
+    if user_type == 1:
+        return _iter_rows(HistoryRecord, _ADMIN_HISTORY_SQL, (), batch_size)
+    return _iter_rows(HistoryRecord, _USER_HISTORY_SQL, (user_id,), batch_size)
+
+def iter_all_users(batch_size=None):
+    return _iter_rows(UserRecord, _ALL_USERS_SQL, (), batch_size)
+
+def iter_all_vehicles(batch_size=None):
+    return _iter_rows(VehicleRecord, _ALL_VEHICLES_SQL, (), batch_size)
+
+# PAGINATION FUNCTIONS (Admin lists)
+# Keyset pagination: each page continues from the sort key of the previous page's last row,
+# so page 1000 costs the same as page 1 (no OFFSET scan). Every sort ends with the primary key
+# to keep the order stable when names or dates repeat.
+# Each sort is a list of (SQL expression, result column) pairs.
+# A token only holds a row's sort key, so it works in both directions: prev_token (the first row's
+# key) passed back with the opposite `descending` reads the rows before the page, nearest first.
+# Jumps stay keyset reads too (never OFFSET, whose cost grows with the position):
+#   seek=0.4      starts at the key 40% of the way between the first and last sort key of the list,
+#                 interpolated on the leading sort column (id, date or text); two index lookups find the ends
+#   start_id=123  starts at that row (inclusive), e.g. to show a search hit
+# Both pages carry `position`, the estimated fraction of the list above their first row.
+# total_estimate is the shop_counters row for the list (one lookup), or a COUNT for filters that have
+# no counter. It is an upper bound: the counters include rows whose user or vehicle row is missing,
+# which the JOINs leave out, so a reader must accept a list that ends before total_estimate.
+_PAGE_RECORD_TYPES = {'appointments': AppointmentRecord, 'users': UserRecord, 'vehicles': VehicleRecord}
+_PAGE_IDS = {'appointments': 'a.appointment_id', 'users': 'u.user_id', 'vehicles': 'v.vehicle_id'}
+
+_PAGE_SORTS = {
+    'appointments': {
+        'date': [('a.date', 'date'), ('a.time', 'time'), ('a.appointment_id', 'appointment_id')],
+        'id': [('a.appointment_id', 'appointment_id')],
+    },
+    'users': {
+        'name': [('u.full_name', 'full_name'), ('u.user_id', 'user_id')],
+        'username': [('u.username', 'username'), ('u.user_id', 'user_id')],
+        'id': [('u.user_id', 'user_id')],
+    },
+    'vehicles': {
+        'customer': [('u.full_name', 'customer_name'), ('v.user_id', 'user_id'), ('v.plate_no', 'plate_no'), ('v.vehicle_id', 'vehicle_id')],
+        'plate': [('v.plate_no', 'plate_no'), ('v.vehicle_id', 'vehicle_id')],
+        'id': [('v.vehicle_id', 'vehicle_id')],
+    },
+}
+
+def _encode_page_token(sort, values): #Packs the last row's sort key into an opaque continuation token.
+    raw = json.dumps([sort, list(values)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def _decode_page_token(token, sort, key_len):
+    try:
+        token_sort, values = json.loads(base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8'))
+    except (ValueError, TypeError, UnicodeError):
+        raise ValueError("Invalid page token.")
+    if token_sort != sort or len(values) != key_len:
+        raise ValueError("Page token does not belong to this sort order.")
+    return values
+
+_SEEK_CHARS = 4 # Characters after the shared prefix that place a text key between the first and last key
+_TEXT_KEY_CEILING = chr(0x10FFFF) # Sorts after any other character (SQLite compares text as UTF-8 bytes)
+
+def _is_iso_date(value):
+    try:
+        datetime.strptime(value, "%Y-%m-%d")
+        return True
+    except (TypeError, ValueError):
+        return False
+
+def _key_number(value, lo, hi): #Sort key -> number, so keys can be interpolated between the list's first (lo) and last (hi)
+    if isinstance(lo, (int, float)):
+        return value
+    if _is_iso_date(lo):
+        return datetime.strptime(value, "%Y-%m-%d").toordinal()
+    prefix = len(os.path.commonprefix([lo, hi]))
+    number = 0.0
+    for n, char in enumerate(value[prefix:prefix + _SEEK_CHARS]):
+        number += min(max(ord(char) - 31, 1), 96) / 97.0 ** (n + 1) # Printable ASCII as base-97 digits, 0 = end of text
+    return number
+
+def _key_from_number(number, lo, hi): #Inverse of _key_number
+    if isinstance(lo, int):
+        return int(number)
+    if isinstance(lo, float):
+        return number
+    if _is_iso_date(lo):
+        return datetime.fromordinal(int(number)).strftime("%Y-%m-%d")
+    chars = []
+    for _ in range(_SEEK_CHARS):
+        number *= 97
+        digit = int(number)
+        number -= digit
+        if digit == 0:
+            break
+        chars.append(chr(digit + 31))
+    return os.path.commonprefix([lo, hi]) + "".join(chars)
+
+def _count_page_rows(cursor, counter, select_sql, where, params): #Row count behind a page: its shop_counters row, or a COUNT for filters without one.
+    if counter:
+        row = cursor.execute("SELECT value FROM shop_counters WHERE name = ?", (counter,)).fetchone()
+        return row[0] if row else 0
+    sql = select_sql + (" WHERE " + " AND ".join(where) if where else "")
+    return cursor.execute(f"SELECT COUNT(*) FROM ({sql})", params).fetchone()[0]
+
+def _page_key_bounds(cursor, filtered_sql, params, exprs, column, limit): #First and last value of the leading sort key (two index lookups)
+    ends = []
+    for direction in ("ASC", "DESC"):
+        # Same ORDER BY and LIMIT as a page query, so the planner walks the same index (LIMIT 1 can make it
+        # pick a sort instead); only the first row is stepped
+        order = ", ".join(f"{expr} {direction}" for expr in exprs)
+        cursor.execute(f"{filtered_sql} ORDER BY {order} LIMIT ?", params + [limit])
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        ends.append(row[[col[0] for col in cursor.description].index(column)])
+    return ends
+
+def _fetch_page(kind, select_sql, where, params, sort, descending, page_size, page_token, seek, start_id, counter):
+    if sort not in _PAGE_SORTS[kind]:
+        raise ValueError(f"Unknown sort '{sort}' for {kind}. Choose from: {', '.join(_PAGE_SORTS[kind])}")
+    if page_size < 1:
+        raise ValueError("page_size must be at least 1.")
+    if seek is not None and not 0 <= seek <= 1:
+        raise ValueError("seek must be between 0 and 1.")
+    keys = _PAGE_SORTS[kind][sort]
+    exprs = [expr for expr, _ in keys]
+    direction = "DESC" if descending else "ASC"
+    filtered_sql = select_sql + (" WHERE " + " AND ".join(where) if where else "")
+
+    conditions = list(where)
+    filter_params = list(params)
+    params = list(params)
+    position = None
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        if page_token:
+            # Row-value comparison: everything strictly after the last row of the previous page
+            values = _decode_page_token(page_token, sort, len(keys))
+            conditions.append(f"({', '.join(exprs)}) {'<' if descending else '>'} ({', '.join('?' for _ in exprs)})")
+            params.extend(values)
+        elif seek is not None or start_id is not None:
+            bounds = _page_key_bounds(cursor, filtered_sql, filter_params, exprs, keys[0][1], page_size + 1)
+            if start_id is not None:
+                cursor.execute(f"{filtered_sql} {'AND' if where else 'WHERE'} {_PAGE_IDS[kind]} = ?", filter_params + [start_id])
+                row = cursor.fetchone()
+                if bounds is None or row is None: # Not in this list
+                    return {'rows': [], 'next_token': None, 'prev_token': None, 'position': None,
+                            'total_estimate': _count_page_rows(cursor, counter, select_sql, where, filter_params)}
+                columns = [col[0] for col in cursor.description]
+                values = [row[columns.index(col)] for _, col in keys]
+                conditions.append(f"({', '.join(exprs)}) {'<=' if descending else '>='} ({', '.join('?' for _ in exprs)})")
+                params.extend(values)
+            if bounds is not None:
+                lo, hi = (_key_number(value, *bounds) for value in bounds)
+                if start_id is not None:
+                    fraction = (_key_number(values[0], *bounds) - lo) / (hi - lo) if hi > lo else 0.0
+                    position = 1.0 - fraction if descending else fraction
+                else:
+                    fraction = 1.0 - seek if descending else seek
+                    if fraction <= 0.0 or fraction >= 1.0:
+                        key = bounds[0] if fraction <= 0.0 else bounds[1] # The list's own end keys, not a lossy round trip
+                    else:
+                        key = _key_from_number(lo + (hi - lo) * fraction, *bounds)
+                    if descending and isinstance(key, str):
+                        key += _TEXT_KEY_CEILING # The key is cut to _SEEK_CHARS; reading down, keep every text that starts with it
+                    conditions.append(f"{exprs[0]} {'<=' if descending else '>='} ?")
+                    params.append(key)
+                    position = seek
+
+        sql = select_sql + (" WHERE " + " AND ".join(conditions) if conditions else "")
+        sql += " ORDER BY " + ", ".join(f"{expr} {direction}" for expr in exprs)
+        sql += " LIMIT ?"
+        params.append(page_size + 1) # One extra row tells us whether another page exists
+        cursor.execute(sql, params)
+        rows_data = cursor.fetchall()
+        description = cursor.description
+        total_estimate = _count_page_rows(cursor, counter, select_sql, where, filter_params)
+
+    rows = _records(_PAGE_RECORD_TYPES[kind], description, rows_data[:page_size])
+    prev_token = next_token = None
+    if rows:
+        prev_token = _encode_page_token(sort, [rows[0][col] for _, col in keys])
+    if len(rows_data) > page_size:
+        last = rows[-1]
+        next_token = _encode_page_token(sort, [last[col] for _, col in keys])
+    return {'rows': rows, 'next_token': next_token, 'prev_token': prev_token, 'position': position,
+            'total_estimate': total_estimate}
+
+def get_appointments_page(page_size=100, page_token=None, sort='date', descending=True, include_deleted=False, seek=None, start_id=None): #Keyset-paginated get_all_appointments().
+    select_sql = """
+        SELECT 
+            a.appointment_id, a.date, a.time, a.status, a.status_message, a.is_deleted,
+            u.full_name, u.phone_no,
+            v.plate_no, v.brand, v.model,
+            a.services_summary AS services_names, a.total_cost
+        FROM appointments a
+        JOIN users u ON a.user_id = u.user_id
+        JOIN vehicles v ON a.vehicle_id = v.vehicle_id
+    """
+    where = [] if include_deleted else ["a.is_deleted = 0"]
+    counter = 'appointments' if include_deleted else 'listed_appointments'
+    return _fetch_page('appointments', select_sql, where, [], sort, descending, page_size, page_token, seek, start_id, counter)
+
+def get_users_page(page_size=100, page_token=None, sort='name', descending=False, user_type=None, seek=None, start_id=None): #Keyset-paginated get_all_users().
+    select_sql = "SELECT u.user_id, u.username, u.full_name, u.phone_no, u.user_type, u.last_login FROM users u"
+    where, params = [], []
+    counter = 'users'
+    if user_type is not None:
+        where.append("u.user_type = ?")
+        params.append(user_type)
+        counter = 'active_customers' if user_type == 0 else None
+    return _fetch_page('users', select_sql, where, params, sort, descending, page_size, page_token, seek, start_id, counter)
+
+def get_vehicles_page(page_size=100, page_token=None, sort='customer', descending=False, seek=None, start_id=None): #Keyset-paginated get_all_vehicles().
+    select_sql = """
         SELECT 
             v.vehicle_id, v.brand, v.model, v.plate_no, v.user_id, u.full_name AS customer_name
         FROM vehicles v
         JOIN users u ON v.user_id = u.user_id
-        ORDER BY customer_name, v.plate_no
-    """)
-    vehicles_data = cursor.fetchall()
-    cols = [col[0] for col in cursor.description]
-    conn.close()
-    return [dict(zip(cols, row)) for row in vehicles_data]
\ No newline at end of file
+    """
+    return _fetch_page('vehicles', select_sql, [], [], sort, descending, page_size, page_token, seek, start_id, 'vehicles')
+
+# Public functions are wrapped for INSTRUMENTATION; connection plumbing and the instrumentation API are not
+_NOT_INSTRUMENTED = {
+    'get_db_connection', 'set_storage_profile', 'db_connection', 'transaction', 'unit_of_work', 'close_connections',
+    'epoch_ms', 'invalidate_cache', 'get_cache_stats', 'enable_instrumentation', 'disable_instrumentation',
+    'is_instrumentation_enabled', 'reset_instrumentation', 'get_instrumentation_stats', 'get_slow_queries',
+    'export_instrumentation_json',
+}
+for _name, _func in list(globals().items()):
+    if (inspect.isfunction(_func) and _func.__module__ == __name__ and not _name.startswith('_')
+            and _name not in _NOT_INSTRUMENTED):
+        globals()[_name] = _instrumented(_func)
+del _name, _func
+
+if os.environ.get("MM_DB_INSTRUMENT") == "1":
+    enable_instrumentation()
+
+# MAINTENANCE COMMANDS
+# python database.py rebuild-counters   recompute shop_counters from the base tables
+# python database.py rebuild-rollups    recompute the report rollups from the appointments table
+# python database.py rebuild-conversations  recompute the admin inbox from the messages table
+# python database.py rebuild-search     refill the full-text search index
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="MM Auto Repair database maintenance")
+    parser.add_argument("command", choices=["rebuild-counters", "rebuild-rollups", "rebuild-conversations", "rebuild-search"])
+    parser.add_argument("--database", default=DATABASE_NAME, help="database file (default: %(default)s)")
+    args = parser.parse_args()
+
+    DATABASE_NAME = args.database
+    create_tables()
+    if args.command == "rebuild-counters":
+        for name, (stored, value) in rebuild_shop_counters().items():
+            status = "ok" if stored == value else f"fixed (was {stored})"
+            print(f"{name:<24} {value:>14}  {status}")
+    elif args.command == "rebuild-rollups":
+        print(f"Report rollups rebuilt for {rebuild_report_rollups()} day(s).")
+    elif args.command == "rebuild-conversations":
+        print(f"Conversations rebuilt: {rebuild_conversations()}.")
+    elif args.command == "rebuild-search":
+        print(f"Search index rebuilt: {rebuild_search_index()} entries.")
+    close_connections()
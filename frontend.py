@@ -1,7 +1,11 @@
 import tkinter as tk
-from tkinter import messagebox, ttk
+from tkinter import messagebox, ttk, filedialog
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, date
-import database  
+import itertools
+import queue
+import time
+import database
 
 #20 class
 #32 methods
@@ -17,6 +21,492 @@ FONT_TITLE = ("Helvetica", 24, "bold")
 FONT_HEADING = ("Helvetica", 14, "bold")
 FONT_BODY = ("Helvetica", 10)
 
+def format_timestamp(epoch_ms, fmt="%Y-%m-%d %I:%M %p"): #Epoch milliseconds from the database -> local display text.
+    if epoch_ms is None:
+        return 'N/A'
+    return datetime.fromtimestamp(epoch_ms / 1000).strftime(fmt)
+
+MESSAGE_PAGE_SIZE = 50 # Chat messages loaded when a conversation opens / per "Load older messages" click
+
+LOOKUP_LIMIT = 25 # Rows shown by the phone/plate type-ahead lookups
+LOOKUP_DELAY_MS = 150 # Pause in typing before a lookup runs
+
+def schedule_lookup(frame): #Debounced type-ahead: reloads frame (its load_data reads frame.lookup_var) once typing pauses.
+    if getattr(frame, '_lookup_job', None):
+        frame.after_cancel(frame._lookup_job)
+    frame._lookup_job = frame.after(LOOKUP_DELAY_MS, frame.load_data)
+
+# BACKGROUND LOADING
+# Screens split load_data into a fetch (database calls only, run on a worker thread) and a render (Tk widgets,
+# run on the Tk thread). Workers never touch Tk: they put finished futures on a queue the Tk thread polls with after().
+
+LOADER_WORKERS = 2 # Threads running screen queries; each borrows one of the database.POOL_SIZE pooled connections
+LOADER_POLL_MS = 15 # How often the Tk thread picks up finished queries while any are pending
+
+class BackgroundLoader: #Runs screen queries off the Tk thread and hands each result to its render callback on the Tk thread
+    def __init__(self, workers=LOADER_WORKERS):
+        self.workers = workers
+        self._executor = None
+        self._finished = queue.Queue() # (slot, ticket, future) put by the worker threads
+        self._pending = {}  # (widget path, key) -> (ticket, future, widget, render, on_error)
+        self._tickets = itertools.count(1)
+        self._root = None
+        self._poll_job = None
+
+    def submit(self, widget, fetch, render, key='load', on_error=None): #A newer submit for the same widget and key replaces the older one
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="mm-loader")
+        slot = (str(widget), key)
+        previous = self._pending.pop(slot, None)
+        if previous:
+            previous[1].cancel() # Not started yet -> never runs; already running -> its result is dropped
+        ticket = next(self._tickets)
+        future = self._executor.submit(fetch)
+        self._pending[slot] = (ticket, future, widget, render, on_error)
+        future.add_done_callback(lambda f: self._finished.put((slot, ticket, f)))
+        _show_loading(widget, True)
+        if self._poll_job is None:
+            self._root = widget._root()
+            self._poll_job = self._root.after(LOADER_POLL_MS, self._poll)
+
+    def cancel(self, widget): #Drops every load still pending for widget or its children (the panel being switched away from)
+        for slot in [slot for slot in self._pending if _is_within(slot[0], str(widget))]:
+            ticket, future, owner, render, on_error = self._pending.pop(slot)
+            future.cancel()
+            _show_loading(owner, False)
+        _show_loading(widget, False)
+
+    def cancel_all(self):
+        for ticket, future, widget, render, on_error in list(self._pending.values()):
+            self.cancel(widget)
+
+    def is_loading(self, widget=None, key=None): #key narrows it to one kind of load of that widget
+        if widget is None:
+            return bool(self._pending)
+        return any(_is_within(slot[0], str(widget)) and key in (None, slot[1]) for slot in self._pending)
+
+    def _poll(self):
+        self._poll_job = None
+        try:
+            while True:
+                try:
+                    slot, ticket, future = self._finished.get_nowait()
+                except queue.Empty:
+                    break
+                entry = self._pending.get(slot)
+                if entry is None or entry[0] != ticket:
+                    continue # Superseded or canceled
+                del self._pending[slot]
+                self._deliver(entry)
+        finally:
+            if self._pending and self._poll_job is None:
+                self._poll_job = self._root.after(LOADER_POLL_MS, self._poll)
+
+    def _deliver(self, entry):
+        ticket, future, widget, render, on_error = entry
+        if not widget.winfo_exists():
+            return
+        if not any(entry[2] is widget for entry in self._pending.values()):
+            _show_loading(widget, False)
+        try:
+            result = future.result()
+        except Exception as e:
+            (on_error or _load_failed)(e)
+        else:
+            render(result)
+
+def _is_within(path, ancestor): #Tk widget paths: '.a.b' is within '.a'
+    return path == ancestor or path.startswith(ancestor.rstrip('.') + '.')
+
+def _show_loading(widget, on): #"Loading..." badge in the panel's top-right corner plus a busy cursor
+    label = getattr(widget, '_loading_label', None)
+    if on:
+        if label is None:
+            label = widget._loading_label = tk.Label(widget, text="Loading...", bg=COLOR_PENDING, fg="white", font=FONT_BODY, padx=6)
+        label.place(relx=1.0, y=0, anchor='ne')
+        label.lift()
+        widget.config(cursor='watch')
+    elif label is not None:
+        label.place_forget()
+        widget.config(cursor='')
+
+def _load_failed(error):
+    messagebox.showerror("Load Failed", f"Could not load this screen: {error}")
+
+loader = BackgroundLoader()
+
+# VIRTUAL TABLE
+# Admin lists can run to a million rows. A VirtualTable keeps one screenful of Treeview items and refills them as
+# the user scrolls; rows come from a keyset-paged source (database.get_*_page) on the loader threads, a page ahead
+# of the view. Only a bounded buffer of rows around the view is kept (TABLE_BUFFER_ROWS): scrolling extends it a page
+# at a time from the tokens at its edges and drops whole pages from the far side. A jump loads a new window with a
+# keyset seek: the scrollbar fraction is turned into a sort key value (seek=), or the list end is read backwards
+# (the reversed sort order), so a jump costs the same anywhere in the list. Row indexes away from the two ends are
+# estimates; they are corrected when a page reaches an end of the list.
+# Selection and focus are kept by row key with the selected records, so they survive scrolling out of the buffer.
+
+TABLE_PAGE_SIZE = 200 # Rows requested ahead of and behind the visible window
+TABLE_BUFFER_ROWS = 2000 # Most rows kept in memory; pages farthest from the view are dropped past this
+TABLE_WHEEL_ROWS = 3 # Rows per mouse wheel notch
+
+class VirtualTable(tk.Frame): #Treeview + scrollbar that only holds the visible rows of a paged source or an in-memory list
+    def __init__(self, parent, columns, values, key, tags=None, fields=None):
+        super().__init__(parent, bg=COLOR_BACKGROUND)
+        self.columns = columns
+        self.values = values # record -> tuple for the columns
+        self.key = key       # record -> unique ID (also the Treeview item ID)
+        self.tags = tags or (lambda record: ())
+        self.fields = fields or {} # column -> record field, for sorting in-memory lists
+        self.tree = ttk.Treeview(self, columns=columns, show='headings')
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.scrollbar.pack(side='right', fill='y')
+        self.tree.pack(side='left', fill='both', expand=True)
+        for column in columns:
+            self.tree.heading(column, command=lambda column=column: self.sort_by(column))
+
+        self.source = None   # source(page_size=, page_token=, sort=, descending=, seek=, start_id=) -> database.get_*_page() result
+        self.sorts = {}      # column -> source sort name
+        self.default_sort = (None, False)
+        self.sort_column, self.descending = None, False
+        self.static = True   # True: rows is the whole list (set_rows); False: rows is a buffer of source rows
+        self.rows = []       # Buffered rows, in table order
+        self.offset = 0      # List index of rows[0]
+        self.pages = []      # [row count, token before its first row, token after its last row] per buffered page; None = list edge
+        self.total = 0       # Row count (the source's upper bound until a page reaches the end of the list)
+        self.first = 0       # Index of the top visible row
+        self.visible = 1
+        self.row_height, self.top = 20, 25 # Measured from the first item once the tree is mapped
+        self.selected = {}   # key -> record of every selected row
+        self.focus_key, self.focus_record, self.focus_index = None, None, None
+        self._replace = False  # A refresh is loading; the buffer is swapped when its first page arrives
+        self._prune = False    # ...and selected rows it does not bring back are dropped
+        self._generation = 0
+        self._target = None    # (index, 'end' or None; key or None) to focus once that row is loaded
+        self._shown, self._shown_start = {}, 0
+
+        self.tree.bind('<<TreeviewSelect>>', self._on_select)
+        self.tree.bind('<Configure>', lambda event: self._resize())
+        self.tree.bind('<MouseWheel>', lambda event: self._scroll_by(-TABLE_WHEEL_ROWS if event.delta > 0 else TABLE_WHEEL_ROWS))
+        self.tree.bind('<Button-4>', lambda event: self._scroll_by(-TABLE_WHEEL_ROWS))
+        self.tree.bind('<Button-5>', lambda event: self._scroll_by(TABLE_WHEEL_ROWS))
+        for sequence, delta in (('<Up>', -1), ('<Down>', 1), ('<Prior>', 'page-up'), ('<Next>', 'page-down'),
+                                ('<Home>', 'home'), ('<End>', 'end')):
+            self.tree.bind(sequence, lambda event, delta=delta: self._move_focus(delta))
+
+    def set_source(self, source, sorts, column, descending=False): #Pages come from source; sorts maps sortable columns to its sort names
+        self.source, self.sorts = source, sorts
+        self.default_sort = (column, descending)
+        self.sort_column, self.descending = column, descending
+        self._show_sort_arrow()
+
+    def refresh(self): #Reloads from the paged source, keeping the scroll position, selection and sort
+        self.static = False
+        if self.sort_column not in self.sorts: # A column only an in-memory list could sort by
+            self.sort_column, self.descending = self.default_sort
+            self._show_sort_arrow()
+        self._restart()
+        self._prune = True
+        self._fetch(force=True)
+
+    def set_rows(self, rows): #Shows a complete in-memory list (lookup results, a customer's own rows)
+        loader.cancel(self)
+        self.static = True
+        self.rows = list(rows)
+        self.offset, self.pages = 0, [[len(self.rows), None, None]]
+        self._replace = self._prune = False
+        self._generation += 1
+        self._target = None
+        self._keep_selection(self.rows)
+        self._sort_rows()
+        self.total = len(self.rows)
+        self._render()
+
+    def sort_by(self, column): #Heading click: sorts by column, or reverses the order if it already is the sort column
+        if column not in (self.fields if self.static else self.sorts):
+            return
+        self.descending = not self.descending if column == self.sort_column else False
+        self.sort_column = column
+        self._show_sort_arrow()
+        self.first = 0
+        if self.static:
+            self._sort_rows()
+            self._render()
+        else:
+            self._restart()
+            self._fetch(force=True)
+            self._render()
+
+    def selected_rows(self): #Records of every selected row, including rows scrolled out of view
+        return list(self.selected.values())
+
+    def focused_row(self): #Record of the row last clicked or moved to with the keyboard (None if there is none)
+        return self.focus_record if self.focus_key is not None else None
+
+    def reveal(self, key): #Scrolls to and selects the row with this key; a paged list loads the page that starts at it
+        position = next((n for n, record in enumerate(self.rows) if str(self.key(record)) == str(key)), None)
+        if self.static or (position is not None and not self._replace):
+            if position is not None:
+                self._target = (self.offset + position, str(key))
+                self.first = max(0, self.offset + position - self.visible // 2)
+                self._apply_target()
+                self._render()
+            return
+        if self.source is None:
+            return
+        self._target = (None, str(key))
+        self._request(None, self.visible + TABLE_PAGE_SIZE, False, 'reveal', None, start_id=key)
+
+    def _restart(self):
+        self._generation += 1
+        self._replace = True # Old rows stay on screen until the new first page arrives
+        self.focus_index, self._target = None, None
+
+    def _keep_selection(self, rows): #Drops selected/focused rows not among rows and refreshes the records of the rest
+        found = {str(self.key(record)): record for record in rows}
+        self.selected = {key: found[key] for key in self.selected if key in found}
+        if self.focus_key in found:
+            self.focus_record = found[self.focus_key]
+        else:
+            self.focus_key, self.focus_record, self.focus_index = None, None, None
+
+    def _sort_rows(self):
+        field = self.fields.get(self.sort_column)
+        if field:
+            self.rows.sort(key=lambda record: (record[field] is None, record[field]), reverse=self.descending)
+            self.focus_index = None
+
+    def _show_sort_arrow(self):
+        for column in self.columns:
+            text = self.tree.heading(column, 'text').rstrip(' ▲▼')
+            if column == self.sort_column:
+                text += " ▼" if self.descending else " ▲"
+            self.tree.heading(column, text=text)
+
+    def _fetch(self, force=False): #Loads the rows around the view in the background if the buffer does not hold them
+        if self.static or self.source is None or (not force and loader.is_loading(self, 'rows')):
+            return
+        self.first = max(0, min(self.first, self.total - self.visible))
+        start, end = max(0, self.first - TABLE_PAGE_SIZE), self.first + self.visible + TABLE_PAGE_SIZE
+        if self.total:
+            end = min(end, self.total)
+        if self._replace or not self.pages:
+            return self._seek(start, end)
+        buffer_start, buffer_end = self.offset, self.offset + len(self.rows)
+        before, after = self.pages[0][1], self.pages[-1][2]
+        if end > buffer_end and after is not None:
+            if start > buffer_end + TABLE_PAGE_SIZE:
+                return self._seek(start, end)
+            self._request(after, max(end - buffer_end, TABLE_PAGE_SIZE), False, 'append', buffer_end)
+        elif start < buffer_start and before is not None:
+            if end < buffer_start - TABLE_PAGE_SIZE:
+                return self._seek(start, end)
+            self._request(before, max(buffer_start - start, TABLE_PAGE_SIZE), True, 'prepend', buffer_start)
+
+    def _seek(self, start, end): #Loads rows start..end as a new buffer: from an end of the list, or by seeking to an estimated key
+        count = max(end - start, TABLE_PAGE_SIZE)
+        if start == 0 or not self.total:
+            self._request(None, count, False, 'replace', 0)
+        elif end >= self.total:
+            self._request(None, count, True, 'replace', None) # The last rows: the reversed order, from the end
+        else:
+            self._request(None, count, False, 'replace', start, seek=start / self.total)
+
+    def _request(self, token, count, reverse, place, at, seek=None, start_id=None):
+        source, generation = self.source, self._generation
+        sort, descending = self.sorts[self.sort_column], self.descending != reverse
+        from_edge = token is None and seek is None and start_id is None
+        loader.submit(self, lambda: source(page_size=count, page_token=token, sort=sort, descending=descending, seek=seek, start_id=start_id),
+                      lambda page: self._add_page(generation, page, from_edge, reverse, place, at),
+                      key='rows')
+
+    def _add_page(self, generation, page, from_edge, reverse, place, at):
+        if generation != self._generation:
+            return
+        rows = page['rows']
+        if place == 'reveal':
+            if not rows or str(self.key(rows[0])) != self._target[1]:
+                self._target = None # Not in this list (deleted meanwhile): keep what is shown
+                return
+            at = int(page['position'] * page['total_estimate'])
+            self.first = max(0, at - self.visible // 2)
+        if reverse: # Read backwards: flip into table order; its next_token continues towards the start
+            rows = rows[::-1]
+            entry = [len(rows), page['next_token'], None if from_edge else page['prev_token']]
+        else:
+            entry = [len(rows), None if from_edge else page['prev_token'], page['next_token']]
+        self.total = page['total_estimate']
+        if self._replace or place in ('replace', 'reveal'):
+            if self._prune:
+                self._keep_selection(rows)
+            self._replace = self._prune = False
+            if at is None: # From the end: the page's last row is the list's last row
+                at = self.total
+            self.rows, self.pages = rows, [entry] if rows else []
+            self.offset = max(0, at - len(rows) if reverse else at)
+            if rows and not from_edge and entry[2] is None: # A seek reached the end: the estimate gave way, pin it there
+                self.offset = max(0, self.total - len(rows))
+            if not rows and from_edge:
+                self.pages = [[0, None, None]] # The list is empty
+            elif not rows: # Seeked past the last row; the next load reads from the start
+                self.total = 0
+        elif place == 'append':
+            if rows:
+                self.rows.extend(rows)
+                self.pages.append(entry)
+            else:
+                self.pages[-1][2] = None
+        elif rows:
+            self.rows[:0] = rows
+            self.pages.insert(0, entry)
+            self.offset -= len(rows)
+        else:
+            self.pages[0][1] = None
+        if self.pages:
+            self._settle()
+        for record in rows:
+            key = str(self.key(record))
+            if key in self.selected:
+                self.selected[key] = record
+            if key == self.focus_key:
+                self.focus_record = record
+        self._apply_target()
+        self._render()
+        self._fetch() # Keeps going while the view is past the buffered rows
+
+    def _settle(self): #Fixes offset/total once a list edge is in the buffer, then trims the buffer to TABLE_BUFFER_ROWS
+        if self.offset < 0 or (self.pages[0][1] is None and self.offset != 0): # Indexes were off (rows added or removed meanwhile)
+            shift = self.offset
+            self.offset = 0
+            self.first = max(0, self.first - shift)
+            self.total -= shift
+            if self.focus_index is not None:
+                self.focus_index -= shift
+        if self.pages[-1][2] is None:
+            self.total = self.offset + len(self.rows)
+        self.total = max(self.total, self.offset + len(self.rows))
+        while len(self.rows) > TABLE_BUFFER_ROWS and len(self.pages) > 1:
+            if self.first - self.offset > self.offset + len(self.rows) - (self.first + self.visible):
+                count = self.pages.pop(0)[0]
+                del self.rows[:count]
+                self.offset += count
+            else:
+                count = self.pages.pop()[0]
+                del self.rows[len(self.rows) - count:]
+
+    def _apply_target(self): #Focuses and selects the pending target row once it is in the buffer
+        if self._target is None or not self.rows:
+            return
+        index, key = self._target
+        if key is not None:
+            position = next((n for n, record in enumerate(self.rows) if str(self.key(record)) == key), None)
+            if position is None:
+                if index is not None and self.offset <= index < self.offset + len(self.rows):
+                    self._target = None # Its place is loaded but the row is gone
+                return
+        elif index == 'end':
+            if self.pages[-1][2] is not None:
+                return # The buffer does not reach the end of the list yet
+            position = len(self.rows) - 1
+        else:
+            position = min(index, self.total - 1) - self.offset
+            if not 0 <= position < len(self.rows):
+                return
+        record = self.rows[position]
+        self.focus_key, self.focus_record, self.focus_index = str(self.key(record)), record, self.offset + position
+        self.selected = {self.focus_key: record}
+        self._target = None
+        if self.focus_index < self.first:
+            self.first = self.focus_index
+        elif self.focus_index >= self.first + self.visible:
+            self.first = self.focus_index - self.visible + 1
+
+    def _render(self): #Refills the Treeview with the rows in the visible window
+        self.first = max(0, min(self.first, self.total - self.visible))
+        start, stop = max(0, self.first - self.offset), self.first - self.offset + self.visible
+        window = self.rows[start:stop] if stop > 0 else []
+        if self.total:
+            self.scrollbar.set(self.first / self.total, min(1.0, (self.first + self.visible) / self.total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+        if not window and self.total and loader.is_loading(self, 'rows'):
+            return # A jump is loading: the old rows stay up until the new ones arrive
+        children = self.tree.get_children()
+        if children:
+            self.tree.delete(*children)
+        self._shown, self._shown_start = {}, self.offset + start
+        for record in window:
+            key = str(self.key(record))
+            self._shown[key] = record
+            self.tree.insert('', tk.END, iid=key, values=self.values(record), tags=self.tags(record))
+        self.tree.selection_set([key for key in self._shown if key in self.selected])
+        if self.focus_key in self._shown:
+            self.tree.focus(self.focus_key)
+
+    def _resize(self): #Fits the window to the tree's height (row height is measured from a mapped item)
+        children = self.tree.get_children()
+        box = self.tree.bbox(children[0]) if children else ''
+        if box:
+            self.top, self.row_height = box[1], box[3]
+        visible = max(1, (self.tree.winfo_height() - self.top) // self.row_height)
+        if visible != self.visible:
+            self.visible = visible
+            self._fetch()
+            self._render()
+
+    def _on_select(self, event): #Keeps the key-based selection in step with clicks in the visible window
+        selection = set(self.tree.selection())
+        self.selected = {key: record for key, record in self.selected.items() if key not in self._shown}
+        self.selected.update((key, self._shown[key]) for key in self._shown if key in selection)
+        focus = self.tree.focus()
+        if focus in self._shown and focus != self.focus_key:
+            self.focus_key, self.focus_record = focus, self._shown[focus]
+            self.focus_index = self._shown_start + self.tree.index(focus)
+
+    def _focus_index(self): #List index of the focused row (its last known index once it has left the buffer)
+        if self.focus_key is None:
+            return None
+        position = None if self.focus_index is None else self.focus_index - self.offset
+        if position is None or not 0 <= position < len(self.rows) or str(self.key(self.rows[position])) != self.focus_key:
+            position = next((n for n, record in enumerate(self.rows) if str(self.key(record)) == self.focus_key), None)
+            if position is not None:
+                self.focus_index = self.offset + position
+        return self.focus_index
+
+    def _scroll_by(self, rows):
+        self.first = max(0, self.first + rows)
+        self._fetch()
+        self._render()
+        return "break"
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == 'moveto':
+            self.first = int(float(amount) * self.total)
+            self._fetch()
+            self._render()
+        else:
+            self._scroll_by(int(amount) * (self.visible if unit == 'pages' else 1))
+
+    def _move_focus(self, delta): #Arrow/Page/Home/End keys move the focused row and scroll the window with it
+        if not self.total:
+            return "break"
+        index = self._focus_index()
+        steps = {'page-up': -self.visible, 'page-down': self.visible}
+        if delta == 'home':
+            index = 0
+        elif delta == 'end':
+            index = self.total - 1
+        else:
+            index = self.first if index is None else max(0, min(self.total - 1, index + steps.get(delta, delta)))
+        if index < self.first:
+            self.first = index
+        elif index >= self.first + self.visible:
+            self.first = index - self.visible + 1
+        self._target = ('end' if delta == 'end' else index, None)
+        self._apply_target()
+        self._fetch()
+        self._render()
+        return "break"
+
 # UI FRAME CLASSES
 # LOGIN/SIGNUP
 
@@ -206,6 +696,9 @@ class UserDashboardFrame(tk.Frame):
         self.show_content_frame("Home") 
 
     def show_content_frame(self, name): 
+        previous = getattr(self, 'current_content_frame', None)
+        if previous is not None and previous is not self.content_frames[name]:
+            loader.cancel(previous) # Quick panel switches: the hidden panel's queries are dropped
         self.current_content_frame = self.content_frames[name]
         if hasattr(self.current_content_frame, 'load_data'):
             self.current_content_frame.load_data() 
@@ -276,38 +769,34 @@ class HomePanel(tk.Frame):
             last_login_text = datetime.strptime(user['last_login'], "%Y-%m-%d %H:%M:%S").strftime("%B %d, %Y at %I:%M %p")
         self.last_login_label.config(text=f"Last login date: {last_login_text}\n Note: We are not accepting night schedule, we are available only at 6:00 AM - 5:00 PM")
 
-        # 2. Tile Data
+        loader.submit(self, lambda: database.get_user_dashboard(user_id), self._render)
+
+    def _render(self, dashboard):
+        # 2. Tile Data (one snapshot: database.get_user_dashboard)
+        tiles = dashboard['tiles']
+
         # Tile 1: Upcoming Appointment
-        upcoming = database.get_upcoming_appointment(user_id)
-        if upcoming:
-            date_obj = datetime.strptime(upcoming['date'], "%Y-%m-%d").strftime("%B %d, %Y")
-            time_obj = datetime.strptime(upcoming['time'], "%H:%M").strftime("%I:%M %p") # NEW: AM/PM
-            self.tiles["Upcoming Appointment"].label1.config(text=upcoming['status'], fg=COLOR_PENDING if upcoming['status'] == 'Pending' else COLOR_SUCCESS)
-            self.tiles["Upcoming Appointment"].label2.config(text=f"{date_obj}\n{time_obj}\nPlate: {upcoming['plate_no']}", bg='white')
+        if tiles['upcoming_status']:
+            date_obj = datetime.strptime(tiles['upcoming_date'], "%Y-%m-%d").strftime("%B %d, %Y")
+            time_obj = datetime.strptime(tiles['upcoming_time'], "%H:%M").strftime("%I:%M %p") # NEW: AM/PM
+            self.tiles["Upcoming Appointment"].label1.config(text=tiles['upcoming_status'], fg=COLOR_PENDING if tiles['upcoming_status'] == 'Pending' else COLOR_SUCCESS)
+            self.tiles["Upcoming Appointment"].label2.config(text=f"{date_obj}\n{time_obj}\nPlate: {tiles['upcoming_plate_no']}", bg='white')
         else:
             self.tiles["Upcoming Appointment"].label1.config(text="No Upcoming Appointment", fg=COLOR_PRIMARY)
             self.tiles["Upcoming Appointment"].label2.config(text="")
 
         # Tile 2: Vehicle Status
-        vehicles = database.get_user_vehicles(user_id)
-        self.tiles["Vehicle Status"].label1.config(text=f"{len(vehicles)} Vehicle(s) Registered", fg=COLOR_PRIMARY)
+        self.tiles["Vehicle Status"].label1.config(text=f"{tiles['vehicle_count']} Vehicle(s) Registered", fg=COLOR_PRIMARY)
         self.tiles["Vehicle Status"].label2.config(text="All vehicles Ready", bg='white')
 
         # Tile 3: Service History Count
-        history_count = database.get_completed_appointments_count(user_id) 
-        
-        # Temporarily use get_user_appointments and filter locally for a quick fix
-        all_appts = database.get_user_appointments(user_id)
-        history_count = sum(1 for appt in all_appts if appt['status'] == 'Completed')
-
-        self.tiles["Service History Count"].label1.config(text=f"{history_count} Completed", fg=COLOR_SUCCESS)
+        self.tiles["Service History Count"].label1.config(text=f"{tiles['completed_count']} Completed", fg=COLOR_SUCCESS)
         self.tiles["Service History Count"].label2.config(text="Services Done", bg='white')
 
         # Tile 4: Latest Status Message 
-        latest_status = database.get_appointment_status_message(user_id)
-        if latest_status:
-            status = latest_status['status']
-            message = latest_status['message']
+        if tiles['latest_status']:
+            status = tiles['latest_status']
+            message = tiles['latest_message']
             if status == 'Approved': color = COLOR_SUCCESS
             elif status == 'Rejected': color = COLOR_ERROR
             elif status == 'Completed': color = COLOR_SUCCESS
@@ -324,7 +813,7 @@ class HomePanel(tk.Frame):
         for widget in self.offers_list_frame.winfo_children():
             widget.destroy()
             
-        offers = database.get_all_service_offers()
+        offers = dashboard['service_offers']
         if offers:
             for i, offer in enumerate(offers):
                 text = f"{i+1}. {offer['service_name']} (Labor Rate: PHP {offer['labor_rate']:.2f})"
@@ -358,10 +847,12 @@ class ServiceOffersFrame(tk.Frame):
         self.scrollbar.pack(side="right", fill="y")
 
     def load_data(self):
+        loader.submit(self, database.get_all_service_offers, self._render)
+
+    def _render(self, offers):
         for widget in self.scrollable_frame.winfo_children():
             widget.destroy()
             
-        offers = database.get_all_service_offers()
         if offers:
             tk.Label(self.scrollable_frame, text="Service Name", font=FONT_HEADING, bg=COLOR_BACKGROUND, padx=10, pady=5).grid(row=0, column=0, sticky='w')
             tk.Label(self.scrollable_frame, text="Labor Rate (PHP)", font=FONT_HEADING, bg=COLOR_BACKGROUND, padx=10, pady=5).grid(row=0, column=1, sticky='w')
@@ -458,16 +949,19 @@ class MyVehiclesFrame(tk.Frame):
         self.tree.pack(fill='both', expand=True, pady=10)
 
     def load_data(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
         user_id = self.controller.get_current_user_id()
         if user_id:
-            vehicles = database.get_user_vehicles(user_id)
-            for vehicle in vehicles:
-                self.tree.insert('', tk.END, values=(
-                    vehicle['vehicle_id'], vehicle['brand'], vehicle['model'], vehicle['plate_no']
-                ), tags=(vehicle['vehicle_id'], vehicle['plate_no']))
+            loader.submit(self, lambda: database.get_user_vehicles(user_id), self._render)
+        else:
+            self._render([])
+
+    def _render(self, vehicles):
+        for item in self.tree.get_children():
+            self.tree.delete(item)
+        for vehicle in vehicles:
+            self.tree.insert('', tk.END, values=(
+                vehicle['vehicle_id'], vehicle['brand'], vehicle['model'], vehicle['plate_no']
+            ), tags=(vehicle['vehicle_id'], vehicle['plate_no']))
 
     def _show_add_vehicle_dialog(self):
         dialog = tk.Toplevel(self)
@@ -540,6 +1034,13 @@ class AppointmentFrame(tk.Frame): # (Appointment management with multi-select, t
                 combo = ttk.Combobox(form_fields_frame, state="readonly", width=40)
                 combo.grid(row=i, column=1, sticky='w', padx=5, pady=5)
                 self.entries[key] = combo
+            elif key == 'time':
+                # Free slots for the chosen date load when the date field is left and refresh whenever the drop-down opens; typing a time still works
+                combo = ttk.Combobox(form_fields_frame, width=38)
+                combo.configure(postcommand=lambda c=combo: self._fill_free_slots(c, self.entries['date'].get()))
+                self.entries['date'].bind("<FocusOut>", lambda event, c=combo: self._fill_free_slots(c, self.entries['date'].get()))
+                combo.grid(row=i, column=1, sticky='w', padx=5, pady=5)
+                self.entries[key] = combo
             else:
                 entry = ttk.Entry(form_fields_frame, width=40)
                 entry.grid(row=i, column=1, sticky='w', padx=5, pady=5)
@@ -610,13 +1111,15 @@ class AppointmentFrame(tk.Frame): # (Appointment management with multi-select, t
         self.tree.pack(fill='both', expand=True, pady=10)
 
     def load_data(self):
-        self._populate_combo_boxes()
+        user_id = self.controller.get_current_user_id()
+        # Independent loads: the booking form's choices, the free times of its date and the appointment list
+        loader.submit(self, lambda: (database.get_user_vehicles(user_id) if user_id else None, database.get_all_service_offers()),
+                      lambda result: self._populate_combo_boxes(*result), key='choices')
+        self._fill_free_slots(self.entries['time'], self.entries['date'].get())
         self._populate_treeview()
 
-    def _populate_combo_boxes(self): # Populate Vehicle Combobox
-        user_id = self.controller.get_current_user_id()
-        if user_id:
-            vehicles = database.get_user_vehicles(user_id)
+    def _populate_combo_boxes(self, vehicles, offers): # Populate Vehicle Combobox
+        if vehicles is not None:
             vehicle_options = [f"{v['plate_no']} / {v['model']}" for v in vehicles]
             self.entries['vehicle']['values'] = vehicle_options
             if vehicle_options:
@@ -624,7 +1127,6 @@ class AppointmentFrame(tk.Frame): # (Appointment management with multi-select, t
 
         # Populate Service Listbox
         self.service_listbox.delete(0, tk.END)
-        offers = database.get_all_service_offers()
         self.service_map = {offer['service_name']: offer['service_id'] for offer in offers}
         self.service_list = offers # Store full list
         
@@ -632,32 +1134,41 @@ class AppointmentFrame(tk.Frame): # (Appointment management with multi-select, t
             self.service_listbox.insert(tk.END, f"{offer['service_name']} (PHP {offer['labor_rate']:.2f})")
 
     def _populate_treeview(self):
+        user_id = self.controller.get_current_user_id()
+        if user_id:
+            loader.submit(self, lambda: database.get_user_appointments(user_id), self._render_appointments, key='appointments')
+        else:
+            self._render_appointments([])
+
+    def _render_appointments(self, appointments):
         for item in self.tree.get_children():
             self.tree.delete(item)
             
-        user_id = self.controller.get_current_user_id()
-        if user_id:
-            appointments = database.get_user_appointments(user_id)
-            for appt in appointments:               
-                status = appt['status']
-                tags = (appt['appointment_id'], status) 
-
-                services_display = appt['services_names'].replace(' | ', ', ') if appt['services_names'] else 'N/A'
-                total_cost_display = f"PHP {appt['total_cost']:.2f}" if appt['total_cost'] is not None else 'N/A'
-                time_display = datetime.strptime(appt['time'], "%H:%M").strftime("%I:%M %p") # NEW: AM/PM
-
-                self.tree.insert('', tk.END, values=(
-                    appt['appointment_id'], 
-                    appt['date'], 
-                    time_display, 
-                    appt['plate_no'], 
-                    services_display,
-                    total_cost_display,
-                    status
-                ), tags=(appt['appointment_id'], status))
-                
-                # Apply color tag
-                self.tree.item(self.tree.get_children()[-1], tags=(appt['appointment_id'], status, status))
+        for appt in appointments:               
+            status = appt['status']
+            tags = (appt['appointment_id'], status) 
+
+            services_display = appt['services_names'].replace(' | ', ', ') if appt['services_names'] else 'N/A'
+            total_cost_display = f"PHP {appt['total_cost']:.2f}" if appt['total_cost'] is not None else 'N/A'
+            time_display = datetime.strptime(appt['time'], "%H:%M").strftime("%I:%M %p") # NEW: AM/PM
+
+            self.tree.insert('', tk.END, values=(
+                appt['appointment_id'], 
+                appt['date'], 
+                time_display, 
+                appt['plate_no'], 
+                services_display,
+                total_cost_display,
+                status
+            ), tags=(appt['appointment_id'], status)) # The status tag gives the row its color
+
+    def _fill_free_slots(self, combo, date_str): #Loads the free times of date_str into a time combobox off the Tk thread; the drop-down lists the last load.
+        def fetch():
+            try:
+                return database.get_available_slots(date_str, date_str, 30).get(date_str, []) # 30-minute slots
+            except ValueError:
+                return [] # Date not typed as YYYY-MM-DD yet
+        loader.submit(combo.master, fetch, lambda free: combo.configure(values=free), key='slots')
 
     def _book_appointment(self):
         vehicle_text = self.entries['vehicle'].get()
@@ -711,9 +1222,12 @@ class AppointmentFrame(tk.Frame): # (Appointment management with multi-select, t
         new_date_entry.pack(pady=2)
 
         tk.Label(dialog, text="New Time (HH:MM):", bg=COLOR_BACKGROUND).pack(pady=(10, 0))
-        new_time_entry = ttk.Entry(dialog, width=30)
+        new_time_entry = ttk.Combobox(dialog, width=28)
+        new_time_entry.configure(postcommand=lambda: self._fill_free_slots(new_time_entry, new_date_entry.get()))
         new_time_entry.insert(0, datetime.strptime(self.tree.item(selected_item, 'values')[2], "%I:%M %p").strftime("%H:%M")) 
         new_time_entry.pack(pady=2)
+        new_date_entry.bind("<FocusOut>", lambda event: self._fill_free_slots(new_time_entry, new_date_entry.get()))
+        self._fill_free_slots(new_time_entry, new_date_entry.get()) # Ready before the drop-down is first opened
 
         def perform_reschedule():
             date_str = new_date_entry.get()
@@ -753,9 +1267,12 @@ class BillingInvoiceFrame(tk.Frame): #Billing Invoice Frame
         self.controller = controller
         tk.Label(self, text="Billing Invoice History", font=FONT_TITLE, bg=COLOR_BACKGROUND, fg=COLOR_PRIMARY).pack(pady=(0, 20), anchor='w')
 
-        # Treeview for Billing History
+        # Table for Billing History (the customer's whole list, sorted by clicking a heading)
         columns = ('ID', 'Date', 'Time', 'PlateNo', 'Status', 'Total Cost')
-        self.tree = ttk.Treeview(self, columns=columns, show='headings')
+        self.table = VirtualTable(self, columns, self._row_values, key=lambda appt: appt['appointment_id'],
+                                  fields={'ID': 'appointment_id', 'Date': 'date', 'Time': 'time', 'PlateNo': 'plate_no',
+                                          'Status': 'status', 'Total Cost': 'total_cost'})
+        self.tree = self.table.tree
         self.tree.heading('ID', text='Appt ID')
         self.tree.heading('Date', text='Date')
         self.tree.heading('Time', text='Time')
@@ -770,9 +1287,11 @@ class BillingInvoiceFrame(tk.Frame): #Billing Invoice Frame
         self.tree.column('Status', width=100, anchor='center')
         self.tree.column('Total Cost', width=100, anchor='e')
         
-        self.tree.pack(fill='x', pady=10)
+        self.tree.config(height=10)
+        self.table.pack(fill='x', pady=10)
         
-        self.tree.bind('<<TreeviewSelect>>', self._show_invoice_details)
+        self.tree.bind('<<TreeviewSelect>>', self._show_invoice_details, add='+')
+        self.shown_invoice = None
 
         # Invoice Details Panel
         self.details_frame = tk.LabelFrame(self, text="Selected Invoice Details", font=FONT_HEADING, bg=COLOR_BACKGROUND, padx=10, pady=10)
@@ -782,34 +1301,32 @@ class BillingInvoiceFrame(tk.Frame): #Billing Invoice Frame
         self.details_label.pack(fill='both', expand=True)
         
     def load_data(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-            
         user_id = self.controller.get_current_user_id()
         if user_id:
-            # Only show appointments with a cost (those that have services) and are not soft-deleted
-            appointments = database.get_user_appointments(user_id) 
-            for appt in appointments:
-                # The billing invoice is most relevant for Approved/Completed, but history should include all
-                if appt['is_deleted'] == 0:
-                    total_cost_display = f"PHP {appt['total_cost']:.2f}" if appt['total_cost'] is not None else 'N/A'
-                    time_display = datetime.strptime(appt['time'], "%H:%M").strftime("%I:%M %p") 
-                    
-                    self.tree.insert('', tk.END, values=(
-                        appt['appointment_id'], appt['date'], time_display, 
-                        appt['plate_no'], appt['status'], total_cost_display
-                    ), tags=(appt['appointment_id']))
-        
+            loader.submit(self, lambda: database.get_user_appointments(user_id), self._render)
+        else:
+            self._render([])
+
+    def _render(self, appointments):
+        # The billing invoice is most relevant for Approved/Completed, but history should include all that are not soft-deleted
+        self.table.set_rows([appt for appt in appointments if appt['is_deleted'] == 0])
+        self.shown_invoice = None
         self.details_label.config(text="Select an appointment to view its invoice.")
+
+    def _row_values(self, appt):
+        total_cost_display = f"PHP {appt['total_cost']:.2f}" if appt['total_cost'] is not None else 'N/A'
+        time_display = datetime.strptime(appt['time'], "%H:%M").strftime("%I:%M %p")
+        return (appt['appointment_id'], appt['date'], time_display, appt['plate_no'], appt['status'], total_cost_display)
         
     def _show_invoice_details(self, event):
-        selected_item = self.tree.focus()
-        if not selected_item:
+        appt = self.table.focused_row()
+        if not appt or appt['appointment_id'] == self.shown_invoice: # Scrolling re-selects the same row
             return
             
-        appt_id = self.tree.item(selected_item, 'values')[0]
-        invoice_data = database.get_billing_invoice(appt_id)
-        
+        appt_id = self.shown_invoice = appt['appointment_id']
+        loader.submit(self, lambda: database.get_billing_invoice(appt_id), self._render_invoice, key='invoice')
+
+    def _render_invoice(self, invoice_data):
         if not invoice_data:
             self.details_label.config(text="Error: Could not retrieve invoice details.")
             return
@@ -868,42 +1385,16 @@ class ProfileFrame(tk.Frame):
                 entry.insert(0, user.get(key, ''))
             
     def _save_profile(self):
-        user_id = self.controller.get_current_user_id()
-        if not user_id: return
-
-    def _save_profile(self):
-        user = self.controller.current_user
-        
-        new_username = self.entries['username'].get()
-        new_full_name = self.entries['full_name'].get()
-        new_phone_no = self.entries['phone_no'].get()
         new_password = self.entries['password'].get() 
-        
-        # Basic validation
-        if not all([new_username, new_full_name, new_phone_no]):
-            messagebox.showerror("Error", "Username, Full Name, and Phone No. cannot be empty.")
-            return
-
-        result = database.update_user_profile(
-            user['user_id'],
-            new_username,
-            new_full_name,
-            new_phone_no,
-            new_password if new_password else None 
+        saved = self.controller.save_user_profile(
+            self.entries['username'].get(),
+            self.entries['full_name'].get(),
+            self.entries['phone_no'].get(),
+            new_password if new_password else None
         )
-
-        if result.startswith("Success"):
-            messagebox.showinfo("Success", result)
-            
-            updated_user = database.get_user_by_username(new_username) 
-            if updated_user:
-                self.controller.current_user = updated_user 
-                
+        if saved:
             self.load_data() 
-
             self.entries['password'].delete(0, tk.END) 
-        else:
-            messagebox.showerror("Update Failed", result)
 #Message Panel Frame
 class MessageFrame(tk.Frame):
     def __init__(self, parent, controller):
@@ -911,6 +1402,14 @@ class MessageFrame(tk.Frame):
         self.controller = controller
         self.partner_id = None # Set to Admin ID 1 for User, or a specific User ID for Admin
         self.is_admin = False
+
+        # Incremental chat state: bubbles stay on screen and only newer/older messages are fetched
+        self.chat_key = None        # (user_id, partner_id) currently shown
+        self.oldest_message_id = None
+        self.newest_message_id = 0
+        self.first_bubble = None    # Older pages are packed above this widget
+        self.older_button = None
+        self.placeholder_label = None
         
         self.header_label = tk.Label(self, text="Message", font=FONT_TITLE, bg=COLOR_BACKGROUND, fg=COLOR_PRIMARY)
         self.header_label.pack(pady=(0, 10), anchor='w')
@@ -918,6 +1417,7 @@ class MessageFrame(tk.Frame):
         # Chat display area (Scrollable)
         message_canvas_frame = tk.Frame(self, bg='white', bd=1, relief=tk.SUNKEN)
         message_canvas_frame.pack(fill='both', expand=True, pady=(0, 10))
+        self.message_canvas_frame = message_canvas_frame
         
         self.canvas = tk.Canvas(message_canvas_frame, bg='white', highlightthickness=0)
         self.scrollbar = ttk.Scrollbar(message_canvas_frame, orient="vertical", command=self.canvas.yview)
@@ -956,42 +1456,137 @@ class MessageFrame(tk.Frame):
         else:
             self.header_label.config(text="Chat with Admin")
 
-    def load_data(self):
-        # Clear previous messages
+    def reset_chat(self): #Clears the view; the next load_data() opens the conversation from scratch.
         for widget in self.scrollable_frame.winfo_children():
             widget.destroy()
+        self.chat_key = None
+        self.oldest_message_id = None
+        self.newest_message_id = 0
+        self.first_bubble = None
+        self.older_button = None
+        self.placeholder_label = None
 
+    def load_data(self):
         user_id = self.controller.get_current_user_id()
         if not user_id or not self.partner_id:
+            self.reset_chat()
             tk.Label(self.scrollable_frame, text="Select a user to start chat, or refresh.", bg='white').pack(padx=10, pady=10)
             return
 
         # Partner is Admin (ID 1) for a regular user
         partner_id = 1 if not self.is_admin else self.partner_id
-        
-        messages = database.get_messages(user_id, partner_id)
-        
+
+        if self.chat_key != (user_id, partner_id):
+            self._open_chat(user_id, partner_id)
+        else:
+            self._append_new_messages(user_id, partner_id)
+
+    # Chat queries and the read receipt run on the loader. 'chat' opens a conversation, 'new' fetches what
+    # arrived since newest_message_id and 'older' the page above the first bubble; a render whose chat_key no
+    # longer matches (another conversation opened meanwhile) is dropped.
+
+    def _open_chat(self, user_id, partner_id): #Shows the latest page of a conversation.
+        loader.submit(self, lambda: database.get_messages_before(user_id, partner_id, None, MESSAGE_PAGE_SIZE),
+                      lambda messages: self._render_chat(user_id, partner_id, messages), key='chat')
+
+    def _render_chat(self, user_id, partner_id, messages):
+        self.reset_chat()
+        self.chat_key = (user_id, partner_id)
+
+        if len(messages) == MESSAGE_PAGE_SIZE:
+            self.older_button = tk.Button(self.scrollable_frame, text="Load older messages", command=self._load_older_messages,
+                                          bg='white', fg=COLOR_PRIMARY, font=("Arial", 8), relief=tk.FLAT)
+            self.older_button.pack(pady=2)
+
         if not messages:
-            tk.Label(self.scrollable_frame, text="No messages yet. Send a message to start the chat!", bg='white').pack(padx=10, pady=10)
+            self.placeholder_label = tk.Label(self.scrollable_frame, text="No messages yet. Send a message to start the chat!", bg='white')
+            self.placeholder_label.pack(padx=10, pady=10)
+
+        bubbles = [self._add_bubble(msg, user_id) for msg in messages]
+        if messages:
+            self.first_bubble = bubbles[0]
+            self.oldest_message_id = messages[0]['message_id']
+            self.newest_message_id = messages[-1]['message_id']
+        self._scroll_to_bottom()
+        self._send_read_receipt()
+
+    def _append_new_messages(self, user_id, partner_id): #Adds only the messages sent since the last load.
+        after_id = self.newest_message_id
+        def fetch():
+            new_messages, since_id = [], after_id
+            while True:
+                page = database.get_messages_since(user_id, partner_id, since_id, MESSAGE_PAGE_SIZE)
+                new_messages += page
+                if len(page) < MESSAGE_PAGE_SIZE:
+                    return new_messages
+                since_id = page[-1]['message_id']
+        loader.submit(self, fetch, lambda messages: self._render_new_messages(user_id, partner_id, messages), key='new')
+
+    def _render_new_messages(self, user_id, partner_id, messages):
+        if self.chat_key != (user_id, partner_id):
+            return
+        new_messages = [msg for msg in messages if msg['message_id'] > self.newest_message_id]
+        if new_messages:
+            if self.placeholder_label is not None:
+                self.placeholder_label.destroy()
+                self.placeholder_label = None
+            bubbles = [self._add_bubble(msg, user_id) for msg in new_messages]
+            if self.first_bubble is None:
+                self.first_bubble = bubbles[0]
+                self.oldest_message_id = new_messages[0]['message_id']
+            self.newest_message_id = new_messages[-1]['message_id']
+            self._scroll_to_bottom()
+        self._send_read_receipt()
+
+    def _load_older_messages(self): #Inserts the previous page above the oldest bubble shown.
+        if not self.chat_key or self.oldest_message_id is None:
+            return
+        chat_key, before_id = self.chat_key, self.oldest_message_id
+        user_id, partner_id = chat_key
+        loader.submit(self, lambda: database.get_messages_before(user_id, partner_id, before_id, MESSAGE_PAGE_SIZE),
+                      lambda messages: self._render_older_messages(chat_key, before_id, messages), key='older')
 
-        for msg in messages:
-            is_sender = msg['sender_id'] == user_id
-            
-            # Message layout
-            msg_frame = tk.Frame(self.scrollable_frame, bg='white')
-            msg_frame.pack(fill='x', pady=2, padx=5, anchor='w' if not is_sender else 'e')
-            
-            # Sender/Time info
-            sender_name = "You" if is_sender else msg['sender_username']
-            info_label = tk.Label(msg_frame, text=f"{sender_name} - {msg['timestamp']}", font=("Arial", 8), fg='gray', bg='white')
-            info_label.pack(anchor='w' if not is_sender else 'e')
-            
-            # Content bubble
-            bubble_color = "#E0F7FA" if not is_sender else "#C8E6C9"
-            content_label = tk.Label(msg_frame, text=msg['content'], font=FONT_BODY, bg=bubble_color, 
-                                     wraplength=500, justify='left', bd=1, relief=tk.SOLID, padx=8, pady=4)
-            content_label.pack(anchor='w' if not is_sender else 'e')
+    def _render_older_messages(self, chat_key, before_id, messages):
+        if self.chat_key != chat_key or self.oldest_message_id != before_id:
+            return
+        anchor = self.first_bubble
+        bubbles = [self._add_bubble(msg, chat_key[0], before=anchor) for msg in messages]
+        if messages:
+            self.first_bubble = bubbles[0]
+            self.oldest_message_id = messages[0]['message_id']
+        if len(messages) < MESSAGE_PAGE_SIZE and self.older_button is not None:
+            self.older_button.destroy() # Reached the start of the conversation
+            self.older_button = None
+
+    def _send_read_receipt(self): #Everything the partner sent up to the newest bubble is now on screen
+        user_id, partner_id = self.chat_key
+        up_to_id = self.newest_message_id
+        loader.submit(self, lambda: database.mark_conversation_read(user_id, partner_id, up_to_id), self._on_read, key='read')
+
+    def _on_read(self, marked): #Hook for subclasses; marked = messages the receipt changed
+        pass
+
+    def _add_bubble(self, msg, user_id, before=None): #Renders one message; before=widget inserts it above that bubble.
+        is_sender = msg['sender_id'] == user_id
+        
+        # Message layout
+        msg_frame = tk.Frame(self.scrollable_frame, bg='white')
+        pack_options = {'before': before} if before is not None else {}
+        msg_frame.pack(fill='x', pady=2, padx=5, anchor='w' if not is_sender else 'e', **pack_options)
+        
+        # Sender/Time info
+        sender_name = "You" if is_sender else msg['sender_username']
+        info_label = tk.Label(msg_frame, text=f"{sender_name} - {format_timestamp(msg['sent_at_ms'])}", font=("Arial", 8), fg='gray', bg='white')
+        info_label.pack(anchor='w' if not is_sender else 'e')
+        
+        # Content bubble
+        bubble_color = "#E0F7FA" if not is_sender else "#C8E6C9"
+        content_label = tk.Label(msg_frame, text=msg['content'], font=FONT_BODY, bg=bubble_color, 
+                                 wraplength=500, justify='left', bd=1, relief=tk.SOLID, padx=8, pady=4)
+        content_label.pack(anchor='w' if not is_sender else 'e')
+        return msg_frame
 
+    def _scroll_to_bottom(self):
         self.scrollable_frame.update_idletasks()
         self.canvas.yview_moveto(1.0) # Scroll to bottom
 
@@ -1000,25 +1595,10 @@ class MessageFrame(tk.Frame):
         if not content:
             return
 
-        sender_id = self.controller.get_current_user_id()
-        
-        # User (non-admin) always sends to Admin (ID 1)
-        if not self.is_admin:
-            receiver_id = 1
-        # Admin sends to the currently selected user (self.partner_id)
-        else:
-            receiver_id = self.partner_id
-            if not receiver_id:
-                messagebox.showerror("Chat Error", "Admin must select a user to chat with.")
-                return
-
-        success, message = database.send_message(sender_id, receiver_id, content)
-
-        if success:
+        # Customers always send to the Admin; the Admin sends to the selected customer (self.partner_id)
+        if self.controller.send_chat_message(content, self.partner_id if self.is_admin else None):
             self.message_entry.delete(0, tk.END)
             self.load_data() # Reload chat
-        else:
-            messagebox.showerror("Send Failed", message)
 
 # ADMIN DASHBOARD 
 
@@ -1036,6 +1616,15 @@ class AdminDashboardFrame(tk.Frame):
 
         tk.Label(nav_frame, text="ADMIN\n DASHBOARD", bg=COLOR_PRIMARY, fg="white", font=FONT_HEADING).pack(pady=20)
 
+        # Global search: customers, plates, messages and deletion history
+        self.search_var = tk.StringVar()
+        search_entry = ttk.Entry(nav_frame, textvariable=self.search_var, width=22)
+        search_entry.pack(padx=10)
+        search_entry.bind("<Return>", lambda event: self.run_search())
+        tk.Button(nav_frame, text="Search", command=self.run_search,
+                  bg="#5E633C", fg="white", font=FONT_BODY,
+                  width=18, relief=tk.FLAT).pack(pady=(5, 15), padx=10)
+
         nav_buttons = [
             ("Admin Home", lambda: self.show_content_frame("AdminHome")),
             ("Manage Users", lambda: self.show_content_frame("ManageUsers")),
@@ -1043,6 +1632,7 @@ class AdminDashboardFrame(tk.Frame):
             ("View All Vehicles", lambda: self.show_content_frame("ManageVehicles")),
             ("Appointments", lambda: self.show_content_frame("ManageAppointments")),
             ("Reports", lambda: self.show_content_frame("Reports")),
+            ("Diagnostics", lambda: self.show_content_frame("Diagnostics")),
         ]
         
         for text, command in nav_buttons:
@@ -1074,7 +1664,8 @@ class AdminDashboardFrame(tk.Frame):
             ("AdminHome", AdminHomePanel), ("ManageUsers", ManageUsersFrame), 
             ("ManageOffers", ManageOffersFrame), ("ManageVehicles", ManageVehiclesFrame),
             ("ManageAppointments", ManageAppointmentsFrame), ("Reports", ReportsFrame), 
-            ("Message", AdminMessageFrame) 
+            ("Message", AdminMessageFrame), ("Search", SearchResultsFrame),
+            ("Diagnostics", DiagnosticsFrame)
         ]:
             frame = FrameClass(self.content_container, self.controller)
             self.content_frames[name] = frame
@@ -1088,11 +1679,106 @@ class AdminDashboardFrame(tk.Frame):
         self.show_content_frame("AdminHome")
 
     def show_content_frame(self, name):
+        previous = getattr(self, 'current_content_frame', None)
+        if previous is not None and previous is not self.content_frames[name]:
+            loader.cancel(previous) # Quick panel switches: the hidden panel's queries are dropped
         self.current_content_frame = self.content_frames[name]
         if hasattr(self.current_content_frame, 'load_data'):
             self.current_content_frame.load_data()
         self.current_content_frame.tkraise()
 
+    def run_search(self):
+        self.content_frames["Search"].set_query(self.search_var.get())
+        self.show_content_frame("Search")
+
+
+class SearchResultsFrame(tk.Frame): #Results of the admin's global search; double-click opens the matching screen
+    KIND_LABELS = {'user': 'Customer', 'vehicle': 'Vehicle', 'message': 'Message', 'history': 'History'}
+
+    def __init__(self, parent, controller):
+        super().__init__(parent, bg=COLOR_BACKGROUND)
+        self.controller = controller
+        self.query = ""
+        self.results = {}
+        tk.Label(self, text="Search", font=FONT_TITLE, bg=COLOR_BACKGROUND, fg=COLOR_PRIMARY).pack(pady=(0, 20), anchor='w')
+
+        filter_frame = tk.Frame(self, bg=COLOR_BACKGROUND)
+        filter_frame.pack(fill='x', pady=5)
+        tk.Label(filter_frame, text="Show:", bg=COLOR_BACKGROUND).pack(side='left', padx=(0, 5))
+        self.kind_var = tk.StringVar(value='All')
+        kind_combo = ttk.Combobox(filter_frame, textvariable=self.kind_var, state="readonly", width=15,
+                                  values=['All'] + list(self.KIND_LABELS.values()))
+        kind_combo.pack(side='left')
+        kind_combo.bind("<<ComboboxSelected>>", lambda event: self.load_data())
+        self.status_label = tk.Label(filter_frame, text="", bg=COLOR_BACKGROUND, font=FONT_BODY)
+        self.status_label.pack(side='left', padx=15)
+
+        columns = ('Type', 'Match', 'Details', 'Customer')
+        self.tree = ttk.Treeview(self, columns=columns, show='headings')
+        for col, width in zip(columns, (80, 220, 420, 180)):
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=width, anchor='center' if col == 'Type' else 'w')
+        self.tree.pack(fill='both', expand=True, pady=10)
+        self.tree.bind("<Double-1>", self._open_result)
+
+    def set_query(self, query):
+        self.query = query.strip()
+
+    def load_data(self):
+        for item in self.tree.get_children():
+            self.tree.delete(item)
+        self.results = {}
+        if not self.query:
+            self.status_label.config(text="Type a name, plate, phone number or message text to search.")
+            return
+
+        kind_label = self.kind_var.get()
+        kinds = [k for k, label in self.KIND_LABELS.items() if label == kind_label]
+        query = self.query
+        self.status_label.config(text=f"Searching for '{query}'...")
+
+        def fetch():
+            t0 = time.perf_counter()
+            results = database.search(query, kinds, limit=100)
+            return results, (time.perf_counter() - t0) * 1000
+        loader.submit(self, fetch, lambda result: self._render(query, *result),
+                      on_error=lambda e: self.status_label.config(text=str(e)))
+
+    def _render(self, query, results, elapsed_ms):
+        for n, result in enumerate(results):
+            iid = str(n)
+            self.results[iid] = result
+            self.tree.insert('', tk.END, iid=iid, values=(
+                self.KIND_LABELS[result['kind']], result['title'], result['snippet'], result['owner_name'] or ''
+            ))
+        self.status_label.config(text=f"{len(results)} result(s) for '{query}' in {elapsed_ms:.0f} ms")
+
+    def _select_row(self, frame_name, ref_id): #Shows an admin screen and highlights the row whose ID column is ref_id
+        dashboard = self.controller.frames["AdminDashboard"]
+        frame = dashboard.content_frames[frame_name]
+        frame.lookup_var.set("") # show the full list so the row is there
+        dashboard.show_content_frame(frame_name)
+        frame.table.reveal(ref_id)
+
+    def _open_result(self, event):
+        selected = self.tree.focus()
+        if selected not in self.results:
+            return
+        result = self.results[selected]
+        if result['kind'] == 'user':
+            self._select_row("ManageUsers", result['ref_id'])
+        elif result['kind'] == 'vehicle':
+            self._select_row("ManageVehicles", result['ref_id'])
+        elif result['kind'] == 'message':
+            dashboard = self.controller.frames["AdminDashboard"]
+            message_frame = dashboard.content_frames["Message"]
+            if not message_frame.customer_combo['values']:
+                message_frame._load_customer_options()
+            message_frame.set_partner_id(result['owner_id'], result['owner_name'])
+            dashboard.show_content_frame("Message")
+        else:
+            messagebox.showinfo("Deletion History", f"Type: {result['title']}\n\nDetails: {result['body']}")
+
 
 class AdminHomePanel(tk.Frame):
     def __init__(self, parent, controller):
@@ -1122,9 +1808,14 @@ class AdminHomePanel(tk.Frame):
         return frame
 
     def load_data(self):
-        self.tiles["Total Customers"].label1.config(text=str(database.get_total_active_customers()), fg=COLOR_SUCCESS)
-        self.tiles["Pending Appointments"].label1.config(text=str(database.get_pending_appointments_count()), fg=COLOR_PENDING)
-        self.tiles["Total Revenue"].label1.config(text=f"PHP {database.get_total_service_revenue():,.2f}", fg=COLOR_PRIMARY)
+        loader.submit(self, lambda: (database.get_total_active_customers(), database.get_pending_appointments_count(),
+                                     database.get_total_service_revenue()), self._render)
+
+    def _render(self, counts):
+        customers, pending, revenue = counts
+        self.tiles["Total Customers"].label1.config(text=str(customers), fg=COLOR_SUCCESS)
+        self.tiles["Pending Appointments"].label1.config(text=str(pending), fg=COLOR_PENDING)
+        self.tiles["Total Revenue"].label1.config(text=f"PHP {revenue:,.2f}", fg=COLOR_PRIMARY)
 
 
 class ManageUsersFrame(tk.Frame):
@@ -1133,9 +1824,22 @@ class ManageUsersFrame(tk.Frame):
         self.controller = controller
         tk.Label(self, text="Manage Users", font=FONT_TITLE, bg=COLOR_BACKGROUND, fg=COLOR_PRIMARY).pack(pady=(0, 20), anchor='w')
 
-        # Treeview Setup
+        # Type-ahead phone lookup for walk-in customers (start or end of the number, any format)
+        lookup_frame = tk.Frame(self, bg=COLOR_BACKGROUND)
+        lookup_frame.pack(fill='x')
+        tk.Label(lookup_frame, text="Find by phone:", bg=COLOR_BACKGROUND).pack(side='left', padx=(0, 5))
+        self.lookup_var = tk.StringVar()
+        lookup_entry = ttk.Entry(lookup_frame, textvariable=self.lookup_var, width=25)
+        lookup_entry.pack(side='left')
+        lookup_entry.bind("<KeyRelease>", lambda event: schedule_lookup(self))
+        tk.Label(lookup_frame, text="e.g. 0917, +63 917 or the last 4 digits", bg=COLOR_BACKGROUND, fg="#4C4C4C").pack(side='left', padx=10)
+
+        # Table Setup (only the visible rows are in the Treeview)
         columns = ('ID', 'Username', 'Name', 'Phone', 'Type', 'Last Login')
-        self.tree = ttk.Treeview(self, columns=columns, show='headings')
+        self.table = VirtualTable(self, columns, self._row_values, key=lambda user: user['user_id'],
+                                  fields={'ID': 'user_id', 'Username': 'username', 'Name': 'full_name', 'Phone': 'phone_no',
+                                          'Type': 'user_type', 'Last Login': 'last_login'})
+        self.tree = self.table.tree
         self.tree.heading('ID', text='ID')
         self.tree.heading('Username', text='Username')
         self.tree.heading('Name', text='Full Name')
@@ -1149,9 +1853,10 @@ class ManageUsersFrame(tk.Frame):
         self.tree.column('Phone', width=100)
         self.tree.column('Type', width=80, anchor='center')
         self.tree.column('Last Login', width=150)
-        self.tree.pack(fill='both', expand=True, pady=10)
+        self.table.set_source(lambda **page: database.get_users_page(**page), {'ID': 'id', 'Username': 'username', 'Name': 'name'}, 'ID')
+        self.table.pack(fill='both', expand=True, pady=10)
         
-        self.tree.bind('<<TreeviewSelect>>', self._on_select)
+        self.tree.bind('<<TreeviewSelect>>', self._on_select, add='+')
         
         # Action Buttons
         btn_frame = tk.Frame(self, bg=COLOR_BACKGROUND)
@@ -1161,14 +1866,13 @@ class ManageUsersFrame(tk.Frame):
         pass
 
     def _chat_with_selected(self):
-        selected_item = self.tree.focus()
-        if not selected_item:
+        user = self.table.focused_row()
+        if not user:
             messagebox.showerror("Selection Error", "Please select a user to chat with.")
             return
 
-        values = self.tree.item(selected_item, 'values')
-        user_id = values[0]
-        username = values[1]
+        user_id = user['user_id']
+        username = user['username']
         
         if user_id == self.controller.get_current_user_id():
             messagebox.showinfo("Chat Info", "You are chatting with yourself (Admin).")
@@ -1182,19 +1886,16 @@ class ManageUsersFrame(tk.Frame):
 
 
     def load_data(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        users = database.get_all_users()
-        for user in users:
-            user_type_text = "Admin" if user['user_type'] == 1 else "Customer"
-            last_login_text = user['last_login'] if user['last_login'] else 'N/A'
-            
-            tags = (user['user_id'],)
+        phone = self.lookup_var.get().strip()
+        if phone:
+            loader.submit(self.table, lambda: database.find_user_by_phone(phone, limit=LOOKUP_LIMIT), self.table.set_rows)
+        else:
+            self.table.refresh()
 
-            self.tree.insert('', tk.END, values=(
-                user['user_id'], user['username'], user['full_name'], user['phone_no'], user_type_text, last_login_text
-            ), tags=tags)
+    def _row_values(self, user):
+        user_type_text = "Admin" if user['user_type'] == 1 else "Customer"
+        last_login_text = user['last_login'] if user['last_login'] else 'N/A'
+        return (user['user_id'], user['username'], user['full_name'], user['phone_no'], user_type_text, last_login_text)
 
 
 class ManageOffersFrame(tk.Frame):
@@ -1229,10 +1930,13 @@ class ManageOffersFrame(tk.Frame):
         self.tree.pack(fill='both', expand=True, pady=10)
 
     def load_data(self):
+        loader.submit(self, database.get_all_service_offers, self._render)
+
+    def _render(self, offers):
         for item in self.tree.get_children():
             self.tree.delete(item)
             
-        self.offers = database.get_all_service_offers()
+        self.offers = offers
         for offer in self.offers:
             self.tree.insert('', tk.END, values=(
                 offer['service_id'], offer['service_name'], f"{offer['labor_rate']:.2f}"
@@ -1276,28 +1980,11 @@ class ManageOffersFrame(tk.Frame):
         def save_offer():
             name = name_entry.get().strip()
             rate_str = rate_entry.get().strip()
-            
-            try:
-                rate = float(rate_str)
-            except ValueError:
-                messagebox.showerror("Input Error", "Labor Rate must be a valid number.")
-                return
-                
-            if not name or rate <= 0:
-                messagebox.showerror("Input Error", "Service Name is required and Rate must be positive.")
-                return
-            
-            if is_edit:
-                success, message = database.update_service_offer(offer_data['service_id'], name, rate)
-            else:
-                success, message = database.add_service_offer(name, rate)
+            service_id = offer_data['service_id'] if is_edit else None
 
-            if success:
-                messagebox.showinfo("Success", message)
+            if self.controller.save_service_offer(service_id, name, rate_str):
                 self.load_data()
                 dialog.destroy()
-            else:
-                messagebox.showerror("Error", message)
 
         tk.Button(dialog, text="Save", command=save_offer, bg=COLOR_PRIMARY, fg="white").grid(row=2, column=1, pady=10, sticky='e', padx=5)
 
@@ -1314,14 +2001,8 @@ class ManageOffersFrame(tk.Frame):
         if not messagebox.askyesno("Confirm Deletion", f"Are you sure you want to permanently delete the service '{offer_data['service_name']}'?"):
             return
 
-        deleter_id = self.controller.get_current_user_id()
-        success, message = database.delete_service_offer(deleter_id, offer_data['service_id'])
-        
-        if success:
-            messagebox.showinfo("Success", message)
+        if self.controller.delete_service_offer(offer_data['service_id']):
             self.load_data()
-        else:
-            messagebox.showerror("Failed", message)
 
 
 class ManageVehiclesFrame(tk.Frame):
@@ -1336,8 +2017,17 @@ class ManageVehiclesFrame(tk.Frame):
         tk.Button(btn_frame, text="Delete Selected Vehicle", command=self._delete_vehicle_command,
                   bg=COLOR_ERROR, fg="white", font=FONT_BODY).pack(side='left', padx=5) 
 
+        # Type-ahead plate lookup: matches the start or the end of the plate, ignoring spaces and dashes
+        tk.Label(btn_frame, text="Find plate:", bg=COLOR_BACKGROUND).pack(side='left', padx=(20, 5))
+        self.lookup_var = tk.StringVar()
+        lookup_entry = ttk.Entry(btn_frame, textvariable=self.lookup_var, width=15)
+        lookup_entry.pack(side='left')
+        lookup_entry.bind("<KeyRelease>", lambda event: schedule_lookup(self))
+
         columns = ('ID', 'User ID', 'Brand', 'Model', 'PlateNo')
-        self.tree = ttk.Treeview(self, columns=columns, show='headings')
+        self.table = VirtualTable(self, columns, self._row_values, key=lambda vehicle: vehicle['vehicle_id'],
+                                  fields={'ID': 'vehicle_id', 'User ID': 'user_id', 'Brand': 'brand', 'Model': 'model', 'PlateNo': 'plate_no'})
+        self.tree = self.table.tree
         self.tree.heading('ID', text='ID')
         self.tree.heading('User ID', text='User ID')
         self.tree.heading('Brand', text='Brand')
@@ -1350,26 +2040,34 @@ class ManageVehiclesFrame(tk.Frame):
         self.tree.column('Model', width=150)
         self.tree.column('PlateNo', width=100, anchor='center')
         
-        self.tree.pack(fill='both', expand=True, pady=10)
+        # Paged list sorts: customer (the old full-list order), plate or ID
+        self.table.set_source(lambda **page: database.get_vehicles_page(**page), {'ID': 'id', 'User ID': 'customer', 'PlateNo': 'plate'}, 'User ID')
+        self.table.pack(fill='both', expand=True, pady=10)
 
     def load_data(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-            
-        vehicles = database.get_all_vehicles()
-        for vehicle in vehicles:
-            self.tree.insert('', tk.END, values=(
-                vehicle['vehicle_id'], vehicle['user_id'], vehicle['brand'], vehicle['model'], vehicle['plate_no']
-            ), tags=(vehicle['vehicle_id'], vehicle['plate_no']))
+        plate = self.lookup_var.get().strip()
+        if not plate:
+            self.table.refresh()
+            return
+
+        def fetch():
+            vehicles = {}
+            for vehicle in database.find_vehicle_by_plate_prefix(plate, LOOKUP_LIMIT) + database.find_vehicle_by_plate_suffix(plate, LOOKUP_LIMIT):
+                vehicles.setdefault(vehicle['vehicle_id'], vehicle)
+            return list(vehicles.values())
+        loader.submit(self.table, fetch, self.table.set_rows)
+
+    def _row_values(self, vehicle):
+        return (vehicle['vehicle_id'], vehicle['user_id'], vehicle['brand'], vehicle['model'], vehicle['plate_no'])
 
     def _delete_vehicle_command(self):
-        selected_item = self.tree.focus()
-        if not selected_item:
+        vehicle = self.table.focused_row()
+        if not vehicle:
             messagebox.showerror("Selection Error", "Please select a vehicle to delete.")
             return
 
-        vehicle_id = self.tree.item(selected_item, 'values')[0]
-        plate_no = self.tree.item(selected_item, 'values')[4]
+        vehicle_id = vehicle['vehicle_id']
+        plate_no = vehicle['plate_no']
         
         self.controller.delete_vehicle_by_admin(vehicle_id, plate_no)
 
@@ -1396,9 +2094,11 @@ class ManageAppointmentsFrame(tk.Frame):
         tk.Button(btn_frame, text="Delete Selected (Rejected/Completed Only)", command=self._delete_appointment_command, 
                   bg=COLOR_ERROR, fg="white", font=FONT_BODY).pack(side='right', padx=5) 
 
-        # Treeview Setup
+        # Table Setup (only the visible rows are in the Treeview)
         columns = ('ID', 'Name', 'PlateNo', 'Date', 'Time', 'Service', 'Cost', 'Status')
-        self.tree = ttk.Treeview(self, columns=columns, show='headings')
+        self.table = VirtualTable(self, columns, self._row_values, key=lambda appt: appt['appointment_id'],
+                                  tags=lambda appt: (appt['status'],)) # Status tag gives the row its color
+        self.tree = self.table.tree
         self.tree.heading('ID', text='ID')
         self.tree.heading('Name', text='Customer Name')
         self.tree.heading('PlateNo', text='Plate No.')
@@ -1423,55 +2123,51 @@ class ManageAppointmentsFrame(tk.Frame):
         self.tree.tag_configure('Completed', background='#00BFFF')
         self.tree.tag_configure('Canceled', background='#ADD8E6') 
 
-        self.tree.pack(fill='both', expand=True, pady=10)
+        # Paged list (deleted appointments excluded), newest date first like the old full list
+        self.table.set_source(lambda **page: database.get_appointments_page(**page), {'ID': 'id', 'Date': 'date'}, 'Date', descending=True)
+        self.table.pack(fill='both', expand=True, pady=10)
 
     def load_data(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-            
-        appointments = database.get_all_appointments()
-        for appt in appointments:
-            if appt['is_deleted'] == 0: 
-                status = appt['status']
-                
-                services_display = appt['services_names'].replace(' | ', ', ') if appt['services_names'] else 'N/A'
-                total_cost_display = f"PHP {appt['total_cost']:.2f}" if appt['total_cost'] is not None else 'N/A'
-                time_display = datetime.strptime(appt['time'], "%H:%M").strftime("%I:%M %p") 
-                
-                self.tree.insert('', tk.END, values=(
-                    appt['appointment_id'], appt['full_name'], appt['plate_no'], appt['date'], appt['time'], 
-                    services_display, total_cost_display, status
-                ), tags=(appt['appointment_id'], status))
-                
-                # Apply color tag
-                self.tree.item(self.tree.get_children()[-1], tags=(appt['appointment_id'], status, status))
+        self.table.refresh()
+
+    def _row_values(self, appt):
+        services_display = appt['services_names'].replace(' | ', ', ') if appt['services_names'] else 'N/A'
+        total_cost_display = f"PHP {appt['total_cost']:.2f}" if appt['total_cost'] is not None else 'N/A'
+        return (appt['appointment_id'], appt['full_name'], appt['plate_no'], appt['date'], appt['time'],
+                services_display, total_cost_display, appt['status'])
 
     def _update_status(self, new_status):
-        selected_item = self.tree.focus()
-        if not selected_item:
+        appt = self.table.focused_row()
+        if not appt:
             messagebox.showerror("Selection Error", "Please select an appointment to update.")
             return
 
-        values = self.tree.item(selected_item, 'values')
-        appt_id = values[0]
-        customer_name = values[1]
+        appt_id = appt['appointment_id']
+        customer_name = appt['full_name']
         
-        if new_status == 'Approved' and values[7] in ('Approved', 'Completed', 'Canceled'):
-            messagebox.showwarning("Status Error", f"Appointment is already {values[7]}. Cannot re-approve.")
+        if new_status == 'Approved' and appt['status'] in ('Approved', 'Completed', 'Canceled'):
+            messagebox.showwarning("Status Error", f"Appointment is already {appt['status']}. Cannot re-approve.")
             return
             
         self.controller.update_appt_status(appt_id, new_status, customer_name)
         self.load_data()
 
     def _delete_appointment_command(self):
-        selected_item = self.tree.focus()
-        if not selected_item:
+        focused = self.table.focused_row()
+        selected_appts = self.table.selected_rows() or ([focused] if focused else [])
+        if not selected_appts:
             messagebox.showerror("Selection Error", "Please select an appointment to delete.")
             return
+
+        # Ctrl/Shift-click selects several rows; they are deleted together in one transaction
+        if len(selected_appts) > 1:
+            appointments = [(appt['appointment_id'], appt['status']) for appt in selected_appts]
+            self.controller.delete_appointments_by_admin(appointments)
+            self.load_data()
+            return
             
-        values = self.tree.item(selected_item, 'values')
-        appt_id = values[0]
-        status = values[7]
+        appt_id = selected_appts[0]['appointment_id']
+        status = selected_appts[0]['status']
         
         self.controller.delete_appointment_by_admin(appt_id, status)
         self.load_data()
@@ -1485,12 +2181,12 @@ class ReportsFrame(tk.Frame):
 
         # Report Type Selection
         self.report_type = tk.StringVar(value='Revenue') 
-        report_types = ['Revenue', 'Daily Appointments']
+        report_types = ['Revenue', 'Daily Appointments', 'Revenue by Period', 'Service Mix']
         
         tk.Label(self, text="Select Report Type:", bg=COLOR_BACKGROUND).pack(anchor='w', pady=(5, 0))
         ttk.Combobox(self, textvariable=self.report_type, values=report_types, state="readonly", width=30).pack(anchor='w', pady=5)
         
-        # Date Input for Daily Appointments
+        # Date Input for Daily Appointments (and start of the range for the period reports)
         date_frame = tk.Frame(self, bg=COLOR_BACKGROUND)
         date_frame.pack(anchor='w')
         tk.Label(date_frame, text="Date (YYYY-MM-DD):", bg=COLOR_BACKGROUND).pack(side='left', padx=(0, 5))
@@ -1498,6 +2194,15 @@ class ReportsFrame(tk.Frame):
         self.date_entry.insert(0, date.today().strftime("%Y-%m-%d"))
         self.date_entry.pack(side='left')
 
+        # Range end and grouping for Revenue by Period / Service Mix
+        tk.Label(date_frame, text="To (YYYY-MM-DD):", bg=COLOR_BACKGROUND).pack(side='left', padx=(15, 5))
+        self.date_to_entry = ttk.Entry(date_frame, width=20)
+        self.date_to_entry.insert(0, date.today().strftime("%Y-%m-%d"))
+        self.date_to_entry.pack(side='left')
+        tk.Label(date_frame, text="Group By:", bg=COLOR_BACKGROUND).pack(side='left', padx=(15, 5))
+        self.period = tk.StringVar(value='month')
+        ttk.Combobox(date_frame, textvariable=self.period, values=['day', 'week', 'month', 'year'], state="readonly", width=10).pack(side='left')
+
         tk.Button(self, text="Generate Report", command=self.load_data, 
                   bg=COLOR_PRIMARY, fg="white", font=FONT_BODY, width=20).pack(anchor='w', pady=10)
 
@@ -1514,7 +2219,22 @@ class ReportsFrame(tk.Frame):
 
     def load_data(self):
         report_type = self.report_type.get()
+        date_from = self.date_entry.get()
+        date_to = self.date_to_entry.get()
+        dates = {'Revenue': [], 'Daily Appointments': [date_from]}.get(report_type, [date_from, date_to])
+        try:
+            for value in dates:
+                datetime.strptime(value, "%Y-%m-%d")
+        except ValueError:
+            messagebox.showerror("Input Error", "Invalid date format. Use YYYY-MM-DD.")
+            return
+
         self.output_text.delete('1.0', tk.END)
+        period = self.period.get()
+        loader.submit(self, lambda: self._build_report(report_type, date_from, date_to, period),
+                      lambda report_output: self.output_text.insert(tk.END, report_output))
+
+    def _build_report(self, report_type, date_from, date_to, period): #Runs on a loader thread: database calls and text only, no widgets
         report_output = ""
         
         if report_type == 'Revenue':
@@ -1528,13 +2248,7 @@ class ReportsFrame(tk.Frame):
             report_output += f"Total Revenue (from Completed Services): PHP {total_revenue:,.2f}\n"
 
         elif report_type == 'Daily Appointments':
-            report_date = self.date_entry.get()
-            try:
-                datetime.strptime(report_date, "%Y-%m-%d")
-            except ValueError:
-                messagebox.showerror("Input Error", "Invalid date format. Use YYYY-MM-DD.")
-                return
-
+            report_date = date_from
             appointments = database.get_todays_appointments(report_date)
             
             report_output += f"DAILY APPOINTMENT REPORT FOR: {report_date}\n\n"
@@ -1550,7 +2264,134 @@ class ReportsFrame(tk.Frame):
             else:
                 report_output += "No appointments scheduled for this date."
 
-        self.output_text.insert(tk.END, report_output)
+        elif report_type in ('Revenue by Period', 'Service Mix'):
+            if report_type == 'Revenue by Period':
+                rows = database.get_revenue_report(date_from, date_to, period)
+                report_output += f"REVENUE BY {period.upper()}: {date_from} to {date_to}\n\n"
+                if rows:
+                    report_output += "{:<12} {:>8} {:>10} {:>9} {:>16}\n".format("Period", "Booked", "Completed", "Canceled", "Revenue (PHP)")
+                    report_output += "=" * 59 + "\n"
+                    for row in rows:
+                        report_output += "{:<12} {:>8} {:>10} {:>9} {:>16,.2f}\n".format(
+                            row['period'], row['booked'], row['completed'], row['canceled'], row['revenue'])
+                    report_output += "=" * 59 + "\n"
+                    report_output += "{:<12} {:>8} {:>10} {:>9} {:>16,.2f}\n".format(
+                        "Total", sum(r['booked'] for r in rows), sum(r['completed'] for r in rows),
+                        sum(r['canceled'] for r in rows), sum(r['revenue'] for r in rows))
+                else:
+                    report_output += "No appointments in this date range."
+            else:
+                rows = database.get_service_mix_report(date_from, date_to)
+                report_output += f"SERVICE MIX (COMPLETED SERVICES): {date_from} to {date_to}\n\n"
+                if rows:
+                    report_output += "{:<35} {:>10} {:>16}\n".format("Service", "Completed", "Revenue (PHP)")
+                    report_output += "=" * 63 + "\n"
+                    for row in rows:
+                        report_output += "{:<35} {:>10} {:>16,.2f}\n".format(row['service_name'], row['completed'], row['revenue'])
+                else:
+                    report_output += "No completed services in this date range."
+
+        return report_output
+
+
+class DiagnosticsFrame(tk.Frame): #Database call timings and slow-query log (database INSTRUMENTATION)
+    def __init__(self, parent, controller):
+        super().__init__(parent, bg=COLOR_BACKGROUND)
+        self.controller = controller
+        self.enabled = None # Instrumentation state as of the last load
+        tk.Label(self, text="Diagnostics", font=FONT_TITLE, bg=COLOR_BACKGROUND, fg=COLOR_PRIMARY).pack(pady=(0, 20), anchor='w')
+
+        btn_frame = tk.Frame(self, bg=COLOR_BACKGROUND)
+        btn_frame.pack(fill='x', pady=5)
+        self.toggle_button = tk.Button(btn_frame, text="", command=self._toggle, bg=COLOR_PRIMARY, fg="white", font=FONT_BODY, width=22)
+        self.toggle_button.pack(side='left', padx=5)
+        tk.Label(btn_frame, text="Slow query (ms):", bg=COLOR_BACKGROUND).pack(side='left', padx=(10, 5))
+        self.slow_ms_entry = ttk.Entry(btn_frame, width=8)
+        self.slow_ms_entry.insert(0, f"{database.SLOW_QUERY_MS:g}")
+        self.slow_ms_entry.pack(side='left')
+        tk.Button(btn_frame, text="Refresh", command=self.load_data, bg=COLOR_INFO, fg="white", font=FONT_BODY).pack(side='left', padx=5)
+        tk.Button(btn_frame, text="Reset", command=self._reset, bg="#4C4C4C", fg="white", font=FONT_BODY).pack(side='left', padx=5)
+        tk.Button(btn_frame, text="Export JSON...", command=self._export, bg=COLOR_SUCCESS, fg="white", font=FONT_BODY).pack(side='left', padx=5)
+
+        self.status_label = tk.Label(self, text="", bg=COLOR_BACKGROUND, font=FONT_BODY, justify='left')
+        self.status_label.pack(anchor='w', pady=5)
+
+        columns = ('Function', 'Calls', 'Rows', 'Total ms', 'p50 ms', 'p95 ms', 'p99 ms', 'Max ms')
+        self.tree = ttk.Treeview(self, columns=columns, show='headings', height=12)
+        for col in columns:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=220 if col == 'Function' else 80, anchor='w' if col == 'Function' else 'e')
+        self.tree.pack(fill='both', expand=True, pady=5)
+
+        tk.Label(self, text="Slow Queries (latest first)", font=FONT_HEADING, bg=COLOR_BACKGROUND).pack(anchor='w', pady=(10, 0))
+        slow_frame = tk.Frame(self, bg='white', bd=1, relief=tk.SUNKEN)
+        slow_frame.pack(fill='both', expand=True)
+        self.slow_text = tk.Text(slow_frame, wrap='none', height=10, bg='white', font=("Courier", 9))
+        self.slow_text.pack(side='left', fill='both', expand=True)
+        scrollbar = ttk.Scrollbar(slow_frame, command=self.slow_text.yview)
+        scrollbar.pack(side='right', fill='y')
+        self.slow_text.config(yscrollcommand=scrollbar.set)
+
+    def load_data(self):
+        loader.submit(self, lambda: (database.is_instrumentation_enabled(), database.get_cache_stats(),
+                                     database.get_instrumentation_stats(), database.get_slow_queries()),
+                      lambda result: self._render(*result))
+
+    def _render(self, enabled, cache, stats, slow_queries):
+        self.enabled = enabled
+        self.toggle_button.config(text="Disable Instrumentation" if enabled else "Enable Instrumentation")
+        self.status_label.config(text=(
+            f"Instrumentation: {'ON' if enabled else 'OFF'}    "
+            f"Reference cache: {cache['hits']} hits, {cache['misses']} misses, "
+            f"{cache['invalidations']} invalidations ({cache['hit_ratio']:.0%} hit ratio)"))
+
+        for item in self.tree.get_children():
+            self.tree.delete(item)
+        for row in stats:
+            self.tree.insert('', tk.END, values=(
+                row['function'], row['calls'], row['rows'], f"{row['total_ms']:.1f}",
+                f"{row['p50_ms']:.2f}", f"{row['p95_ms']:.2f}", f"{row['p99_ms']:.2f}", f"{row['max_ms']:.2f}"
+            ))
+
+        self.slow_text.delete('1.0', tk.END)
+        if not slow_queries:
+            self.slow_text.insert(tk.END, "No slow queries recorded.")
+        for entry in reversed(slow_queries):
+            self.slow_text.insert(tk.END, f"{format_timestamp(entry['at_ms'], '%Y-%m-%d %I:%M:%S %p')}  {entry['function']}  {entry['ms']:.1f} ms\n")
+            for statement in entry['statements']:
+                self.slow_text.insert(tk.END, "  " + statement['sql'].replace("\n", "\n  ") + "\n")
+                for line in statement['plan']:
+                    self.slow_text.insert(tk.END, f"      -> {line}\n")
+            self.slow_text.insert(tk.END, "-" * 60 + "\n")
+
+    def _toggle(self):
+        if self.enabled is None:
+            return # Not loaded yet
+        if self.enabled:
+            control = database.disable_instrumentation
+        else:
+            try:
+                slow_ms = float(self.slow_ms_entry.get())
+            except ValueError:
+                messagebox.showerror("Input Error", "Slow query threshold must be a number of milliseconds.")
+                return
+            control = lambda: database.enable_instrumentation(slow_ms)
+        loader.submit(self, control, lambda result: self.load_data(), key='control')
+
+    def _reset(self):
+        loader.submit(self, database.reset_instrumentation, lambda result: self.load_data(), key='control')
+
+    def _export(self):
+        path = filedialog.asksaveasfilename(title="Export Diagnostics", defaultextension=".json",
+                                            filetypes=[("JSON files", "*.json")], initialfile="mm_db_diagnostics.json")
+        if not path:
+            return
+        try:
+            database.export_instrumentation_json(path)
+        except OSError as e:
+            messagebox.showerror("Export Error", f"Could not write {path}: {e}")
+            return
+        messagebox.showinfo("Export", f"Diagnostics saved to {path}")
 
 
 class AdminMessageFrame(MessageFrame): #Admin's version of MessageFrame which needs user selection logic
@@ -1573,17 +2414,64 @@ class AdminMessageFrame(MessageFrame): #Admin's version of MessageFrame which ne
         self.header_label.pack_forget()
         self.header_label.pack(pady=(0, 10), anchor='w')
 
+        # Inbox: customers who have written, most recent first, with unread counts
+        inbox_frame = tk.Frame(self, bg=COLOR_BACKGROUND)
+        inbox_frame.pack(fill='x', pady=(0, 10), before=self.message_canvas_frame)
+        tk.Label(inbox_frame, text="Inbox", font=FONT_HEADING, bg=COLOR_BACKGROUND).pack(anchor='w')
+        columns = ('Customer', 'Last Message', 'When', 'Unread')
+        self.inbox_tree = ttk.Treeview(inbox_frame, columns=columns, show='headings', height=5)
+        for col, width in zip(columns, (180, 380, 140, 60)):
+            self.inbox_tree.heading(col, text=col)
+            self.inbox_tree.column(col, width=width, anchor='center' if col == 'Unread' else 'w')
+        self.inbox_tree.pack(fill='x')
+        self.inbox_tree.tag_configure('unread', font=("Helvetica", 10, "bold"))
+        self.inbox_tree.bind("<<TreeviewSelect>>", self._on_inbox_select)
+
     def load_data(self): # Only reload users on initial load
         if not self.customer_combo['values']:
             self._load_customer_options()
             
         if self.partner_id:
             super().load_data()
-        else:
-            for widget in self.scrollable_frame.winfo_children():
-                widget.destroy()
+        self._load_inbox()
+        if not self.partner_id:
+            self.reset_chat()
             tk.Label(self.scrollable_frame, text="Please select a customer to start a chat.", bg='white').pack(padx=10, pady=10)
 
+    def _on_read(self, marked):
+        if marked:
+            self._load_inbox() # The open chat's unread count just dropped
+
+    def _load_inbox(self):
+        admin_id = self.controller.get_current_user_id()
+        if admin_id:
+            loader.submit(self, lambda: database.get_admin_inbox(admin_id), lambda threads: self._render_inbox(admin_id, threads), key='inbox')
+        else:
+            self._render_inbox(admin_id, [])
+
+    def _render_inbox(self, admin_id, threads):
+        for item in self.inbox_tree.get_children():
+            self.inbox_tree.delete(item)
+        for thread in threads:
+            prefix = "You: " if thread['last_sender_id'] == admin_id else ""
+            self.inbox_tree.insert('', tk.END, iid=str(thread['customer_id']), values=(
+                f"{thread['full_name']} ({thread['username']})",
+                prefix + (thread['last_message_preview'] or ''),
+                format_timestamp(thread['last_activity_ms']),
+                thread['unread_count'] or ''
+            ), tags=('unread',) if thread['unread_count'] else ())
+
+    def _on_inbox_select(self, event):
+        selected = self.inbox_tree.selection()
+        if not selected:
+            return
+        customer_id = int(selected[0])
+        if customer_id == self.partner_id:
+            return
+        customer_name = self.inbox_tree.item(selected[0], 'values')[0]
+        self.set_partner_id(customer_id, customer_name)
+        self.load_data()
+
     def _load_customer_options(self):
         users = database.get_all_users()
         customer_options = []
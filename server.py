@@ -0,0 +1,383 @@
+import argparse
+import asyncio
+import inspect
+import json
+import logging
+import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import database
+import services
+
+#JSON-over-HTTP API server, so several front-desk terminals share one process on the database file.
+#POST /api/login {"username", "password"}  -> {"token", "user"}
+#POST /api/<operation> {"args": [...], "kwargs": {...}} with "Authorization: Bearer <token>" -> {"result": ...}
+#GET /health -> request counters and queue depths
+#Reads run on a small thread pool (each thread borrows a pooled connection). Every write goes through one
+#queue drained by a single writer thread, so terminals never fight over the file lock.
+#Errors come back as {"error": {"type", "title", "message"}} with a status code per services.ServiceError type.
+#Usage: python server.py [--host 127.0.0.1] [--port 8765] [--db mm_auto_repair.db] [--readers 3]
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_BODY_BYTES = 1024 * 1024
+WRITE_QUEUE_SIZE = 1000 # requests wait (instead of piling up) once this many writes are queued
+WRITE_BATCH_SIZE = 64 # writes handed to the writer thread per trip; each still runs in its own transaction
+SESSION_IDLE_SECONDS = 12 * 3600
+SESSION_SWEEP_SECONDS = 10 * 60 # how often sessions idle past SESSION_IDLE_SECONDS are dropped, used or not
+
+logger = logging.getLogger("server")
+
+ERROR_STATUS = {
+    'ValidationError': 400, 'AuthenticationError': 401, 'PermissionDenied': 403,
+    'NotFound': 404, 'Conflict': 409, 'ServiceError': 422,
+}
+
+# OPERATIONS
+#name -> (kind, scope, function). kind 'read' runs on the reader pool, 'write' on the writer queue
+#(anything that changes state, including the shared instrumentation switches).
+#scope: 'public' needs no login; 'user' gets the logged-in user as its first argument (services.py);
+#'self' takes a user ID first, which is forced to the caller's own ID for customers; 'admin' is admin only.
+OPERATIONS = {
+    # Open to everyone
+    'register': ('write', 'public', services.register),
+    'get_all_service_offers': ('read', 'public', database.get_all_service_offers),
+    'get_available_slots': ('read', 'public', database.get_available_slots),
+    # Booking, appointment, vehicle, offer and chat flows (shop rules in services.py)
+    'update_profile': ('write', 'user', services.update_profile),
+    'add_vehicle': ('write', 'user', services.add_vehicle),
+    'delete_vehicle': ('write', 'user', services.delete_vehicle),
+    'book_appointment': ('write', 'user', services.book_appointment),
+    'update_appointment_status': ('write', 'user', services.update_appointment_status),
+    'delete_appointment': ('write', 'user', services.delete_appointment),
+    'delete_appointments': ('write', 'user', services.delete_appointments),
+    'cancel_appointment': ('write', 'user', services.cancel_appointment),
+    'reschedule_appointment': ('write', 'user', services.reschedule_appointment),
+    'save_service_offer': ('write', 'user', services.save_service_offer),
+    'delete_service_offer': ('write', 'user', services.delete_service_offer),
+    'send_message': ('write', 'user', services.send_message),
+    'deleted_items_history': ('read', 'user', services.deleted_items_history),
+    # A customer's own data
+    'get_user_vehicles': ('read', 'self', database.get_user_vehicles),
+    'get_user_appointments': ('read', 'self', database.get_user_appointments),
+    'get_user_dashboard': ('read', 'self', database.get_user_dashboard),
+    'get_upcoming_appointment': ('read', 'self', database.get_upcoming_appointment),
+    'get_appointment_status_message': ('read', 'self', database.get_appointment_status_message),
+    'get_completed_appointments_count': ('read', 'self', database.get_completed_appointments_count),
+    'get_unread_count': ('read', 'self', database.get_unread_count),
+    'get_messages': ('read', 'self', database.get_messages),
+    'get_messages_since': ('read', 'self', database.get_messages_since),
+    'get_messages_before': ('read', 'self', database.get_messages_before),
+    'mark_conversation_read': ('write', 'self', database.mark_conversation_read),
+    'get_billing_invoice': ('read', 'user', services.billing_invoice),
+    # Admin screens and reports
+    'get_all_users': ('read', 'admin', database.get_all_users),
+    'get_all_vehicles': ('read', 'admin', database.get_all_vehicles),
+    'get_all_appointments': ('read', 'admin', database.get_all_appointments),
+    'get_todays_appointments': ('read', 'admin', database.get_todays_appointments),
+    'get_appointments_page': ('read', 'admin', database.get_appointments_page),
+    'get_users_page': ('read', 'admin', database.get_users_page),
+    'get_vehicles_page': ('read', 'admin', database.get_vehicles_page),
+    'get_pending_appointments_count': ('read', 'admin', database.get_pending_appointments_count),
+    'get_total_active_customers': ('read', 'admin', database.get_total_active_customers),
+    'get_total_service_revenue': ('read', 'admin', database.get_total_service_revenue),
+    'get_revenue_report': ('read', 'admin', database.get_revenue_report),
+    'get_service_mix_report': ('read', 'admin', database.get_service_mix_report),
+    'get_admin_inbox': ('read', 'admin', database.get_admin_inbox),
+    'get_messages_in_range': ('read', 'admin', database.get_messages_in_range),
+    'get_recent_messages': ('read', 'admin', database.get_recent_messages),
+    'get_deleted_items_in_range': ('read', 'admin', database.get_deleted_items_in_range),
+    'search': ('read', 'admin', database.search),
+    'find_user_by_phone': ('read', 'admin', database.find_user_by_phone),
+    'find_vehicle_by_plate_prefix': ('read', 'admin', database.find_vehicle_by_plate_prefix),
+    'find_vehicle_by_plate_suffix': ('read', 'admin', database.find_vehicle_by_plate_suffix),
+    # The server's own diagnostics (shown by the Diagnostics screen in client mode)
+    'get_cache_stats': ('read', 'admin', database.get_cache_stats),
+    'get_instrumentation_stats': ('read', 'admin', database.get_instrumentation_stats),
+    'get_slow_queries': ('read', 'admin', database.get_slow_queries),
+    'is_instrumentation_enabled': ('read', 'admin', database.is_instrumentation_enabled),
+    'enable_instrumentation': ('write', 'admin', database.enable_instrumentation),
+    'disable_instrumentation': ('write', 'admin', database.disable_instrumentation),
+    'reset_instrumentation': ('write', 'admin', database.reset_instrumentation),
+    'export_instrumentation_json': ('read', 'admin', lambda: database.export_instrumentation_json()), # never a server-side path
+}
+
+def to_json(value): #Records -> dicts (passwords never leave the server), Outcomes -> {"message", "data"}, tuples -> lists
+    if isinstance(value, database.Record):
+        return {key: to_json(item) for key, item in value.items() if key != 'password'}
+    if isinstance(value, services.Outcome):
+        return {'message': value.message, 'data': to_json(value.data)}
+    if isinstance(value, dict):
+        return {str(key): to_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json(item) for item in value]
+    return value
+
+def _encode(status, payload):
+    return status, json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+def _error(status, error_type, message, title="Error"):
+    return _encode(status, {'error': {'type': error_type, 'title': title, 'message': message}})
+
+
+class ApiServer:
+    def __init__(self, readers=database.POOL_SIZE - 1):
+        self.readers = readers
+        self.sessions = {} # token -> [user, last_seen]
+        self.stats = {'requests': 0, 'reads': 0, 'writes': 0, 'errors': 0, 'write_batches': 0, 'max_write_queue': 0}
+        self._read_pool = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="api-read")
+        self._write_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="api-write")
+        self._write_queue = None
+        self._writer_task = None
+        self._sweeper_task = None
+        self._server = None
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        # Readers and the writer each hold one pooled connection
+        database.POOL_SIZE = max(database.POOL_SIZE, self.readers + 1)
+        database.create_tables()
+        database.setup_initial_data()
+        self._write_queue = asyncio.Queue(WRITE_QUEUE_SIZE)
+        self._writer_task = asyncio.create_task(self._writer())
+        self._sweeper_task = asyncio.create_task(self._sweep_sessions())
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._writer_task:
+            self._writer_task.cancel()
+        if self._sweeper_task:
+            self._sweeper_task.cancel()
+        self._read_pool.shutdown(wait=True)
+        self._write_pool.shutdown(wait=True)
+        database.close_connections()
+
+    # SINGLE WRITER
+
+    async def _writer(self): #Drains the write queue in order; one thread, so writes never wait on each other's locks
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._write_queue.get()]
+            while len(batch) < WRITE_BATCH_SIZE and not self._write_queue.empty():
+                batch.append(self._write_queue.get_nowait())
+            self.stats['write_batches'] += 1
+            try:
+                results = await loop.run_in_executor(self._write_pool, _run_all, [job for job, _ in batch])
+            except Exception as e: # Jobs catch their own errors; this is the last guard so the writer never stops
+                logger.exception("Write batch failed")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                if not future.cancelled():
+                    future.set_result(result)
+
+    async def _write(self, job): #job never raises (see _run); returns its result once the writer has run it
+        future = asyncio.get_running_loop().create_future()
+        await self._write_queue.put((job, future))
+        self.stats['max_write_queue'] = max(self.stats['max_write_queue'], self._write_queue.qsize())
+        return await future
+
+    # SESSIONS
+
+    def _session_user(self, headers):
+        auth = headers.get('authorization', '')
+        token = auth[7:] if auth.startswith('Bearer ') else None
+        session = self.sessions.get(token)
+        if not session:
+            return token, None
+        if time.monotonic() - session[1] > SESSION_IDLE_SECONDS:
+            del self.sessions[token]
+            return token, None
+        session[1] = time.monotonic()
+        return token, session[0]
+
+    def drop_idle_sessions(self, now=None): #Forgets every session idle past SESSION_IDLE_SECONDS; returns how many
+        now = time.monotonic() if now is None else now
+        idle = [token for token, (user, last_seen) in self.sessions.items() if now - last_seen > SESSION_IDLE_SECONDS]
+        for token in idle:
+            del self.sessions[token]
+        return len(idle)
+
+    async def _sweep_sessions(self): #Tokens that are never sent again would otherwise stay in memory for good
+        while True:
+            await asyncio.sleep(SESSION_SWEEP_SECONDS)
+            self.drop_idle_sessions()
+
+    # REQUESTS
+
+    async def _handle_connection(self, reader, writer): #HTTP/1.1 with keep-alive; one request at a time per connection
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length') or 0)
+                if length > MAX_BODY_BYTES:
+                    status, body = _error(413, 'RequestTooLarge', "Request body too large.")
+                    keep_alive = False
+                else:
+                    payload = await reader.readexactly(length) if length else b''
+                    status, body = await self._dispatch(method, target.split('?', 1)[0], headers, payload)
+                    keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                writer.write(b"HTTP/1.1 %d %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\nConnection: %s\r\n\r\n"
+                             % (status, _REASONS.get(status, b'OK'), len(body), b'keep-alive' if keep_alive else b'close') + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass # client went away or sent something that is not HTTP
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method, path, headers, payload):
+        self.stats['requests'] += 1
+        try:
+            status, body = await self._route(method, path, headers, payload)
+        except Exception as e:
+            logger.exception("Request failed")
+            status, body = _error(500, 'ServerError', f"{type(e).__name__}: {e}")
+        if status >= 400:
+            self.stats['errors'] += 1
+        return status, body
+
+    async def _route(self, method, path, headers, payload):
+        if method == 'GET' and path == '/health':
+            return _encode(200, dict(self.stats, status='ok', sessions=len(self.sessions), readers=self.readers,
+                                     write_queue=self._write_queue.qsize()))
+        if method != 'POST' or not path.startswith('/api/'):
+            return _error(404, 'NotFound', f"No such endpoint: {method} {path}")
+        try:
+            request = json.loads(payload or b'{}')
+            if not isinstance(request, dict):
+                raise ValueError("expected a JSON object")
+        except ValueError as e:
+            return _error(400, 'BadRequest', f"Invalid JSON: {e}")
+
+        name = path[len('/api/'):]
+        token, user = self._session_user(headers)
+        if name == 'login':
+            return await self._login(request)
+        if name == 'logout':
+            self.sessions.pop(token, None)
+            return _encode(200, {'result': None})
+        if name not in OPERATIONS:
+            return _error(404, 'NotFound', f"Unknown operation '{name}'.")
+
+        kind, scope, func = OPERATIONS[name]
+        args, kwargs = list(request.get('args') or []), dict(request.get('kwargs') or {})
+        kwargs.pop('now', None) # the server's clock decides what is in the past
+        if scope != 'public' and not user:
+            return _error(401, 'AuthenticationError', "Not logged in or session expired.", "Login Failed")
+        if scope == 'admin' and not services.is_admin(user):
+            return _error(403, 'PermissionDenied', "Only the admin can do this.", "Action Error")
+        job = _bind(func, scope, user, args, kwargs)
+
+        if kind == 'write':
+            self.stats['writes'] += 1
+            status, body, updated_user = await self._write(partial(_run, job))
+        else:
+            self.stats['reads'] += 1
+            status, body, updated_user = await asyncio.get_running_loop().run_in_executor(self._read_pool, _run, job)
+        if updated_user is not None and token in self.sessions and updated_user['user_id'] == user['user_id']:
+            self.sessions[token][0] = updated_user # e.g. update_profile: later calls see the new username
+        return status, body
+
+    async def _login(self, request):
+        # login stamps last_login, so it goes through the writer like any other write
+        user, response = await self._write(partial(_login, str(request.get('username', '')), str(request.get('password', ''))))
+        if user is None:
+            return response
+        token = secrets.token_urlsafe(24)
+        self.sessions[token] = [user, time.monotonic()]
+        return _encode(200, {'result': {'token': token, 'user': to_json(user)}})
+
+_REASONS = {200: b'OK', 400: b'Bad Request', 401: b'Unauthorized', 403: b'Forbidden', 404: b'Not Found',
+            409: b'Conflict', 413: b'Payload Too Large', 422: b'Unprocessable Entity', 500: b'Internal Server Error'}
+
+def _bind(func, scope, user, args, kwargs): #The call to make for this scope, as a no-argument function
+    if scope == 'user':
+        return lambda: func(user, *args, **kwargs)
+    if scope == 'self' and not services.is_admin(user):
+        # customers only ever see their own rows, whatever ID they ask for
+        if args:
+            args[0] = user['user_id']
+        else:
+            kwargs[next(iter(inspect.signature(func).parameters))] = user['user_id']
+    return lambda: func(*args, **kwargs)
+
+def _run(job): #Runs one job on a worker thread -> (status, JSON body, updated user or None)
+    try:
+        result = job()
+    except services.ServiceError as e:
+        return _error(ERROR_STATUS.get(type(e).__name__, 422), type(e).__name__, str(e), e.title) + (None,)
+    except TypeError as e:
+        return _error(400, 'BadRequest', f"Bad arguments: {e}") + (None,)
+    except Exception as e:
+        logger.exception("Operation failed")
+        return _error(500, 'ServerError', f"{type(e).__name__}: {e}") + (None,)
+    try: # A result that cannot be sent is a server error too (TypeError here is not the caller's bad arguments)
+        updated_user = result.data if isinstance(result, services.Outcome) and isinstance(result.data, database.UserRecord) else None
+        return _encode(200, {'result': to_json(result)}) + (updated_user,)
+    except Exception as e:
+        logger.exception("Could not encode result")
+        return _error(500, 'ServerError', f"{type(e).__name__}: {e}") + (None,)
+
+def _login(username, password): #-> (UserRecord, None) or (None, error response)
+    try:
+        return services.login(username, password), None
+    except services.ServiceError as e:
+        return None, _error(401, type(e).__name__, str(e), e.title)
+    except Exception as e:
+        logger.exception("Login failed")
+        return None, _error(500, 'ServerError', f"{type(e).__name__}: {e}")
+
+def _run_all(jobs): #The writer thread's loop body: one job after another, each in its own transaction
+    return [job() for job in jobs]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the shop's database over HTTP/JSON to several terminals.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--db", default=database.DATABASE_NAME, help="database file")
+    parser.add_argument("--readers", type=int, default=database.POOL_SIZE - 1, help="reader threads")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+    database.DATABASE_NAME = args.db
+    server = ApiServer(args.readers)
+
+    async def run():
+        host, port = await server.start(args.host, args.port)
+        logger.info("Serving %s on http://%s:%d (%d readers, 1 writer)", args.db, host, port, args.readers)
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+import hashlib
+from collections import namedtuple
+from datetime import datetime
+import database
+
+#Shop rules without a window: login, booking validation, status changes and who may delete what.
+#Every function either returns a result or raises a ServiceError subclass whose str() is the message
+#to show the user. backend.MMAutoRepairShop turns these into message boxes and screen reloads; batch
+#jobs, benchmarks and servers can call the same functions directly.
+
+ADMIN_USER_TYPE = 1
+ADMIN_ID = 1 # the account setup_initial_data creates; customers always chat with it
+
+# Which appointments each side may act on, by the status stored in the database
+ADMIN_DELETABLE = ('Rejected', 'Completed')
+CUSTOMER_DELETABLE = ('Canceled', 'Rejected')
+RESCHEDULABLE = ('Pending', 'Rejected')
+NOT_CANCELABLE = ('Completed', 'Canceled')
+NOT_APPROVABLE = ('Approved', 'Completed', 'Canceled')
+ADMIN_STATUSES = ('Pending', 'Approved', 'Rejected', 'Completed')
+
+# ERRORS
+
+class ServiceError(Exception): # base class; title is the heading the desktop app shows with the message
+    title = "Error"
+
+class ValidationError(ServiceError): # bad input: missing fields, past dates, outside shop hours, ...
+    title = "Input Error"
+
+class AuthenticationError(ServiceError): # wrong password or nobody logged in
+    title = "Login Failed"
+
+class PermissionDenied(ServiceError): # the user may not do this (not an admin, not their appointment, wrong status)
+    title = "Action Error"
+
+class NotFound(ServiceError): # the appointment, vehicle or service no longer exists
+    title = "Not Found"
+
+class Conflict(ServiceError): # slot already booked, username or plate already taken
+    title = "Failed"
+
+# RESULTS
+
+# message is the text to show; data is whatever the action produced (the refreshed user for update_profile)
+Outcome = namedtuple('Outcome', ['message', 'data'], defaults=(None,))
+
+_ERRORS = {database.NOT_FOUND: NotFound, database.CONFLICT: Conflict, database.INVALID: ValidationError}
+
+def _error_for(result): #Failed database.Result -> the error for its .error kind; plain (False, message) tuples -> ServiceError
+    return _ERRORS.get(getattr(result, 'error', None), ServiceError)(result[1])
+
+def _outcome(result): #(success, message) from database.py -> Outcome, or raise the matching ServiceError
+    success, message = result
+    if not success:
+        raise _error_for(result)
+    return Outcome(message)
+
+# SESSION
+
+def _password_matches(stored, given): # update_profile stores SHA-256 hex; accounts made at sign-up hold the plain text
+    return stored == given or stored == hashlib.sha256(given.encode('utf-8')).hexdigest()
+
+def login(username, password): #Returns the UserRecord and records the login time.
+    user = database.get_user_by_username(username)
+    if not user or not _password_matches(user['password'], password):
+        raise AuthenticationError("Invalid username or password.")
+    database.update_last_login(user['user_id'])
+    return user
+
+def logout(user): #Nothing to release locally; client mode ends the server session here
+    pass
+
+def is_admin(user):
+    return bool(user) and user['user_type'] == ADMIN_USER_TYPE
+
+def _require_user(user):
+    if not user:
+        raise AuthenticationError("User not logged in.")
+    return user['user_id']
+
+def _require_admin(user):
+    _require_user(user)
+    if not is_admin(user):
+        raise PermissionDenied("Only the admin can do this.")
+
+def register(username, full_name, phone_no, password):
+    if not (username and full_name and phone_no and password):
+        raise ValidationError("All fields are required.")
+    return _outcome(database.register_new_user(username, full_name, phone_no, password))
+
+def update_profile(user, username, full_name, phone_no, new_password=None): #Outcome.data is the refreshed UserRecord.
+    user_id = _require_user(user)
+    if not all([username, full_name, phone_no]):
+        raise ValidationError("Username, Full Name, and Phone No. cannot be empty.")
+    outcome = _outcome(database.update_user_profile(user_id, username, full_name, phone_no, new_password or None))
+    return outcome._replace(data=database.get_user_by_username(username))
+
+# VEHICLES
+
+def add_vehicle(user, brand, model, plate_no):
+    user_id = _require_user(user)
+    brand, model, plate_no = brand.strip(), model.strip(), plate_no.strip().upper()
+    if not all([brand, model, plate_no]):
+        raise ValidationError("All fields are required.")
+    return _outcome(database.add_vehicle(user_id, brand, model, plate_no))
+
+def delete_vehicle(user, vehicle_id): #The admin can delete any vehicle; a customer only their own.
+    user_id = _require_user(user)
+    vehicle = database.get_vehicle_by_id(int(vehicle_id))
+    if not vehicle:
+        raise NotFound("Vehicle not found.")
+    if not is_admin(user) and vehicle['user_id'] != user_id:
+        raise PermissionDenied("You can only delete your own vehicles.")
+    return _outcome(database.delete_vehicle(user_id, vehicle['vehicle_id']))
+
+# APPOINTMENTS
+
+def validate_slot(date_str, time_str, now=None, action="book an appointment for"): #Date/time format, not in the past, within shop hours. Returns (date, time).
+    now = now or datetime.now()
+    try:
+        appt_date = datetime.strptime(date_str, "%Y-%m-%d").date()
+        appt_time = datetime.strptime(time_str, "%H:%M").time()
+    except (TypeError, ValueError) as e:
+        raise ValidationError(f"Invalid input: {e}") from None
+    if appt_date < now.date():
+        raise ValidationError(f"Cannot {action} a past date.")
+    if appt_date == now.date() and appt_time < now.time():
+        raise ValidationError(f"Cannot {action} a time that has already passed today.")
+    minute = appt_time.hour * 60 + appt_time.minute
+    if not (database.SHOP_OPEN_MINUTE <= minute <= database.SHOP_CLOSE_MINUTE):
+        raise ValidationError("The shop is only open from 6:00 AM to 5:00 PM.")
+    return appt_date, appt_time
+
+def _appointments(user, appointment_ids): #Stored rows for the IDs; NotFound if one is missing, PermissionDenied if a customer does not own one.
+    appointment_ids = [int(i) for i in appointment_ids]
+    rows = {appt['appointment_id']: appt for appt in database.get_appointments_by_id(appointment_ids)}
+    missing = [str(i) for i in appointment_ids if i not in rows]
+    if missing:
+        raise NotFound(f"Appointment not found: {', '.join(missing)}.")
+    if not is_admin(user):
+        others = [str(i) for i in appointment_ids if rows[i]['user_id'] != user['user_id']]
+        if others:
+            raise PermissionDenied(f"Appointment ID(s) {', '.join(others)} belong to another customer.")
+    return [rows[i] for i in dict.fromkeys(appointment_ids)]
+
+def book_appointment(user, vehicle_id, service_ids, date_str, time_str, now=None):
+    user_id = _require_user(user)
+    vehicle = database.get_vehicle_by_id(int(vehicle_id)) if vehicle_id else None
+    if not vehicle or vehicle['user_id'] != user_id:
+        raise ValidationError("Selected vehicle is not valid.")
+    validate_slot(date_str, time_str, now)
+    if not service_ids:
+        raise ValidationError("Please select at least one service.")
+    return _outcome(database.add_appointment(user_id, vehicle['vehicle_id'], list(service_ids), date_str, time_str))
+
+def update_appointment_status(user, appointment_id, new_status, full_name=None): #Admin only; full_name goes into the Completed message.
+    _require_admin(user)
+    if new_status not in ADMIN_STATUSES:
+        raise ValidationError(f"Unknown status '{new_status}'.")
+    appt, = _appointments(user, [appointment_id])
+    if new_status == 'Approved' and appt['status'] in NOT_APPROVABLE:
+        raise PermissionDenied(f"Appointment is already {appt['status']}. Cannot re-approve.")
+    return _outcome(database.update_appointment_status(appt['appointment_id'], new_status, full_name))
+
+def _deletable(user, appointments): #Checks the stored status against what this side may delete.
+    allowed, who = (ADMIN_DELETABLE, "Admin") if is_admin(user) else (CUSTOMER_DELETABLE, "User")
+    blocked = [appt for appt in appointments if appt['status'] not in allowed]
+    if len(blocked) == 1 and len(appointments) == 1:
+        raise PermissionDenied(f"Only appointments with status {' or '.join(repr(s) for s in allowed)} can be permanently deleted by {who}. Current status: {blocked[0]['status']}")
+    if blocked:
+        raise PermissionDenied(f"Only appointments with status {' or '.join(repr(s) for s in allowed)} can be permanently deleted by {who}. Check appointment ID(s): {', '.join(str(a['appointment_id']) for a in blocked)}")
+
+def delete_appointment(user, appointment_id):
+    user_id = _require_user(user)
+    appt, = _appointments(user, [appointment_id])
+    _deletable(user, [appt])
+    return _outcome(database.delete_appointment(user_id, appt['appointment_id']))
+
+def delete_appointments(user, appointment_ids): #All or nothing, in one transaction.
+    user_id = _require_user(user)
+    if not appointment_ids:
+        raise ValidationError("No appointments selected.")
+    appointments = _appointments(user, appointment_ids)
+    _deletable(user, appointments)
+    return _outcome(database.delete_appointments(user_id, [a['appointment_id'] for a in appointments]))
+
+def cancel_appointment(user, appointment_id):
+    user_id = _require_user(user)
+    appt, = _appointments(user, [appointment_id])
+    if appt['status'] in NOT_CANCELABLE:
+        raise PermissionDenied(f"Appointment already in final/canceled state: '{appt['status']}'. Cannot cancel.")
+    return _outcome(database.cancel_appointment(user_id, appt['appointment_id']))
+
+def reschedule_appointment(user, appointment_id, date_str, time_str, now=None):
+    _require_user(user)
+    appt, = _appointments(user, [appointment_id])
+    if appt['status'] not in RESCHEDULABLE:
+        raise PermissionDenied(f"Cannot reschedule appointment with status '{appt['status']}'. Only Pending or Rejected appointments can be rescheduled.")
+    validate_slot(date_str, time_str, now, action="reschedule to")
+    return _outcome(database.reschedule_appointment(appt['appointment_id'], date_str, time_str))
+
+def billing_invoice(user, appointment_id): #The admin can open any invoice; a customer only their own.
+    _require_user(user)
+    appt, = _appointments(user, [appointment_id])
+    return database.get_billing_invoice(appt['appointment_id'])
+
+# SERVICE OFFERS
+
+def save_service_offer(user, service_id, service_name, labor_rate): #Adds an offer (service_id None) or updates one. labor_rate may be text from an entry.
+    _require_admin(user)
+    service_name = (service_name or '').strip()
+    try:
+        labor_rate = float(labor_rate)
+    except (TypeError, ValueError):
+        raise ValidationError("Labor Rate must be a valid number.") from None
+    if not service_name or labor_rate <= 0:
+        raise ValidationError("Service Name is required and Rate must be positive.")
+    if service_id is None:
+        return _outcome(database.add_service_offer(service_name, labor_rate))
+    return _outcome(database.update_service_offer(int(service_id), service_name, labor_rate))
+
+def delete_service_offer(user, service_id):
+    _require_admin(user)
+    return _outcome(database.delete_service_offer(user['user_id'], int(service_id)))
+
+# MESSAGES
+
+def send_message(user, content, receiver_id=None): #Customers always write to the admin; the admin must name the customer.
+    sender_id = _require_user(user)
+    content = (content or '').strip()
+    if not content:
+        raise ValidationError("Message is empty.")
+    if not is_admin(user):
+        receiver_id = ADMIN_ID
+    elif not receiver_id:
+        raise ValidationError("Admin must select a user to chat with.")
+    return _outcome(database.send_message(sender_id, int(receiver_id), content))
+
+# HISTORY
+
+def deleted_items_history(user): #The admin sees everything; a customer sees what they deleted.
+    user_id = _require_user(user)
+    return database.get_deleted_items_history(user_id, user['user_type'] or 0)
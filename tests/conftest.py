@@ -0,0 +1,127 @@
+#Shared fixtures: every test gets its own database file in a temporary directory.
+#Run from the repository root: python -m pytest -q
+import os
+import random
+import shutil
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+import database  # noqa: E402
+
+DEMO_DB = os.path.join(REPO_DIR, "mm_auto_repair.db") # Schema version 0, never opened in place
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch): #An unopened database file that every database.py call in the test uses
+    path = str(tmp_path / "shop.db")
+    monkeypatch.setattr(database, "DATABASE_NAME", path)
+    yield path
+    database.close_connections()
+
+
+@pytest.fixture
+def shop(db_path): #A fully migrated database with the Admin account (user 1) and the default service offers
+    database.create_tables()
+    database.setup_initial_data()
+    return db_path
+
+
+@pytest.fixture
+def demo_copy(db_path): #A copy of the shipped demo database, not yet migrated
+    shutil.copyfile(DEMO_DB, db_path)
+    return db_path
+
+
+@pytest.fixture
+def new_customer(shop): #new_customer('name') -> (UserRecord, vehicle_id) of a fresh customer with one vehicle
+    count = [0]
+
+    def make(username=None):
+        count[0] += 1
+        username = username or f"customer{count[0]}"
+        ok, message = database.register_new_user(username, f"Customer {count[0]}", f"0917{count[0]:07d}", "secret1")
+        assert ok, message
+        user = database.get_user_by_username(username)
+        ok, message = database.add_vehicle(user['user_id'], "Toyota", "Vios", f"TST {count[0]:04d}")
+        assert ok, message
+        return user, database.get_user_vehicles(user['user_id'])[0]['vehicle_id']
+    return make
+
+
+def _ids(sql, params=()):
+    with database.db_connection() as conn:
+        return [row[0] for row in conn.execute(sql, params).fetchall()]
+
+
+@pytest.fixture(params=[1, 2, 3])
+def busy_shop(request, new_customer): #A shop after a seeded mix of every write the app makes, plus direct service-line edits
+    rng = random.Random(request.param)
+    customers = [new_customer() for _ in range(6)]
+    owners = {vehicle_id: user['user_id'] for user, vehicle_id in customers}
+
+    def slot():
+        return f"2040-01-{rng.randint(1, 6):02d}", f"{rng.randint(6, 16):02d}:00"
+
+    def appointment():
+        ids = _ids("SELECT appointment_id FROM appointments")
+        return rng.choice(ids) if ids else None
+
+    for step in range(400):
+        action = rng.random()
+        appt_id = appointment()
+        if action < 0.3 or appt_id is None:
+            vehicle_id = rng.choice(list(owners))
+            service_ids = rng.sample(_ids("SELECT service_id FROM service_offers"), rng.randint(1, 3))
+            database.add_appointment(owners[vehicle_id], vehicle_id, service_ids, *slot())
+        elif action < 0.5:
+            database.update_appointment_status(appt_id, rng.choice(['Pending', 'Approved', 'Rejected', 'Completed']))
+        elif action < 0.55:
+            owner = _ids("SELECT user_id FROM appointments WHERE appointment_id = ?", (appt_id,))[0]
+            database.cancel_appointment(owner, appt_id)
+        elif action < 0.6:
+            database.reschedule_appointment(appt_id, *slot())
+        elif action < 0.65:
+            database.delete_appointment(1, appt_id)
+        elif action < 0.67:
+            database.delete_appointments(1, _ids("SELECT appointment_id FROM appointments ORDER BY random() LIMIT 3"))
+        elif action < 0.69:
+            vehicle_id = rng.choice(list(owners))
+            if database.delete_vehicle(owners.pop(vehicle_id), vehicle_id)[0] and not owners:
+                user, vehicle_id = new_customer()
+                owners[vehicle_id] = user['user_id']
+        elif action < 0.72:
+            user_id = rng.choice(list(owners.values()))
+            database.add_vehicle(user_id, "Honda", "City", f"BUSY {step:04d}")
+            owners[database.get_user_vehicles(user_id)[-1]['vehicle_id']] = user_id
+        elif action < 0.75:
+            user, vehicle_id = new_customer()
+            owners[vehicle_id] = user['user_id']
+        elif action < 0.8:
+            # Repricing or changing the service lines of an existing appointment (no screen does this yet)
+            with database.transaction() as conn:
+                line = rng.choice(['reprice', 'add', 'remove'])
+                if line == 'reprice':
+                    conn.execute("UPDATE appointment_services SET labor_rate = labor_rate + 12.5 WHERE appointment_id = ?", (appt_id,))
+                elif line == 'add':
+                    conn.execute("INSERT INTO appointment_services (appointment_id, service_id, service_name, labor_rate) "
+                                 "SELECT ?, service_id, service_name, labor_rate FROM service_offers LIMIT 1", (appt_id,))
+                else:
+                    conn.execute("DELETE FROM appointment_services WHERE appt_service_id IN (SELECT appt_service_id FROM appointment_services WHERE appointment_id = ? LIMIT 1)", (appt_id,))
+        elif action < 0.82:
+            offer_id = rng.choice(_ids("SELECT service_id FROM service_offers"))
+            database.update_service_offer(offer_id, f"Service {step}", rng.choice([145.0, 500.25, 1000.0]))
+        elif action < 0.95:
+            customer_id = rng.choice(list(owners.values()))
+            if rng.random() < 0.5:
+                database.send_message(customer_id, 1, f"Question {step}")
+            else:
+                database.send_message(1, customer_id, f"Answer {step}")
+        else:
+            customer_id = rng.choice(list(owners.values()))
+            reader, partner = rng.choice([(1, customer_id), (customer_id, 1)])
+            newest = _ids("SELECT MAX(message_id) FROM messages")[0]
+            database.mark_conversation_read(reader, partner, rng.choice([None, newest and newest - 3]))
+    return request.param
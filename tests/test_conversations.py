@@ -0,0 +1,48 @@
+#Admin inbox: the trigger-maintained conversations table must equal a rebuild from the messages.
+import database
+
+_COLUMNS = ("admin_id, customer_id, last_message_id, last_sender_id, last_message_preview, "
+            "last_activity_ms, unread_for_admin, unread_for_customer")
+
+
+def _kept_and_rebuilt():
+    with database.transaction() as conn:
+        kept = set(conn.execute(f"SELECT {_COLUMNS} FROM conversations").fetchall())
+        database._rebuild_conversations(conn)
+        rebuilt = set(conn.execute(f"SELECT {_COLUMNS} FROM conversations").fetchall())
+        conn.rollback()
+    return kept, rebuilt
+
+
+def test_conversations_follow_sends_and_reads(busy_shop):
+    kept, rebuilt = _kept_and_rebuilt()
+    assert rebuilt
+    assert kept == rebuilt
+
+
+def test_inbox_and_unread_counts(new_customer):
+    user, vehicle_id = new_customer()
+    customer_id = user['user_id']
+    for text in ("Hello", "Is my car ready?"):
+        database.send_message(customer_id, 1, text)
+    database.send_message(1, customer_id, "Tomorrow morning.")
+
+    thread, = database.get_admin_inbox(1)
+    assert (thread['customer_id'], thread['unread_count'], thread['last_message_preview']) == (customer_id, 2, "Tomorrow morning.")
+    assert database.get_unread_count(customer_id) == 1
+
+    first = database.get_messages_before(1, customer_id, None, 10)[0]['message_id']
+    assert database.mark_conversation_read(1, customer_id, first) == 1 # Only up to the newest message on screen
+    assert database.get_admin_inbox(1)[0]['unread_count'] == 1
+    assert database.mark_conversation_read(1, customer_id) == 1
+    assert database.get_admin_inbox(1)[0]['unread_count'] == 0
+    assert database.mark_conversation_read(customer_id, 1) == 1
+    assert database.get_unread_count(customer_id) == 0
+    kept, rebuilt = _kept_and_rebuilt()
+    assert kept == rebuilt
+
+
+def test_upgraded_demo_conversations_match_rebuild(demo_copy):
+    database.create_tables()
+    kept, rebuilt = _kept_and_rebuilt()
+    assert kept == rebuilt
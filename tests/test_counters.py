@@ -0,0 +1,38 @@
+#shop_counters: the values the triggers keep must equal a recount from the base tables.
+import database
+
+
+def _recount(): #{name: (stored, recomputed)} without keeping the rebuild
+    with database.transaction() as conn:
+        changes = database._rebuild_shop_counters(conn)
+        conn.rollback()
+    return changes
+
+
+def test_new_shop_counters_match_recount(shop):
+    assert all(stored == recomputed for stored, recomputed in _recount().values())
+
+
+def test_counters_follow_every_write(busy_shop):
+    changes = _recount()
+    assert set(changes) == set(database._SHOP_COUNTER_SOURCES) | set(database._ROW_COUNTER_SOURCES)
+    assert {name: stored for name, (stored, recomputed) in changes.items()} == \
+           {name: recomputed for name, (stored, recomputed) in changes.items()}
+
+
+def test_dashboard_reads_the_counters(busy_shop):
+    with database.db_connection() as conn:
+        pending = conn.execute("SELECT COUNT(*) FROM appointments WHERE status = 'Pending' AND is_deleted = 0").fetchone()[0]
+        customers = conn.execute("SELECT COUNT(*) FROM users WHERE user_type = 0").fetchone()[0]
+        revenue = conn.execute("""
+            SELECT IFNULL(SUM(aps.labor_rate), 0) FROM appointment_services aps
+            JOIN appointments a ON a.appointment_id = aps.appointment_id WHERE a.status = 'Completed'
+        """).fetchone()[0]
+    assert database.get_pending_appointments_count() == pending
+    assert database.get_total_active_customers() == customers
+    assert abs(database.get_total_service_revenue() - revenue) < 0.005
+
+
+def test_upgraded_demo_counters_match_recount(demo_copy):
+    database.create_tables()
+    assert all(stored == recomputed for stored, recomputed in _recount().values())
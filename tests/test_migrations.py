@@ -0,0 +1,113 @@
+#Schema migrations: every path from version 0 must end in the same schema as a new database.
+import logging
+import sqlite3
+
+import pytest
+
+import database
+
+
+def _schema(path): #{(type, name)} of every table, index and trigger, plus {table: {columns}}
+    conn = sqlite3.connect(path)
+    try:
+        objects = set(conn.execute("SELECT type, name FROM sqlite_master WHERE name NOT LIKE 'sqlite_%'").fetchall())
+        columns = {name: {row[1] for row in conn.execute(f"PRAGMA table_info({name})")}
+                   for kind, name in objects if kind == 'table'}
+        return objects, columns
+    finally:
+        conn.close()
+
+
+def _version(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def _count(path, table):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def fresh_schema(tmp_path, monkeypatch): #Schema of a database created from scratch at the latest version
+    path = str(tmp_path / "fresh.db")
+    monkeypatch.setattr(database, "DATABASE_NAME", path)
+    database.create_tables()
+    database.close_connections()
+    return _schema(path)
+
+
+def test_versions_are_consecutive():
+    versions = [version for version, description, steps in database.MIGRATIONS]
+    assert versions == list(range(1, len(versions) + 1))
+    assert database.SCHEMA_VERSION == versions[-1]
+
+
+def test_new_database_is_at_latest_version(shop):
+    assert database.get_schema_version() == database.SCHEMA_VERSION
+
+
+def test_demo_database_upgrades_from_version_0(fresh_schema, demo_copy, monkeypatch):
+    assert _version(demo_copy) == 0
+    rows = {table: _count(demo_copy, table) for table in ('users', 'vehicles', 'appointments', 'messages')}
+    monkeypatch.setattr(database, "DATABASE_NAME", demo_copy)
+    database.create_tables()
+    database.close_connections()
+
+    assert _version(demo_copy) == database.SCHEMA_VERSION
+    assert _schema(demo_copy) == fresh_schema
+    assert {table: _count(demo_copy, table) for table in rows} == rows
+
+
+@pytest.mark.parametrize("stop", range(1, len(database.MIGRATIONS)))
+def test_upgrade_resumes_from_every_version(fresh_schema, demo_copy, monkeypatch, stop):
+    monkeypatch.setattr(database, "DATABASE_NAME", demo_copy)
+    with monkeypatch.context() as patch:
+        patch.setattr(database, "MIGRATIONS", database.MIGRATIONS[:stop])
+        database.create_tables()
+    assert database.get_schema_version() == stop
+
+    database.create_tables()
+    database.close_connections()
+    assert _version(demo_copy) == database.SCHEMA_VERSION
+    assert _schema(demo_copy) == fresh_schema
+
+
+def test_create_tables_twice_changes_nothing(shop):
+    before = _schema(shop)
+    database.create_tables()
+    database.setup_initial_data()
+    assert _schema(shop) == before
+    assert database.get_schema_version() == database.SCHEMA_VERSION
+
+
+def test_newer_database_is_refused(shop):
+    with database.db_connection() as conn:
+        conn.execute(f"PRAGMA user_version = {database.SCHEMA_VERSION + 1}")
+    with pytest.raises(RuntimeError):
+        database.create_tables()
+
+
+def test_migration_3_rejects_and_logs_double_bookings(demo_copy, monkeypatch, caplog):
+    conn = sqlite3.connect(demo_copy)
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(appointments)") if row[1] != 'appointment_id']
+    conn.execute(f"INSERT INTO appointments ({', '.join(columns)}) SELECT {', '.join(columns)} "
+                 "FROM appointments WHERE status = 'Pending' ORDER BY appointment_id LIMIT 1")
+    duplicate = conn.execute("SELECT MAX(appointment_id) FROM appointments").fetchone()[0]
+    conn.commit()
+    conn.close()
+
+    with caplog.at_level(logging.WARNING, logger="database"):
+        database.create_tables()
+
+    with database.db_connection() as conn:
+        status, message = conn.execute("SELECT status, status_message FROM appointments WHERE appointment_id = ?",
+                                       (duplicate,)).fetchone()
+    assert (status, message) == ('Rejected', database.DOUBLE_BOOKING_MESSAGE)
+    assert any(f"IDs: {duplicate}" in record.getMessage() for record in caplog.records)
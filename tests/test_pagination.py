@@ -0,0 +1,138 @@
+#Keyset pagination: tokens, prev_token, seek and start_id against the full list sorted in Python.
+import os
+import sys
+
+import pytest
+
+import database
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+import datagen  # noqa: E402
+
+PAGE_SIZE = 37 # Not a divisor of any list length, so the last page is short
+
+LISTS = {
+    'appointments': (database.get_appointments_page, 'appointment_id'),
+    'users': (database.get_users_page, 'user_id'),
+    'vehicles': (database.get_vehicles_page, 'vehicle_id'),
+}
+CASES = [(kind, sort, descending) for kind in LISTS for sort in database._PAGE_SORTS[kind] for descending in (False, True)]
+
+
+@pytest.fixture(scope="module")
+def generated(tmp_path_factory): #A small datagen shop, shared read-only by the tests in this file
+    path = str(tmp_path_factory.mktemp("pages") / "pages.db")
+    name, profile = database.DATABASE_NAME, database.STORAGE_PROFILE
+    try:
+        datagen.generate(path, customers=150, vehicles=300, appointments=2500, messages=20, years=1, seed=7, verbose=False)
+    finally:
+        database.close_connections()
+        database.DATABASE_NAME = name
+        database.set_storage_profile(profile)
+    return path
+
+
+@pytest.fixture
+def pages(generated, monkeypatch):
+    monkeypatch.setattr(database, "DATABASE_NAME", generated)
+    yield
+    database.close_connections()
+
+
+def _expected(kind, sort, descending): #Every row of the list, ordered in Python by the sort's columns
+    page_func, id_col = LISTS[kind]
+    rows = page_func(page_size=10 ** 6, sort=sort)['rows']
+    columns = [column for _, column in database._PAGE_SORTS[kind][sort]]
+    return [row[id_col] for row in sorted(rows, key=lambda row: [row[column] for column in columns], reverse=descending)]
+
+
+def _ids(kind, page):
+    return [row[LISTS[kind][1]] for row in page['rows']]
+
+
+@pytest.mark.parametrize("kind, sort, descending", CASES)
+def test_next_tokens_walk_the_whole_list(pages, kind, sort, descending):
+    page_func = LISTS[kind][0]
+    expected = _expected(kind, sort, descending)
+    walked, token = [], None
+    while True:
+        page = page_func(page_size=PAGE_SIZE, page_token=token, sort=sort, descending=descending)
+        assert len(page['rows']) == PAGE_SIZE or page['next_token'] is None
+        walked += _ids(kind, page)
+        token = page['next_token']
+        if token is None:
+            break
+    assert walked == expected
+    assert page['total_estimate'] >= len(expected)
+
+
+@pytest.mark.parametrize("kind, sort, descending", CASES)
+def test_prev_token_reads_the_rows_before(pages, kind, sort, descending):
+    page_func = LISTS[kind][0]
+    expected = _expected(kind, sort, descending)
+    first = page_func(page_size=PAGE_SIZE, sort=sort, descending=descending)
+    second = page_func(page_size=PAGE_SIZE, page_token=first['next_token'], sort=sort, descending=descending)
+    back = page_func(page_size=PAGE_SIZE, page_token=second['prev_token'], sort=sort, descending=not descending)
+    assert _ids(kind, second) == expected[PAGE_SIZE:2 * PAGE_SIZE]
+    assert _ids(kind, back) == expected[:PAGE_SIZE][::-1] # Nearest first
+    before_first = page_func(page_size=PAGE_SIZE, page_token=first['prev_token'], sort=sort, descending=not descending)
+    assert before_first['rows'] == [] and before_first['next_token'] is None
+
+
+@pytest.mark.parametrize("kind, sort, descending", CASES)
+def test_seek_lands_on_a_contiguous_slice(pages, kind, sort, descending):
+    page_func = LISTS[kind][0]
+    expected = _expected(kind, sort, descending)
+    last_index = -1
+    for seek in (0.0, 0.25, 0.5, 0.75, 1.0):
+        page = page_func(page_size=PAGE_SIZE, sort=sort, descending=descending, seek=seek)
+        ids = _ids(kind, page)
+        assert ids, seek
+        index = expected.index(ids[0])
+        assert ids == expected[index:index + len(ids)]
+        assert index >= last_index # Further along the list as seek grows
+        assert page['position'] == seek
+        last_index = index
+    assert page_func(page_size=PAGE_SIZE, sort=sort, descending=descending, seek=0.0)['rows'][0][LISTS[kind][1]] == expected[0]
+
+
+@pytest.mark.parametrize("kind, sort, descending", CASES)
+def test_start_id_opens_the_list_at_that_row(pages, kind, sort, descending):
+    page_func = LISTS[kind][0]
+    expected = _expected(kind, sort, descending)
+    for index in (0, len(expected) // 3, len(expected) - 1):
+        page = page_func(page_size=PAGE_SIZE, sort=sort, descending=descending, start_id=expected[index])
+        assert _ids(kind, page) == expected[index:index + PAGE_SIZE]
+        assert 0.0 <= page['position'] <= 1.0
+        assert (page['next_token'] is None) == (index + PAGE_SIZE >= len(expected))
+
+
+def test_start_id_outside_the_list_is_empty(pages):
+    with database.db_connection() as conn:
+        deleted = conn.execute("SELECT appointment_id FROM appointments WHERE is_deleted = 1 LIMIT 1").fetchone()[0]
+    assert database.get_appointments_page(start_id=deleted)['rows'] == []
+    assert [row['appointment_id'] for row in database.get_appointments_page(start_id=deleted, include_deleted=True)['rows']][:1] == [deleted]
+    assert database.get_users_page(start_id=10 ** 9)['rows'] == []
+
+
+def test_filtered_lists_count_their_own_rows(pages):
+    admins = database.get_users_page(page_size=PAGE_SIZE, user_type=1)
+    assert [row['user_type'] for row in admins['rows']] == [1] * len(admins['rows'])
+    assert admins['total_estimate'] == len(admins['rows'])
+    listed = database.get_appointments_page(page_size=10 ** 6)
+    assert listed['total_estimate'] == len(listed['rows'])
+    assert all(not row['is_deleted'] for row in listed['rows'])
+
+
+def test_bad_tokens_and_arguments_are_refused(pages):
+    token = database.get_users_page(page_size=5, sort='name')['next_token']
+    with pytest.raises(ValueError):
+        database.get_users_page(page_size=5, sort='username', page_token=token)
+    with pytest.raises(ValueError):
+        database.get_users_page(page_token="not a token")
+    with pytest.raises(ValueError):
+        database.get_users_page(sort='phone')
+    with pytest.raises(ValueError):
+        database.get_users_page(page_size=0)
+    with pytest.raises(ValueError):
+        database.get_users_page(seek=1.5)
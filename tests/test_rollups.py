@@ -0,0 +1,53 @@
+#Report rollups: the trigger-maintained daily tables must equal a rebuild from the appointments.
+import database
+
+
+def _rollups(conn): #Both rollup tables as sets of rows; rows that dropped back to all zeros count as absent
+    daily = conn.execute("SELECT day, booked, completed, canceled, revenue_cents FROM daily_rollups "
+                         "WHERE booked OR completed OR canceled OR revenue_cents").fetchall()
+    services = conn.execute("SELECT day, service_name, completed, revenue_cents FROM service_daily_rollups "
+                            "WHERE completed OR revenue_cents").fetchall()
+    return set(daily), set(services)
+
+
+def _kept_and_rebuilt():
+    with database.transaction() as conn:
+        kept = _rollups(conn)
+        database._rebuild_report_rollups(conn)
+        rebuilt = _rollups(conn)
+        conn.rollback()
+    return kept, rebuilt
+
+
+def test_rollups_follow_every_write(busy_shop):
+    kept, rebuilt = _kept_and_rebuilt()
+    assert kept[0] == rebuilt[0]
+    assert kept[1] == rebuilt[1]
+
+
+def test_permanent_delete_leaves_the_reports(new_customer):
+    user, vehicle_id = new_customer()
+    appointment_id = database.add_appointment(user['user_id'], vehicle_id, [1, 2], "2040-02-03", "09:00").value
+    database.update_appointment_status(appointment_id, 'Completed')
+    assert [row['booked'] for row in database.get_revenue_report("2040-02-01", "2040-02-28")] == [1]
+
+    ok, message = database.delete_appointment(1, appointment_id)
+    assert ok, message
+    assert database.get_revenue_report("2040-02-01", "2040-02-28") == []
+    assert database.get_service_mix_report("2040-02-01", "2040-02-28") == []
+    kept, rebuilt = _kept_and_rebuilt()
+    assert kept == rebuilt
+
+
+def test_report_revenue_matches_the_revenue_counter(busy_shop):
+    report = database.get_revenue_report("2000-01-01", "2100-12-31", 'year')
+    mix = database.get_service_mix_report("2000-01-01", "2100-12-31")
+    total = database.get_total_service_revenue()
+    assert abs(sum(row['revenue'] for row in report) - total) < 0.005
+    assert abs(sum(row['revenue'] for row in mix) - total) < 0.005
+
+
+def test_upgraded_demo_rollups_match_rebuild(demo_copy):
+    database.create_tables()
+    kept, rebuilt = _kept_and_rebuilt()
+    assert kept == rebuilt
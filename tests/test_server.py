@@ -0,0 +1,136 @@
+#server.py: sessions, and the scope that decides whose rows an operation sees.
+import asyncio
+import json
+import time
+
+import pytest
+
+import database
+import server
+
+
+@pytest.fixture
+def people(new_customer, monkeypatch): #(alice, her vehicle_id), (bob, his vehicle_id); start() may raise POOL_SIZE
+    monkeypatch.setattr(database, "POOL_SIZE", database.POOL_SIZE)
+    return new_customer('alice'), new_customer('bob')
+
+
+class _Api: # Requests straight into ApiServer._route, as _handle_connection would pass them
+    def __init__(self, app):
+        self.app = app
+
+    async def post(self, name, request, token=None): #-> (status, decoded body)
+        headers = {'authorization': f"Bearer {token}"} if token else {}
+        status, body = await self.app._route('POST', f"/api/{name}", headers, json.dumps(request).encode('utf-8'))
+        return status, json.loads(body)
+
+    async def call(self, name, *args, token=None, **kwargs):
+        return await self.post(name, {'args': args, 'kwargs': kwargs}, token)
+
+    async def login(self, username, password): #-> session token
+        status, body = await self.post('login', {'username': username, 'password': password})
+        assert status == 200, body
+        return body['result']['token']
+
+
+def _serve(scenario): #Runs await scenario(app, api) against a started server, then closes it
+    async def main():
+        app = server.ApiServer(readers=2)
+        await app.start(port=0)
+        try:
+            return await scenario(app, _Api(app))
+        finally:
+            await app.close()
+    return asyncio.run(main())
+
+
+def test_public_operations_need_no_login(people):
+    async def scenario(app, api):
+        status, body = await api.call('get_all_service_offers')
+        assert status == 200 and len(body['result']) == len(database.get_all_service_offers())
+        for token in (None, "not-a-session"):
+            status, body = await api.call('get_user_vehicles', 1, token=token)
+            assert status == 401 and body['error']['type'] == 'AuthenticationError'
+        status, body = await api.post('login', {'username': 'alice', 'password': 'wrong'})
+        assert status == 401
+        status, body = await api.call('no_such_operation')
+        assert status == 404
+    _serve(scenario)
+
+
+def test_customers_cannot_call_admin_operations(people):
+    async def scenario(app, api):
+        alice, admin = await api.login('alice', 'secret1'), await api.login('Admin', 'admin123')
+        for name in ('get_all_users', 'get_users_page', 'search', 'enable_instrumentation'):
+            status, body = await api.call(name, token=alice)
+            assert status == 403 and body['error']['type'] == 'PermissionDenied', name
+        status, body = await api.call('get_all_users', token=admin)
+        assert status == 200 and {'alice', 'bob'} <= {user['username'] for user in body['result']}
+        assert all('password' not in user for user in body['result'])
+    _serve(scenario)
+
+
+def test_self_operations_only_show_customers_their_own_rows(people):
+    (alice, alice_vehicle), (bob, bob_vehicle) = people
+    database.send_message(bob['user_id'], 1, "Bob's question")
+
+    async def scenario(app, api):
+        token = await api.login('alice', 'secret1')
+        for call in (api.call('get_user_vehicles', bob['user_id'], token=token),
+                     api.call('get_user_vehicles', user_id=bob['user_id'], token=token)):
+            status, body = await call
+            assert status == 200 and [vehicle['vehicle_id'] for vehicle in body['result']] == [alice_vehicle]
+        status, body = await api.call('get_messages', bob['user_id'], 1, token=token)
+        assert status == 200 and body['result'] == []
+
+        admin = await api.login('Admin', 'admin123')
+        status, body = await api.call('get_user_vehicles', bob['user_id'], token=admin)
+        assert [vehicle['vehicle_id'] for vehicle in body['result']] == [bob_vehicle]
+        status, body = await api.call('get_messages', bob['user_id'], 1, token=admin)
+        assert [message['content'] for message in body['result']] == ["Bob's question"]
+    _serve(scenario)
+
+
+def test_user_operations_act_as_the_session_user(people):
+    (alice, alice_vehicle), (bob, bob_vehicle) = people
+
+    async def scenario(app, api):
+        token = await api.login('alice', 'secret1')
+        status, body = await api.call('add_vehicle', "Honda", "City", "SRV 0001", token=token)
+        assert status == 200
+        assert "SRV 0001" in [vehicle['plate_no'] for vehicle in database.get_user_vehicles(alice['user_id'])]
+        status, body = await api.call('delete_vehicle', bob_vehicle, token=token)
+        assert status == 403
+
+        # The server's clock decides what is in the past, whatever 'now' the caller sends
+        status, body = await api.call('book_appointment', alice_vehicle, [1], "2000-01-03", "09:00",
+                                      now="1999-01-01 08:00", token=token)
+        assert status == 400 and body['error']['type'] == 'ValidationError'
+
+        status, body = await api.call('update_profile', 'alicia', "Alicia", "09170000099", token=token)
+        assert status == 200
+        assert app.sessions[token][0]['username'] == 'alicia' # Later calls see the new username
+    _serve(scenario)
+
+
+def test_logout_and_idle_sessions(people):
+    async def scenario(app, api):
+        alice, bob = await api.login('alice', 'secret1'), await api.login('bob', 'secret1')
+        status, body = await api.post('logout', {}, token=alice)
+        assert status == 200
+        status, body = await api.call('get_unread_count', 0, token=alice)
+        assert status == 401
+
+        assert app.drop_idle_sessions() == 0
+        assert app.drop_idle_sessions(now=time.monotonic() + server.SESSION_IDLE_SECONDS + 1) == 1
+        status, body = await api.call('get_unread_count', 0, token=bob)
+        assert status == 401 and app.sessions == {}
+    _serve(scenario)
+
+
+def test_operation_table():
+    assert {scope for kind, scope, func in server.OPERATIONS.values()} <= {'public', 'user', 'self', 'admin'}
+    assert {kind for kind, scope, func in server.OPERATIONS.values()} <= {'read', 'write'}
+    # Switching or resetting the counters changes server state, so it queues behind the other writes
+    for name in ('enable_instrumentation', 'disable_instrumentation', 'reset_instrumentation', 'mark_conversation_read'):
+        assert server.OPERATIONS[name][0] == 'write', name
@@ -0,0 +1,183 @@
+#services.py rules: who may do what, by role, ownership and stored status.
+from datetime import datetime
+
+import pytest
+
+import database
+import services
+from services import AuthenticationError, Conflict, NotFound, PermissionDenied, ValidationError
+
+NOW = datetime(2040, 1, 1, 8, 0)
+
+
+@pytest.fixture
+def people(new_customer): #(admin, (alice, her vehicle_id), (bob, his vehicle_id))
+    return services.login('Admin', 'admin123'), new_customer('alice'), new_customer('bob')
+
+
+def _book(customer, time_str="09:00", date_str="2040-01-02"):
+    user, vehicle_id = customer
+    services.book_appointment(user, vehicle_id, [1], date_str, time_str, now=NOW)
+    return max(appt['appointment_id'] for appt in database.get_user_appointments(user['user_id']))
+
+
+def _set_status(appointment_id, status):
+    ok, message = database.update_appointment_status(appointment_id, status)
+    assert ok, message
+
+
+def test_login(people):
+    assert services.login('alice', 'secret1')['username'] == 'alice'
+    with pytest.raises(AuthenticationError):
+        services.login('alice', 'wrong')
+    with pytest.raises(AuthenticationError):
+        services.login('nobody', 'secret1')
+
+
+def test_every_action_needs_a_user(people):
+    admin, alice, bob = people
+    appointment_id = _book(alice)
+    for action in (lambda: services.add_vehicle(None, "Honda", "City", "NEW 1"),
+                   lambda: services.cancel_appointment(None, appointment_id),
+                   lambda: services.delete_appointment(None, appointment_id),
+                   lambda: services.send_message(None, "hello"),
+                   lambda: services.update_appointment_status(None, appointment_id, 'Approved'),
+                   lambda: services.deleted_items_history(None)):
+        with pytest.raises(AuthenticationError):
+            action()
+
+
+def test_admin_only_actions(people):
+    admin, alice, bob = people
+    appointment_id = _book(alice)
+    for action in (lambda: services.update_appointment_status(alice[0], appointment_id, 'Approved'),
+                   lambda: services.save_service_offer(alice[0], None, "Car Wash", 100),
+                   lambda: services.save_service_offer(alice[0], 1, "Oil Change", 1),
+                   lambda: services.delete_service_offer(alice[0], 1)):
+        with pytest.raises(PermissionDenied):
+            action()
+    services.update_appointment_status(admin, appointment_id, 'Approved')
+    services.save_service_offer(admin, None, "Car Wash", "100")
+    assert "Car Wash" in [offer['service_name'] for offer in database.get_all_service_offers()]
+
+
+def test_customers_only_touch_their_own_appointments(people):
+    admin, alice, bob = people
+    appointment_id = _book(alice)
+    for action in (lambda: services.cancel_appointment(bob[0], appointment_id),
+                   lambda: services.reschedule_appointment(bob[0], appointment_id, "2040-01-03", "10:00", now=NOW),
+                   lambda: services.delete_appointment(bob[0], appointment_id),
+                   lambda: services.delete_appointments(bob[0], [appointment_id]),
+                   lambda: services.billing_invoice(bob[0], appointment_id)):
+        with pytest.raises(PermissionDenied):
+            action()
+    assert services.billing_invoice(alice[0], appointment_id)
+    assert services.billing_invoice(admin, appointment_id)
+    services.cancel_appointment(alice[0], appointment_id)
+
+
+def test_customers_only_delete_their_own_vehicles(people):
+    admin, alice, bob = people
+    with pytest.raises(PermissionDenied):
+        services.delete_vehicle(bob[0], alice[1])
+    with pytest.raises(NotFound):
+        services.delete_vehicle(bob[0], 10 ** 9)
+    services.delete_vehicle(admin, alice[1])
+    assert database.get_vehicle_by_id(alice[1]) is None
+
+
+@pytest.mark.parametrize("status, customer_may, admin_may", [
+    ('Pending', False, False), ('Approved', False, False), ('Rejected', True, True),
+    ('Completed', False, True), ('Canceled', True, False),
+])
+def test_delete_rules_by_status(people, status, customer_may, admin_may):
+    admin, alice, bob = people
+    for user, allowed in ((alice[0], customer_may), (admin, admin_may)):
+        appointment_id = _book(alice, time_str="09:00" if user is admin else "10:00")
+        if status == 'Canceled':
+            database.cancel_appointment(alice[0]['user_id'], appointment_id)
+        else:
+            _set_status(appointment_id, status)
+        if allowed:
+            services.delete_appointment(user, appointment_id)
+            assert database.get_appointments_by_id([appointment_id]) == []
+        else:
+            with pytest.raises(PermissionDenied):
+                services.delete_appointment(user, appointment_id)
+
+
+def test_bulk_delete_is_all_or_nothing(people):
+    admin, alice, bob = people
+    rejected, pending = _book(alice, "09:00"), _book(alice, "10:00")
+    _set_status(rejected, 'Rejected')
+    with pytest.raises(PermissionDenied):
+        services.delete_appointments(alice[0], [rejected, pending])
+    assert len(database.get_appointments_by_id([rejected, pending])) == 2
+    with pytest.raises(ValidationError):
+        services.delete_appointments(alice[0], [])
+    with pytest.raises(NotFound):
+        services.delete_appointments(alice[0], [rejected, 10 ** 9])
+
+
+def test_status_rules(people):
+    admin, alice, bob = people
+    appointment_id = _book(alice)
+    services.update_appointment_status(admin, appointment_id, 'Approved')
+    with pytest.raises(PermissionDenied):
+        services.update_appointment_status(admin, appointment_id, 'Approved') # Already approved
+    with pytest.raises(ValidationError):
+        services.update_appointment_status(admin, appointment_id, 'Canceled') # Not an admin status
+    with pytest.raises(PermissionDenied):
+        services.reschedule_appointment(alice[0], appointment_id, "2040-01-03", "10:00", now=NOW)
+    _set_status(appointment_id, 'Completed')
+    with pytest.raises(PermissionDenied):
+        services.cancel_appointment(alice[0], appointment_id)
+
+
+def test_booking_validation(people):
+    admin, alice, bob = people
+    user, vehicle_id = alice
+    with pytest.raises(ValidationError):
+        services.book_appointment(user, bob[1], [1], "2040-01-02", "09:00", now=NOW) # Someone else's vehicle
+    with pytest.raises(ValidationError):
+        services.book_appointment(user, vehicle_id, [1], "2039-12-31", "09:00", now=NOW)
+    with pytest.raises(ValidationError):
+        services.book_appointment(user, vehicle_id, [1], "2040-01-01", "07:00", now=NOW) # Earlier today
+    with pytest.raises(ValidationError):
+        services.book_appointment(user, vehicle_id, [1], "2040-01-02", "18:00", now=NOW)
+    with pytest.raises(ValidationError):
+        services.book_appointment(user, vehicle_id, [], "2040-01-02", "09:00", now=NOW)
+    _book(alice)
+    with pytest.raises(Conflict):
+        _book(bob) # Same slot
+
+
+def test_database_error_kinds_map_to_service_errors(people):
+    admin, alice, bob = people
+    with pytest.raises(Conflict):
+        services.register('alice', "Alice Again", "09170000000", "secret1")
+    with pytest.raises(Conflict):
+        services.add_vehicle(bob[0], "Toyota", "Vios", database.get_vehicle_by_id(alice[1])['plate_no'])
+    with pytest.raises(Conflict):
+        services.update_profile(bob[0], 'alice', "Bob", "09170000000")
+    with pytest.raises(NotFound):
+        services.delete_service_offer(admin, 10 ** 9)
+    assert services.update_profile(bob[0], 'robert', "Bob", "09170000000").data['username'] == 'robert'
+
+
+def test_messages_and_history(people):
+    admin, alice, bob = people
+    services.send_message(alice[0], "Hello", receiver_id=bob[0]['user_id']) # Customers always write to the admin
+    assert database.get_messages_since(alice[0]['user_id'], services.ADMIN_ID)[-1]['content'] == "Hello"
+    assert database.get_messages_since(alice[0]['user_id'], bob[0]['user_id']) == []
+    with pytest.raises(ValidationError):
+        services.send_message(admin, "Hi") # The admin must pick a customer
+    with pytest.raises(ValidationError):
+        services.send_message(alice[0], "   ")
+
+    for customer in (alice, bob):
+        appointment_id = _book(customer, "09:00" if customer is alice else "10:00")
+        services.cancel_appointment(customer[0], appointment_id)
+    mine = services.deleted_items_history(alice[0])
+    assert len(mine) == 1 and "username: alice" in mine[0]['details']
+    assert len(services.deleted_items_history(admin)) == 2